@@ -0,0 +1 @@
+# Benchmarks; run from the repo root, e.g. python -m bench.metrics_overhead
@@ -0,0 +1,82 @@
+# bench/baseline.py
+"""Stored benchmark baselines and the regression check.
+
+    python -m bench.baseline BASELINE.json RESULTS.json
+
+A results file maps metric names to {"value", "unit", "kind"}; every
+metric is lower-is-better. A metric regresses when
+
+    now > baseline * (1 + relative) + absolute
+
+with the (relative, absolute) allowance of its kind in TOLERANCES, so
+tiny, noisy numbers (a few CPU seconds per hour) need a real change
+before they are flagged. Exits 1 if anything regressed.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+TOLERANCES = {
+    "cpu": (0.5, 1.0),        # CPU seconds per idle hour
+    "wakeups": (0.15, 0.5),   # wakeups per second
+    "latency": (0.3, 0.5),    # microseconds per call
+    "threads": (0.0, 0.0),    # thread count: any new thread is flagged
+}
+
+
+def save(path, results):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    machine = {"node": platform.node(), "machine": platform.machine(), "python": platform.python_version()}
+    with open(path, "w") as f:
+        json.dump({"recorded": time.strftime("%Y-%m-%d %H:%M:%S"), "machine": machine, "metrics": results},
+                  f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, results):
+    """Print a table against baseline["metrics"]; returns the names of regressed metrics"""
+    regressed = []
+    print(f"{'metric':<36} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, now in sorted(results.items()):
+        base = baseline["metrics"].get(name)
+        if base is None:
+            print(f"{name:<36} {'-':>12} {now['value']:>12.2f} {'new':>8}")
+            continue
+        relative, absolute = TOLERANCES.get(now["kind"], (0.3, 0.0))
+        limit = base["value"] * (1 + relative) + absolute
+        change = (now["value"] - base["value"]) / base["value"] * 100 if base["value"] else 0.0
+        flag = ""
+        if now["value"] > limit:
+            regressed.append(name)
+            flag = f"  ← REGRESSION (limit {limit:.2f} {now['unit']})"
+        print(f"{name:<36} {base['value']:>12.2f} {now['value']:>12.2f} {change:>+7.0f}%{flag}")
+    missing = sorted(set(baseline["metrics"]) - set(results))
+    if missing:
+        print(f"not measured this run: {', '.join(missing)}")
+    machine = baseline.get("machine", {})
+    if machine.get("node") and machine.get("node") != platform.node():
+        print(f"⚠️ Baseline was recorded on {machine['node']} ({machine.get('machine')}); compare on the same box")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("results")
+    args = parser.parse_args()
+    results = load(args.results)
+    regressed = compare(load(args.baseline), results.get("metrics", results))
+    print(f"FAIL: {len(regressed)} regression(s)" if regressed else "PASS")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
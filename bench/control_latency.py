@@ -0,0 +1,92 @@
+# bench/control_latency.py
+"""Latency of the control socket.
+
+    python -m bench.control_latency                 # in-process server, fake Spotify
+    python -m bench.control_latency --socket PATH   # against a running daemon
+
+Measures round-trip time of sequential commands (p50/p95/p99) and the
+throughput of pipelined batches. Against a real daemon only "status"
+is sent, so playback is left alone.
+"""
+import argparse
+import json
+import os
+import socket
+import tempfile
+import time
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Client:
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.reader = self.sock.makefile("rb")
+
+    def send(self, requests):
+        self.sock.sendall(b"".join(json.dumps(r).encode() + b"\n" for r in requests))
+
+    def receive(self, count):
+        return [json.loads(self.reader.readline()) for _ in range(count)]
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def run(path, command, iterations, batch):
+    client = Client(path)
+    rtts = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        client.send([dict(command, id=i)])
+        response = client.receive(1)[0]
+        rtts.append(time.perf_counter() - start)
+        assert response.get("id") == i, response
+
+    start = time.perf_counter()
+    client.send([dict(command, id=i) for i in range(batch)])
+    responses = client.receive(batch)
+    pipelined = time.perf_counter() - start
+    assert [r["id"] for r in responses] == list(range(batch))
+    client.close()
+
+    print(f"command: {json.dumps(command)}")
+    print(f"sequential x{iterations}: p50 {_percentile(rtts, 50) * 1e3:.3f} ms  "
+          f"p95 {_percentile(rtts, 95) * 1e3:.3f} ms  p99 {_percentile(rtts, 99) * 1e3:.3f} ms")
+    print(f"pipelined x{batch}: {pipelined * 1e3:.1f} ms total, {batch / pipelined:.0f} commands/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", help="control socket of a running daemon")
+    parser.add_argument("-n", "--iterations", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.socket:
+        run(args.socket, {"cmd": "status"}, args.iterations, args.batch)
+        return
+
+    import control
+    import buttons  # registers the button commands
+    import rfid     # registers play_card
+    from bench.fakes import FakeSpotInstance
+
+    spot = FakeSpotInstance()
+    path = os.path.join(tempfile.mkdtemp(), "kidspot-bench.sock")
+    control.start(spot, socket_path=path, tcp_port=0)
+    try:
+        print("=== Control socket latency (in-process, fake Spotify) ===")
+        for command in ({"cmd": "status"}, {"cmd": "play_uri", "uri": "spotify:track:bench"}, {"cmd": "next"}):
+            run(path, command, args.iterations, args.batch)
+    finally:
+        control.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench/fake_player_events.py
+"""Fake librespot: emit a scripted session of onevent player events.
+
+    python -m bench.fake_player_events                  # in-process, prints the model
+    python -m bench.fake_player_events --socket PATH    # feed a running daemon
+    python -m bench.fake_player_events --hook           # go through player_hook.py
+
+Without --socket the events go to a private socket served by
+player_events.py, and the local playback state is printed after each
+one, together with how many Web API calls the button commands made
+(there should be none).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import player_hook
+
+TRACK = "4uLU6hMCjMI75M1A2tKUQC"
+NEXT_TRACK = "7GhIk7Il098yCjg4BQjzvb"
+
+SESSION = [
+    {"PLAYER_EVENT": "session_connected", "CLIENT_NAME": "Kidspot"},
+    {"PLAYER_EVENT": "volume_changed", "VOLUME": "39321"},
+    {"PLAYER_EVENT": "track_changed", "URI": f"spotify:track:{TRACK}", "DURATION_MS": "212000"},
+    {"PLAYER_EVENT": "playing", "TRACK_ID": TRACK, "POSITION_MS": "0"},
+    {"PLAYER_EVENT": "seeked", "TRACK_ID": TRACK, "POSITION_MS": "60000"},
+    {"PLAYER_EVENT": "paused", "TRACK_ID": TRACK, "POSITION_MS": "61000"},
+    {"PLAYER_EVENT": "playing", "TRACK_ID": TRACK, "POSITION_MS": "61000"},
+    {"PLAYER_EVENT": "change", "OLD_TRACK_ID": TRACK, "TRACK_ID": NEXT_TRACK},   # older librespot
+    {"PLAYER_EVENT": "volume_set", "VOLUME": "52428"},
+    {"PLAYER_EVENT": "stopped", "TRACK_ID": NEXT_TRACK},
+    {"PLAYER_EVENT": "session_disconnected"},
+]
+
+
+def emit(path, event, via_hook=False):
+    if via_hook:
+        hook = os.path.join(os.path.dirname(os.path.abspath(player_hook.__file__)), "player_hook.py")
+        env = dict(os.environ, KIDSPOT_EVENT_SOCKET=path, **event)
+        subprocess.run([sys.executable, hook], env=env, check=True)
+        return True
+    return player_hook.send(dict(event), path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", help="event socket of a running daemon")
+    parser.add_argument("--hook", action="store_true", help="run player_hook.py per event, like librespot")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds between events")
+    args = parser.parse_args()
+
+    if args.socket:
+        for event in SESSION:
+            print(f"→ {event['PLAYER_EVENT']}: {'sent' if emit(args.socket, event, args.hook) else 'not listening'}")
+            time.sleep(args.delay)
+        return
+
+    import buttons  # registers the button commands
+    import commands
+    import player_events
+    from bench.fakes import FakeSpotInstance, install_fake_hardware
+
+    install_fake_hardware()
+    path = os.path.join(tempfile.mkdtemp(), "kidspot-events.sock")
+    player_events.start(path=path)
+    spot = FakeSpotInstance()
+    try:
+        for event in SESSION:
+            emit(path, event, args.hook)
+            time.sleep(args.delay)
+            state = player_events.player.snapshot() if player_events.player.known() else None
+            print(f"{event['PLAYER_EVENT']:>22}  {state.to_dict() if state else 'unknown (Web API fallback)'}")
+
+        # Button reads answered locally: replay a session and toggle from local state
+        for event in SESSION[:4]:
+            emit(path, event, args.hook)
+        time.sleep(args.delay)
+        spot.get_current_playback = lambda fresh=False: player_events.player.snapshot(spot.device_id)
+        before = spot.calls
+        commands.execute("toggle", spot, source="bench")
+        print(f"\ntoggle while playing → pause; Web API reads: {spot.calls - before - 1} (1 command call)")
+    finally:
+        player_events.stop()
+
+
+if __name__ == "__main__":
+    main()
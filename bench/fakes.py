@@ -0,0 +1,143 @@
+# bench/fakes.py
+"""Stand-ins for the Pi hardware and Spotify, for running benchmarks anywhere."""
+import clock
+
+
+class FakeGPIO:
+    """Enough of RPi.GPIO for leds.py and buttons.py."""
+    BCM = 11
+    OUT = 0
+    IN = 1
+    HIGH = 1
+    LOW = 0
+    PUD_UP = 22
+    FALLING = 32
+
+    def __init__(self):
+        self.levels = {}
+        self.writes = 0
+        self.callbacks = {}
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+        self.levels[pin] = self.HIGH if direction == self.IN else self.LOW
+
+    def output(self, pin, value):
+        self.levels[pin] = value
+        self.writes += 1
+
+    def input(self, pin):
+        return self.levels.get(pin, self.HIGH)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.callbacks[pin] = callback
+
+    def press(self, pin):
+        """Pull an input low and fire its edge callback, like a button press"""
+        self.levels[pin] = self.LOW
+        if pin in self.callbacks:
+            self.callbacks[pin](pin)
+
+    def release(self, pin):
+        self.levels[pin] = self.HIGH
+
+    def cleanup(self, *pins):
+        pass
+
+
+class FakePN532:
+    """A polled PN532: read_passive_target() waits out its timeout unless a card is placed.
+
+    Like the Adafruit driver it checks the ready status every ready_poll
+    seconds while waiting, so thread wakeups match a real reader.
+    """
+
+    def __init__(self, ready_poll=0.01):
+        self.ready_poll = ready_poll
+        self.card = None
+        self.reads = 0
+        self.polls = 0
+        self.power_downs = 0
+
+    def place(self, uid):
+        self.card = bytes(uid)
+
+    def remove(self):
+        self.card = None
+
+    def read_passive_target(self, timeout=1):
+        self.reads += 1
+        deadline = clock.monotonic() + timeout
+        while self.card is None and clock.monotonic() < deadline:
+            clock.sleep(max(0.0, min(self.ready_poll, deadline - clock.monotonic())))
+            self.polls += 1
+        return self.card
+
+    def power_down(self):
+        self.power_downs += 1
+        return True
+
+
+class FakeSpotInstance:
+    """Accepts every command instantly (or after call_latency seconds)."""
+
+    def __init__(self, call_latency=0.0):
+        self.call_latency = call_latency
+        self.sp = self
+        self.device_id = "fake-device"
+        self.active = True
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.call_latency:
+            clock.sleep(self.call_latency)
+
+    def api(self, op):
+        return self
+
+    def play_url(self, url):
+        self._call()
+        return True
+
+    def play_uris(self, uris, offset=0):
+        self._call()
+        return True
+
+    def pause(self):
+        self._call()
+
+    def get_current_playback(self, fresh=False):
+        from spot import PlaybackState
+
+        self._call()
+        return PlaybackState(True, "spotify:track:fake", self.device_id, 50)
+
+    def current_volume(self):
+        return self.get_current_playback(fresh=True).volume_percent
+
+    def set_volume(self, percent):
+        self._call()
+        return True
+
+    def next_track(self, device_id=None):
+        self._call()
+
+    def previous_track(self, device_id=None):
+        self._call()
+
+
+def install_fake_hardware():
+    """Point leds and buttons at a FakeGPIO; returns it."""
+    import leds
+    import buttons
+
+    gpio = FakeGPIO()
+    leds.GPIO = gpio
+    buttons.GPIO = gpio
+    return gpio
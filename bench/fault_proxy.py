@@ -0,0 +1,276 @@
+# bench/fault_proxy.py
+"""Fault-injecting HTTP proxy for the Spotify Web API and token endpoint.
+
+    python -m bench.fault_proxy [--port 8642] [--upstream real] [--scenario rate_limited]
+
+Point kidspot at it with
+
+    KIDSPOT_SPOTIFY_API_URL=http://127.0.0.1:8642/v1/
+    KIDSPOT_SPOTIFY_TOKEN_URL=http://127.0.0.1:8642/api/token
+
+Requests under /api/ go to the accounts host, everything else to the API
+host. With no --upstream the proxy answers itself as a minimal fake
+Spotify (one device, every player call succeeds), so no account or
+network is needed.
+
+Faults follow a schedule: a list of Phases, each active for its number
+of seconds from start(); the last one stays active. A phase can add
+latency drawn from a distribution, answer 429 with Retry-After, answer
+5xx, reset the connection, and expire every access token seen so far
+(API calls using one get 401 until a new token is fetched). Fault
+draws use a seeded random.Random so runs are repeatable.
+"""
+import argparse
+import http.client
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+UPSTREAMS = {"real": ("https://accounts.spotify.com", "https://api.spotify.com")}
+FAKE_DEVICE = "Kidspot Bench"
+
+
+def distribution(spec):
+    """A sampler for "fixed:S", "uniform:LO,HI" or "lognormal:MEDIAN,SIGMA" (seconds)"""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        import math
+
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class Phase:
+    """Faults applied for `seconds` (rates are per request, 0..1)."""
+
+    def __init__(self, seconds, latency=None, throttle=0.0, retry_after=1, errors=0.0, error_status=503,
+                 resets=0.0, expire_tokens=False):
+        self.seconds = seconds
+        self.latency = distribution(latency) if isinstance(latency, str) else latency
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.errors = errors
+        self.error_status = error_status
+        self.resets = resets
+        self.expire_tokens = expire_tokens
+
+
+# ---------------------------
+# Built-in fake Spotify
+# ---------------------------
+class FakeSpotify:
+    """Just enough of the API for SpotInstance: tokens, one device, player calls."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = 0
+
+    def answer(self, method, path, body):
+        """(status, headers, body bytes)"""
+        if path.startswith("/api/token"):
+            with self.lock:
+                self.tokens += 1
+                token = f"fake-token-{self.tokens}"
+            return 200, {}, json.dumps({"access_token": token, "token_type": "Bearer", "expires_in": 3600}).encode()
+        path = path.split("?", 1)[0]
+        if method == "GET" and path == "/v1/me/player/devices":
+            device = {"id": "f" * 40, "name": FAKE_DEVICE, "is_active": True, "type": "Speaker", "volume_percent": 50}
+            return 200, {}, json.dumps({"devices": [device]}).encode()
+        if path.startswith("/v1/me/player"):
+            return 204, {}, b""
+        return 404, {}, json.dumps({"error": {"status": 404, "message": "Not found"}}).encode()
+
+
+# ---------------------------
+# Proxy
+# ---------------------------
+class FaultProxy:
+    """The proxy server. delivered holds (monotonic time, method, path, body) of each 2xx player call."""
+
+    def __init__(self, schedule=None, upstream=None, port=0, seed=1):
+        self.schedule = schedule or [Phase(0)]
+        self.upstreams = UPSTREAMS.get(upstream, upstream)
+        self.fake = FakeSpotify() if upstream is None else None
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.started = None
+        self.phase_index = -1
+        self.expired = set()
+        self.seen_tokens = set()
+        self.delivered = []
+        self.counts = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.server.handle_error = lambda request, address: None  # resets are on purpose
+        self.port = self.server.server_address[1]
+
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self.port}/v1/"
+
+    @property
+    def token_url(self):
+        return f"http://127.0.0.1:{self.port}/api/token"
+
+    def start(self):
+        self.started = time.monotonic()
+        threading.Thread(target=self.server.serve_forever, name="fault-proxy", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _phase(self):
+        elapsed = time.monotonic() - self.started
+        index = 0
+        for index, phase in enumerate(self.schedule):
+            if elapsed < phase.seconds or index == len(self.schedule) - 1:
+                break
+            elapsed -= phase.seconds
+        phase = self.schedule[index]
+        with self.lock:
+            if index != self.phase_index:
+                self.phase_index = index
+                if phase.expire_tokens:
+                    self.expired |= self.seen_tokens
+        return phase
+
+    def _count(self, outcome):
+        with self.lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+    def _decide(self, phase, token, is_token_call):
+        """The fault for one request: None, "reset", or (status, headers, body)"""
+        with self.lock:
+            draw = self.rng.random()
+            delay = phase.latency(self.rng) if phase.latency else 0.0
+        if delay:
+            time.sleep(delay)
+        if token in self.expired and not is_token_call:
+            body = {"error": {"status": 401, "message": "The access token expired"}}
+            return 401, {}, json.dumps(body).encode()
+        if draw < phase.resets:
+            return "reset"
+        draw -= phase.resets
+        if draw < phase.throttle:
+            body = {"error": {"status": 429, "message": "API rate limit exceeded"}}
+            return 429, {"Retry-After": str(phase.retry_after)}, json.dumps(body).encode()
+        draw -= phase.throttle
+        if draw < phase.errors:
+            body = {"error": {"status": phase.error_status, "message": "Injected server error"}}
+            return phase.error_status, {}, json.dumps(body).encode()
+        return None
+
+    def _forward(self, method, path, headers, body):
+        accounts, api = self.upstreams
+        target = urlsplit(accounts if path.startswith("/api/") else api)
+        connection_class = http.client.HTTPSConnection if target.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(target.netloc, timeout=30)
+        try:
+            forwarded = {k: v for k, v in headers.items() if k.lower() in ("authorization", "content-type")}
+            connection.request(method, path, body=body or None, headers=forwarded)
+            response = connection.getresponse()
+            keep = {k: v for k, v in response.getheaders() if k.lower() in ("content-type", "retry-after")}
+            return response.status, keep, response.read()
+        finally:
+            connection.close()
+
+    def _handle(self, request):
+        method, path = request.command, request.path
+        length = int(request.headers.get("Content-Length") or 0)
+        body = request.rfile.read(length) if length else b""
+        auth = request.headers.get("Authorization", "")
+        token = auth[7:] if auth.startswith("Bearer ") else None
+        is_token_call = path.startswith("/api/")
+        if token:
+            with self.lock:
+                self.seen_tokens.add(token)
+
+        fault = self._decide(self._phase(), token, is_token_call)
+        if fault == "reset":
+            self._count("reset")
+            # SO_LINGER 0: close() sends RST instead of FIN
+            request.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            request.connection.close()
+            request.close_connection = True
+            return
+        if fault is not None:
+            status, headers, payload = fault
+            self._count(str(status))
+        else:
+            try:
+                status, headers, payload = (self.fake.answer(method, path, body) if self.fake
+                                            else self._forward(method, path, dict(request.headers), body))
+            except OSError:
+                status, headers, payload = 502, {}, b""
+            self._count("passed")
+            if 200 <= status < 300 and method in ("PUT", "POST") and path.startswith("/v1/me/player/play"):
+                with self.lock:
+                    self.delivered.append((time.monotonic(), method, path, body))
+
+        request.send_response(status)
+        for name, value in headers.items():
+            request.send_header(name, value)
+        if payload:
+            request.send_header("Content-Type", headers.get("Content-Type", "application/json"))
+        request.send_header("Content-Length", str(len(payload)))
+        request.end_headers()
+        if payload:
+            request.wfile.write(payload)
+
+    def _handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def do_GET(self):
+                proxy._handle(self)
+
+            do_PUT = do_POST = do_DELETE = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    from bench.fault_scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8642)
+    parser.add_argument("--upstream", help='"real" for Spotify, or "ACCOUNTS_URL,API_URL"; default: built-in fake')
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="baseline")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    upstream = args.upstream
+    if upstream and upstream != "real":
+        upstream = tuple(upstream.split(",", 1))
+    proxy = FaultProxy(SCENARIOS[args.scenario], upstream, args.port, args.seed).start()
+    print(f"🧪 Fault proxy ({args.scenario}) on http://127.0.0.1:{proxy.port}")
+    print(f"   KIDSPOT_SPOTIFY_API_URL={proxy.api_url}")
+    print(f"   KIDSPOT_SPOTIFY_TOKEN_URL={proxy.token_url}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"   {proxy.counts}")
+    except KeyboardInterrupt:
+        proxy.stop()
+
+
+if __name__ == "__main__":
+    main()
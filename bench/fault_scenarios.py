@@ -0,0 +1,152 @@
+# bench/fault_scenarios.py
+"""Swipe-to-command latency and dropped commands under Spotify API faults.
+
+    python -m bench.fault_scenarios [--scenario NAME ...] [--swipes 40] [--interval 0.5]
+    python -m bench.fault_scenarios --upstream real --device "Kidspot" --uris spotify:track:A,spotify:track:B
+
+Each scenario starts a bench.fault_proxy with its fault schedule, points
+a real SpotInstance (spotipy + requests) at it and swipes --swipes cards
+through rfid.publish() every --interval seconds, so commands take the
+daemon's path: dedup, event queue, dispatcher, commands.execute(),
+handle_uid(), play_url(). A swipe's latency runs from publish() to the
+proxy passing a 2xx start_playback for its URI; a swipe with no such
+call once the queue drains is dropped. Scenario phases are timed for
+the default 20 s of swipes.
+
+Needs spotipy and requests. With the built-in fake upstream nothing
+leaves the machine; with --upstream real the SPOTIFY_BENCH_* credentials
+and a real device are used, and the cards really play.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+
+import cards
+import rfid
+import spot
+from bench.fakes import install_fake_hardware
+from bench.fault_proxy import FAKE_DEVICE, FaultProxy, Phase
+
+NET = "lognormal:0.08,0.5"  # home Wi-Fi to Spotify: ~80 ms median, a long-ish tail
+
+SCENARIOS = {
+    "baseline": [Phase(0, latency=NET)],
+    "slow_network": [Phase(0, latency="lognormal:0.4,0.9")],
+    "stalls": [Phase(5, latency=NET), Phase(5, latency="uniform:3,6"), Phase(0, latency=NET)],
+    "rate_limited": [Phase(5, latency=NET), Phase(8, latency=NET, throttle=0.6, retry_after=2),
+                     Phase(0, latency=NET)],
+    "server_errors": [Phase(5, latency=NET), Phase(4, latency=NET, errors=1.0, error_status=503),
+                      Phase(3, latency=NET), Phase(2, latency=NET, errors=1.0, error_status=502),
+                      Phase(0, latency=NET)],
+    "connection_resets": [Phase(0, latency=NET, resets=0.2)],
+    "token_expiry": [Phase(5, latency=NET), Phase(0, latency=NET, expire_tokens=True)],
+    "mixed": [Phase(4, latency=NET), Phase(4, latency=NET, errors=0.3, resets=0.1),
+              Phase(4, latency="lognormal:0.3,0.8", throttle=0.3), Phase(4, latency=NET, expire_tokens=True),
+              Phase(0, latency=NET, resets=0.05)],
+}
+ACCOUNT = "BENCH"
+DRAIN_TIMEOUT = 30.0  # seconds to let queued swipes finish after the last one
+
+
+def _percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def _uris(count, given):
+    if given:
+        return [given[i % len(given)] for i in range(count)]
+    return [f"spotify:track:{i:022d}" for i in range(count)]
+
+
+def _delivered_uri(body):
+    try:
+        return (json.loads(body).get("uris") or [None])[0]
+    except ValueError:
+        return None
+
+
+def run(name, schedule, args):
+    """Swipe through one scenario; returns (latencies, dropped, proxy counts)"""
+    proxy = FaultProxy(schedule, args.upstream, seed=args.seed).start()
+    spot.API_URL, spot.TOKEN_URL = proxy.api_url, proxy.token_url
+    spot._sessions.clear()  # a fresh token and connection pool per scenario
+
+    uris = _uris(args.swipes, args.uris)
+    rfid.swipe_data = {f"B{i:05d}": cards.CardEntry(uri) for i, uri in enumerate(uris)}
+    reader = rfid.Reader({"name": "bench"})
+    rfid.stop_event.clear()
+    swiped = []
+    with contextlib.redirect_stdout(io.StringIO()):  # handle_uid prints every swipe
+        instance = spot.SpotInstance(ACCOUNT, args.device)
+        dispatcher = threading.Thread(target=rfid._dispatch, args=(lambda zone: instance,), daemon=True)
+        dispatcher.start()
+        for i, uid in enumerate(rfid.swipe_data):
+            swiped.append((time.monotonic(), uris[i]))
+            rfid.publish(reader, uid)
+            time.sleep(args.interval)
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        while not rfid._queue().empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        rfid.stop_event.set()
+        dispatcher.join()  # returns once the command in hand has finished
+    proxy.stop()
+
+    # Match each delivery to the earliest pending swipe of its URI
+    pending = list(swiped)
+    latencies = []
+    for at, _, _, body in proxy.delivered:
+        uri = _delivered_uri(body)
+        for index, (swiped_at, swiped_uri) in enumerate(pending):
+            if swiped_uri == uri and swiped_at <= at:
+                latencies.append(at - swiped_at)
+                del pending[index]
+                break
+    return sorted(latencies), len(pending), proxy.counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", nargs="*", choices=sorted(SCENARIOS), help="default: all")
+    parser.add_argument("--swipes", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between swipes")
+    parser.add_argument("--upstream", help='"real" for Spotify, or "ACCOUNTS_URL,API_URL"; default: built-in fake')
+    parser.add_argument("--device", default=FAKE_DEVICE)
+    parser.add_argument("--uris", type=lambda s: s.split(","), help="track URIs to play (needed with a real upstream)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="show kidspot's own warnings")
+    args = parser.parse_args()
+    if args.upstream and args.upstream != "real":
+        args.upstream = tuple(args.upstream.split(",", 1))
+    if args.upstream and not args.uris:
+        parser.error("--uris is required with a real upstream")
+
+    for var in ("CLIENT_ID", "CLIENT_SECRET", "REFRESH_TOKEN"):
+        os.environ.setdefault(f"SPOTIFY_{ACCOUNT}_{var}", "bench")
+    if not args.verbose:
+        for name in ("Spot", "spotipy"):
+            logging.getLogger(name).setLevel(logging.CRITICAL)
+    install_fake_hardware()
+    rfid.DEDUP_WINDOW = 0  # every swipe is a distinct card anyway
+    # Not rfid.load_swipe_data(): the bench installs its own cards
+
+    print(f"=== Swipe→command under faults: {args.swipes} swipes every {args.interval}s, "
+          f"budgets {json.dumps(spot.BUDGETS)} ===")
+    print(f"{'scenario':<18} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  dropped  injected")
+    for name in args.scenario or SCENARIOS:
+        latencies, dropped, counts = run(name, SCENARIOS[name], args)
+        injected = ", ".join(f"{k}×{v}" for k, v in sorted(counts.items()) if k != "passed") or "-"
+        if latencies:
+            stats = " ".join(f"{_percentile(latencies, p) * 1e3:>6.0f}ms" for p in (50, 95, 99))
+            stats += f" {latencies[-1] * 1e3:>6.0f}ms"
+        else:
+            stats = f"{'-':>8} {'-':>8} {'-':>8} {'-':>8}"
+        print(f"{name:<18} {stats}  {dropped:>3}/{args.swipes:<3}  {injected}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# bench/hotloops.py
+"""Idle cost and per-call overhead of the loops that run forever.
+
+    python -m bench.hotloops                      # measure, compare with the stored baseline
+    python -m bench.hotloops --save-baseline      # measure and store as the new baseline
+    python -m bench.hotloops --json results.json  # also write the results
+
+With FakeGPIO and FakePN532 (which ready-polls like the Adafruit
+driver), each loop runs alone in its own thread:
+
+- CPU seconds per idle hour and wakeups per second (loop iterations
+  plus the fake PN532's ready polls) of the polled RFID reader, the
+  button loop and the RFID dispatcher, active and in idle power mode,
+  and of the LED engine while one LED blinks in software
+- per-call latency of the lookup and dispatch paths: rfid.publish(),
+  commands.execute(), rfid.handle_uid() for a known card and leds.blink_led()
+- the number of threads the input side of the daemon runs
+
+CPU is the loop thread's own clock (pthread_getcpuclockid), so other
+threads don't blur it. Results are compared with BASELINE by
+bench.baseline, which flags regressions (exit 1). Baselines are only
+meaningful on the machine that recorded them: regenerate on the Pi.
+"""
+import argparse
+import contextlib
+import io
+import os
+import threading
+import time
+
+import buttons
+import cards
+import commands
+import leds
+import netmon
+import power
+import rfid
+from bench import baseline
+from bench.fakes import FakePN532, FakeSpotInstance, install_fake_hardware
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "hotloops.json")
+UID = "04A1B2C3"
+
+
+class CountingHeartbeat:
+    """Stands in for supervisor.Heartbeat: counts loop iterations, stops on request."""
+
+    def __init__(self):
+        self.beats = 0
+        self._stop = threading.Event()
+
+    def beat(self):
+        self.beats += 1
+
+    def stopped(self):
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+
+
+def _thread_cpu(thread):
+    return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+
+
+def _idle_cost(target, args, seconds, extra_wakeups=lambda: 0):
+    """(CPU seconds per hour, wakeups per second) of target(*args, heartbeat=...) left idle"""
+    heartbeat = CountingHeartbeat()
+    thread = threading.Thread(target=target, args=args, kwargs={"heartbeat": heartbeat}, daemon=True)
+    thread.start()
+    time.sleep(0.5)  # past start-up
+    cpu, beats, wakeups, wall = _thread_cpu(thread), heartbeat.beats, extra_wakeups(), time.monotonic()
+    time.sleep(seconds)
+    elapsed = time.monotonic() - wall
+    cpu = _thread_cpu(thread) - cpu
+    rate = (heartbeat.beats - beats + extra_wakeups() - wakeups) / elapsed
+    heartbeat.stop()
+    power.wake("bench")  # idle waits return at once
+    thread.join(timeout=5)
+    return cpu / elapsed * 3600, rate
+
+
+def _led_cost(seconds):
+    leds.start()
+    leds.blink_led("red", duration=seconds + 1)
+    time.sleep(0.2)
+    thread = leds._engine_thread
+    cpu, wakeups, wall = _thread_cpu(thread), leds._pins["red"].wakeups, time.monotonic()
+    time.sleep(seconds)
+    elapsed = time.monotonic() - wall
+    result = ((_thread_cpu(thread) - cpu) / elapsed * 3600, (leds._pins["red"].wakeups - wakeups) / elapsed)
+    leds.turn_off_led("red")
+    return result
+
+
+def _per_call(call, iterations, batches=5):
+    """Best batch mean in microseconds (the least disturbed run)"""
+    means = []
+    for _ in range(batches):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            call()
+        means.append((time.perf_counter() - started) / iterations * 1e6)
+    return min(means)
+
+
+def _drain():
+    while not rfid._queue().empty():
+        rfid._queue().get_nowait()
+
+
+def measure(seconds, iterations):
+    results = {}
+
+    def add(name, value, unit, kind):
+        results[name] = {"value": round(value, 3), "unit": unit, "kind": kind}
+        print(f"{name:<36} {value:>10.2f} {unit}", flush=True)
+
+    install_fake_hardware()
+    netmon.check = lambda *a, **k: True
+    spot = FakeSpotInstance()
+    pn532 = FakePN532()
+    reader = rfid.Reader({"name": "bench"})
+    reader.pn532 = pn532
+    rfid.readers = {"bench": reader}
+    rfid.swipe_data = {UID: cards.CardEntry("spotify:track:" + "x" * 22, "Bench card")}
+    buttons.start()
+
+    # Idle loops, active and in idle power mode
+    loops = (
+        ("rfid_poll", rfid._reader_loop, (reader,), lambda: pn532.polls),
+        ("buttons", buttons._listener, (lambda zone: spot,), lambda: 0),
+        ("rfid_dispatch", rfid._dispatch, (lambda zone: spot,), lambda: 0),
+    )
+    for mode in ("active", "idle"):
+        for name, target, args, polls in loops:
+            if mode == "idle":
+                power._go_idle()
+            cpu, wakeups = _idle_cost(target, args, seconds, polls)
+            add(f"{name}.{mode}.cpu_s_per_hour", cpu, "s/h", "cpu")
+            add(f"{name}.{mode}.wakeups_per_s", wakeups, "/s", "wakeups")
+    power.wake("bench")
+
+    cpu, wakeups = _led_cost(seconds)
+    add("leds_blink.cpu_s_per_hour", cpu, "s/h", "cpu")
+    add("leds_blink.wakeups_per_s", wakeups, "/s", "wakeups")
+
+    # Lookup and dispatch paths
+    commands.register("bench_noop", lambda spot_instance: None)
+    rfid.DEDUP_WINDOW = 0
+    with contextlib.redirect_stdout(io.StringIO()):  # handle_uid prints every play
+        paths = {
+            "publish": _per_call(lambda: (rfid.publish(reader, UID), _drain()), iterations),
+            "execute": _per_call(lambda: commands.execute("bench_noop", spot, source="bench"), iterations),
+            "handle_uid": _per_call(lambda: rfid.handle_uid(UID, spot), iterations),
+        }
+    for name, micros in paths.items():
+        add(f"{name}.us_per_call", micros, "µs", "latency")
+    add("blink_led.us_per_call", _per_call(lambda: leds.blink_led("yellow", duration=0.05), iterations),
+        "µs", "latency")
+
+    # Threads of the whole input side
+    before = threading.active_count()
+    rfid.stop_event.clear()
+    buttons._stop_listener = False
+    rfid.listener(lambda zone: spot)
+    buttons.button_listener(lambda zone: spot)
+    power.start()
+    netmon.start()
+    time.sleep(0.5)
+    add("input_side.threads", threading.active_count() - before, "threads", "threads")
+    rfid.stop_event.set()
+    buttons._stop_listener = True
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0, help="per idle measurement")
+    parser.add_argument("-n", "--iterations", type=int, default=2000, help="per latency batch")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args()
+
+    print(f"=== Hot loops: {args.seconds:.0f}s per idle loop, {args.iterations} calls per latency batch ===")
+    results = measure(args.seconds, args.iterations)
+    if args.json:
+        baseline.save(args.json, results)
+    if args.save_baseline:
+        baseline.save(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+    print()
+    regressed = baseline.compare(baseline.load(args.baseline), results)
+    print(f"FAIL: {len(regressed)} regression(s)" if regressed else "PASS")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
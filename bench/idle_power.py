@@ -0,0 +1,103 @@
+# bench/idle_power.py
+"""Idle power mode: CPU while active vs idle, and wake latency.
+
+    python -m bench.idle_power [--seconds 10] [--trials 20]
+
+Runs the real button loop and a polled RFID reader loop on a FakeGPIO
+and FakePN532, with netmon's monitor loop, and reports process CPU per
+wall second (the power proxy power.py exports) in each mode. Then, from
+idle, it presses a button or places a card and times how long until the
+command handler runs, and how long each suspended loop took to resume.
+"""
+import argparse
+import threading
+import time
+
+import buttons
+import commands
+import netmon
+import power
+import rfid
+from bench.fakes import FakePN532, install_fake_hardware
+
+
+def _percentiles(values):
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(len(values) * p / 100))] * 1e3
+    return f"p50 {pick(50):7.1f} ms  p99 {pick(99):7.1f} ms  max {values[-1] * 1e3:7.1f} ms"
+
+
+def _cpu_share(seconds):
+    cpu, wall = time.process_time(), time.monotonic()
+    time.sleep(seconds)
+    return 100.0 * (time.process_time() - cpu) / (time.monotonic() - wall)
+
+
+def _trial(trigger, undo, handled):
+    """Time from trigger() to the command handler running, starting from idle"""
+    power._go_idle()
+    time.sleep(1.5)  # let every loop settle into its idle wait
+    handled.clear()
+    started = time.monotonic()
+    trigger()
+    if not handled.wait(5):
+        undo()
+        return None
+    elapsed = handled.at - started
+    undo()
+    time.sleep(0.4)  # past the button debounce
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+
+    gpio = install_fake_hardware()
+    netmon.check = lambda *a, **k: True  # no network needed
+    handled = threading.Event()
+
+    def probe(spot_instance):
+        handled.at = time.monotonic()
+        handled.set()
+
+    commands.register("toggle", probe)
+    commands.register("bench_card", probe)
+
+    pn532 = FakePN532()
+    reader = rfid.Reader({"name": "bench", "command": "bench_card"})
+    reader.pn532 = pn532
+    rfid.readers = {"bench": reader}
+    rfid.DEDUP_WINDOW = 0
+    buttons.button_listener(None)
+    for target, thread_args in ((rfid._reader_loop, (reader,)), (rfid._dispatch, (lambda zone: None,)),
+                                (netmon._monitor, ())):
+        threading.Thread(target=target, args=thread_args, daemon=True).start()
+
+    print(f"=== Idle power mode ({args.seconds:.0f}s per mode, {args.trials} wake trials per input) ===")
+    active = _cpu_share(args.seconds)
+    power._go_idle()
+    idle = _cpu_share(args.seconds)
+    reads_before = pn532.reads
+    time.sleep(args.seconds)
+    idle_reads = (pn532.reads - reads_before) / args.seconds
+    power.wake("bench")
+    print(f"CPU active: {active:6.2f} %   idle: {idle:6.2f} %   "
+          f"(PN532 reads/s while idle: {idle_reads:.2f}, power-downs: {pn532.power_downs})")
+
+    pin = buttons.BUTTON_PINS["play"]
+    press = [_trial(lambda: gpio.press(pin), lambda: gpio.release(pin), handled) for _ in range(args.trials)]
+    swipe = [_trial(lambda: pn532.place(b"\x04\x01\x02\x03"), pn532.remove, handled) for _ in range(args.trials)]
+    for name, results in (("button → command", press), ("card → command", swipe)):
+        done = [r for r in results if r is not None]
+        missed = len(results) - len(done)
+        print(f"{name:<18} {_percentiles(done) if done else 'no samples'}  missed {missed}")
+    resumed = power.WAKE_SECONDS
+    for (loop,), child in sorted(resumed._children.items()):
+        print(f"resume {loop:<12} mean {1e3 * child.total / max(1, child.count):7.1f} ms over {child.count} wakes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# bench/ipc_jitter.py
+"""Input-loop jitter: single process vs split processes (ipc.py).
+
+    python -m bench.ipc_jitter [--seconds 10] [--load-threads 2]
+
+An input loop ticks every 10 ms like the button/RFID pollers and sends a
+command every 10th tick. Meanwhile "Spotify work" parses full-size
+playback responses in a tight loop and the LED engine breathes all LEDs.
+
+- single: everything in one process; commands run in the input thread.
+- split:  ipc.split(); the Spotify work and command execution run in the
+          control process, the input loop and LEDs in the hardware process.
+
+Reported per mode: how late each tick woke up (jitter) and how long a
+command took from the input tick to its handler starting. Needs
+sysv_ipc for the split run.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import commands
+import leds
+from bench.fakes import FakeSpotInstance, install_fake_hardware
+
+TICK = 0.01
+COMMAND_EVERY = 10
+
+
+def _percentiles(values):
+    values = sorted(values)
+    if not values:
+        return "no samples"
+    pick = lambda p: values[min(len(values) - 1, int(len(values) * p / 100))] * 1e3
+    return f"p50 {pick(50):.3f} ms  p99 {pick(99):.3f} ms  max {values[-1] * 1e3:.3f} ms  (n={len(values)})"
+
+
+def _raw_playback(i):
+    """A current_playback() body about the size of the real thing"""
+    artists = [{"name": f"Artist {i}", "uri": "spotify:artist:x", "external_urls": {"spotify": "https://x"}}] * 3
+    images = [{"url": "https://i.scdn.co/image/x", "height": h, "width": h} for h in (640, 300, 64)]
+    album = {"name": "Album", "artists": artists, "images": images, "available_markets": ["GB", "US"] * 80}
+    item = {"uri": f"spotify:track:{i:022d}", "name": "Track", "album": album, "artists": artists,
+            "available_markets": ["GB", "US"] * 80, "duration_ms": 200000}
+    return json.dumps({"is_playing": True, "item": item, "device": {"id": "d", "volume_percent": 50},
+                       "progress_ms": i, "context": {"uri": "spotify:album:x", "type": "album"}})
+
+
+def _spotify_work(stop):
+    bodies = [_raw_playback(i) for i in range(8)]
+    i = 0
+    while not stop.is_set():
+        json.loads(bodies[i % len(bodies)])
+        i += 1
+
+
+def _start_load(threads):
+    stop = threading.Event()
+    for _ in range(threads):
+        threading.Thread(target=_spotify_work, args=(stop,), daemon=True).start()
+    return stop
+
+
+def _input_loop(seconds, target):
+    lateness = []
+    deadline = time.monotonic() + seconds
+    tick = 0
+    while time.monotonic() < deadline:
+        # Relative sleeps like the real pollers: lateness is per tick, not accumulated
+        wake_at = time.monotonic() + TICK
+        time.sleep(TICK)
+        now = time.monotonic()
+        lateness.append(now - wake_at)
+        tick += 1
+        if tick % COMMAND_EVERY == 0:
+            commands.execute("bench_probe", target, source="bench", t=now)
+    return lateness
+
+
+def _register_probe(delays):
+    commands.register("bench_probe", lambda spot_instance, t: delays.append(time.monotonic() - t))
+
+
+def _breathe_all():
+    for led_name in leds.colours:
+        leds.breathe_led(led_name)
+
+
+def run_single(seconds, load_threads):
+    delays = []
+    _register_probe(delays)
+    leds.start()
+    _breathe_all()
+    stop = _start_load(load_threads)
+    try:
+        lateness = _input_loop(seconds, FakeSpotInstance())
+    finally:
+        stop.set()
+    return lateness, delays
+
+
+def run_split(seconds, load_threads):
+    import ipc
+    from supervisor import Supervisor
+
+    results = os.path.join(tempfile.mkdtemp(), "control.json")
+    delays = []
+    _register_probe(delays)
+    role = ipc.split()
+    supervisor = Supervisor()
+    if role == "control":
+        spot = FakeSpotInstance()
+        stop = _start_load(load_threads)
+        ipc.start_control(lambda zone: spot, supervisor)
+        time.sleep(seconds + 1.0)
+        stop.set()
+        with open(results, "w") as f:
+            json.dump(delays, f)
+        os._exit(0)
+
+    leds.start()
+    ipc.start_hardware(supervisor)
+    _breathe_all()
+    lateness = _input_loop(seconds, ipc.remote_route(commands.DEFAULT_ZONE))
+    os.waitpid(ipc._child, 0)
+    ipc.stop()  # the control process has already exited; this removes the queue and status block
+    with open(results) as f:
+        return lateness, json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--load-threads", type=int, default=2)
+    parser.add_argument("--mode", choices=("both", "single", "split"), default="both")
+    args = parser.parse_args()
+
+    install_fake_hardware()
+    modes = ("single", "split") if args.mode == "both" else (args.mode,)
+    print(f"=== Input jitter, {args.seconds:.0f}s per mode, {args.load_threads} Spotify load thread(s) ===", flush=True)
+    for mode in modes:
+        if mode == "split":
+            try:
+                import sysv_ipc  # noqa: F401
+            except ImportError:
+                print("split: skipped (sysv_ipc not installed)", flush=True)
+                continue
+            # Fresh processes: the single run's threads must not leak into the split run
+            pid = os.fork()
+            if pid:
+                os.waitpid(pid, 0)
+                continue
+            lateness, delays = run_split(args.seconds, args.load_threads)
+        else:
+            pid = os.fork()
+            if pid:
+                os.waitpid(pid, 0)
+                continue
+            lateness, delays = run_single(args.seconds, args.load_threads)
+        print(f"{mode:>6} tick lateness:   {_percentiles(lateness)}")
+        print(f"{mode:>6} input→command:   {_percentiles(delays)}", flush=True)
+        os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bench/log_overhead.py
+"""Caller-side cost of a log line: direct print() vs logpipe.
+
+    python -m bench.log_overhead [-n 5000] [--sink-delay-ms 1.0]
+
+The console is a stand-in for a slow journald/SD card that takes
+--sink-delay-ms per write. "direct" prints straight to it, like the
+daemon did before logpipe; "logpipe" measures print() and log.info()
+after logpipe.install(), where the writer thread absorbs the delay.
+Calls are spaced out (--gap-ms) so the queue never fills, as on the
+swipe path. Finally an unknown-card storm shows the repeat limiter.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import logpipe
+
+
+class SlowSink:
+    def __init__(self, delay):
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _percentiles(values):
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(len(values) * p / 100))] * 1e6
+    return f"p50 {pick(50):8.2f} µs  p99 {pick(99):8.2f} µs  max {values[-1] * 1e6:9.2f} µs"
+
+
+def _measure(call, n, gap):
+    timings = []
+    for i in range(n):
+        started = time.perf_counter()
+        call(i)
+        timings.append(time.perf_counter() - started)
+        if gap:
+            time.sleep(gap)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=5000)
+    parser.add_argument("--sink-delay-ms", type=float, default=1.0)
+    parser.add_argument("--gap-ms", type=float, default=2.0, help="pause between calls")
+    args = parser.parse_args()
+    delay, gap = args.sink_delay_ms / 1000, args.gap_ms / 1000
+
+    print(f"=== Log call overhead, sink {args.sink_delay_ms} ms/write, {args.n} calls ===")
+    sink = SlowSink(delay)
+    direct = _measure(lambda i: print(f"🎵 Playing: Card {i}", file=sink), args.n, gap)
+
+    log_file = os.path.join(tempfile.mkdtemp(), "kidspot.log")
+    logpipe.REPEAT_BURST = args.n * 2  # measure the pipeline, not the limiter
+    logpipe.install(log_file=log_file, console=SlowSink(delay))
+    log = logging.getLogger("Bench")
+    piped_print = _measure(lambda i: print(f"🎵 Playing: Card {i}"), args.n, gap)
+    piped_log = _measure(lambda i: log.info(f"▶️ Playback started on Bench ({i})"), args.n, gap)
+    logpipe.stop()
+
+    # Unknown-card storm through the repeat limiter
+    logpipe.REPEAT_BURST = 5
+    storm_file = os.path.join(tempfile.mkdtemp(), "kidspot.log")
+    logpipe.install(log_file=storm_file, console=SlowSink(0))
+    for i in range(1000):
+        print(f"⚠️ Unknown card: {i:08X}")
+    logpipe.stop()
+    with open(storm_file, encoding="utf-8") as f:
+        storm_lines = sum(1 for _ in f)
+
+    print(f"direct print:      {_percentiles(direct)}")
+    print(f"logpipe print():   {_percentiles(piped_print)}")
+    print(f"logpipe log.info:  {_percentiles(piped_log)}")
+    print(f"dropped records:   {logpipe.DROPPED.labels().value}")
+    print(f"unknown-card storm: 1000 prints -> {storm_lines} lines written (burst {logpipe.REPEAT_BURST} + summary)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# bench/metrics_overhead.py
+"""Cost of metrics instrumentation on the swipe and button paths.
+
+    python -m bench.metrics_overhead
+
+Times rfid.handle_uid and the per-press button bookkeeping with the real
+metrics and again with no-op metrics swapped in, and prints the
+difference per call.
+"""
+import contextlib
+import io
+import time
+
+import cards
+import metrics
+import rfid
+import buttons
+from bench.fakes import FakeSpotInstance, install_fake_hardware
+
+ITERATIONS = 20000
+
+
+class _Noop:
+    def labels(self, *values):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+def _per_call(fn, iterations=ITERATIONS):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def _measure():
+    spot = FakeSpotInstance()
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        swipe = _per_call(lambda: rfid.handle_uid("BENCH", spot))
+        unknown = _per_call(lambda: rfid.handle_uid("NOPE", spot), ITERATIONS // 10)
+    press = _per_call(lambda: buttons.PRESSES.labels("play").inc())
+    return swipe, unknown, press
+
+
+def main():
+    install_fake_hardware()
+    rfid.swipe_data = {"BENCH": cards.CardEntry("spotify:track:bench", "Bench")}
+
+    print("=== Metrics overhead ===")
+    instrumented = _measure()
+    saved = rfid.SWIPES, rfid.SWIPE_SECONDS, buttons.PRESSES
+    rfid.SWIPES = rfid.SWIPE_SECONDS = buttons.PRESSES = _Noop()
+    try:
+        baseline = _measure()
+    finally:
+        rfid.SWIPES, rfid.SWIPE_SECONDS, buttons.PRESSES = saved
+
+    for name, with_metrics, without in zip(("known swipe", "unknown swipe", "button press"), instrumented, baseline):
+        overhead = with_metrics - without
+        print(f"{name:<14} {with_metrics * 1e6:8.2f} µs/call  "
+              f"(no-op metrics {without * 1e6:8.2f} µs, overhead {overhead * 1e6:+.2f} µs)")
+
+    render = _per_call(metrics.render, 200)
+    print(f"{'scrape render':<14} {render * 1e3:8.2f} ms/scrape")
+
+
+if __name__ == "__main__":
+    main()
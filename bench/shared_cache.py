@@ -0,0 +1,83 @@
+# bench/shared_cache.py
+"""Shared cache check: N boxes, one token refresh.
+
+    redis-server --port 6399 &
+    python -m bench.shared_cache [--url redis://localhost:6399/15] [--boxes 8] [--rounds 5]
+
+Forks --boxes processes that all ask sharedcache.token() for the same
+account at once, --rounds times, deleting the token between rounds.
+fetch() stands in for the Spotify token endpoint (FETCH_SECONDS each)
+and counts its calls in Redis. PASS means exactly one fetch per round,
+every box got the same token, and no box waited much longer than one
+fetch. Uses its own key prefix; run it against a scratch database.
+"""
+import argparse
+import os
+import time
+
+import sharedcache
+
+FETCH_SECONDS = 0.3
+ACCOUNT = "BENCH"
+
+
+def _box(client, round_no, start_at, results_key):
+    def fetch():
+        client.incr(f"{sharedcache.PREFIX}:fetches:{round_no}")
+        time.sleep(FETCH_SECONDS)
+        return f"token-{round_no}-{os.getpid()}", 3600
+
+    time.sleep(max(0.0, start_at - time.time()))
+    started = time.monotonic()
+    token, _ = sharedcache.token(ACCOUNT, fetch)
+    client.rpush(results_key, f"{token} {time.monotonic() - started:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=os.getenv("KIDSPOT_REDIS_URL") or "redis://localhost:6399/15")
+    parser.add_argument("--boxes", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    sharedcache.REDIS_URL = args.url
+    sharedcache.PREFIX = "kidspot-bench"
+    client = sharedcache._redis()
+    client.ping()
+    for key in client.scan_iter(f"{sharedcache.PREFIX}:*"):
+        client.delete(key)
+
+    failures = 0
+    print(f"=== Shared token refresh: {args.boxes} boxes x {args.rounds} rounds at {args.url} ===")
+    for round_no in range(args.rounds):
+        results_key = f"{sharedcache.PREFIX}:results:{round_no}"
+        start_at = time.time() + 0.2
+        pids = []
+        for _ in range(args.boxes):
+            pid = os.fork()
+            if pid == 0:
+                sharedcache._client = None  # a fresh connection per process
+                try:
+                    _box(sharedcache._redis(), round_no, start_at, results_key)
+                finally:
+                    os._exit(0)
+            pids.append(pid)
+        for pid in pids:
+            os.waitpid(pid, 0)
+
+        fetches = int(client.get(f"{sharedcache.PREFIX}:fetches:{round_no}") or 0)
+        rows = [r.decode().split() for r in client.lrange(results_key, 0, -1)]
+        tokens = {token for token, _ in rows}
+        slowest = max(float(seconds) for _, seconds in rows)
+        ok = fetches == 1 and len(tokens) == 1 and len(rows) == args.boxes
+        failures += not ok
+        print(f"round {round_no}: {fetches} fetch(es), {len(tokens)} distinct token(s), "
+              f"slowest box {slowest * 1000:.0f} ms{'' if ok else '  ← FAIL'}")
+        client.delete(sharedcache._key("token", ACCOUNT))
+
+    print("PASS" if not failures else f"FAIL: {failures} round(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
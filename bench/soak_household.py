@@ -0,0 +1,268 @@
+# bench/soak_household.py
+"""Days of household use in virtual time: input timing, idle mode, token expiry.
+
+    python -m bench.soak_household [--days 7] [--seed 1]
+
+Installs a clock.VirtualClock and runs the real loops (polled RFID
+reader, dispatcher, button loop, LED engine, idle monitor) on FakeGPIO
+and a FakePN532, against a fake player that asks a real
+spot.AccountSession for its token on every call (fetching is faked,
+expiry is real). A seeded household swipes cards and presses play,
+volume, next and double-presses prev through three sessions a day; the
+clock skips the quiet in between, so a day takes seconds.
+
+The run fails if any input did not run its command within the time the
+poll intervals allow, a double press did not skip back exactly once, a
+Spotify call went out with an expired token, a token was refetched
+before it was due, or the box was not idle IDLE_AFTER after a session.
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+
+import buttons
+import clock
+import commands
+import leds
+import power
+import rfid
+import spot
+from bench.fakes import FakePN532, FakeSpotInstance, install_fake_hardware
+from cards import CardEntry
+from spot import PlaybackState
+
+DAY = 86400
+SESSIONS = ((7 * 3600, 40 * 60), (16 * 3600, 60 * 60), (19 * 3600, 30 * 60))  # (start, length), seconds
+JITTER = 15 * 60          # seconds either side of a session's usual start
+EVENT_GAP = (120, 600)    # seconds between inputs during a session
+UNKNOWN_RATIO = 0.1
+CARD_HOLD = 2.0           # seconds a card stays on the reader
+PRESS_HOLD = 0.1          # seconds a button is held down
+DOUBLE_PRESS_GAP = 0.35   # seconds between the presses of a double press
+READY_POLL = rfid.POLL_TIMEOUT  # FakePN532 checks once per read (pessimistic card latency, far fewer steps)
+# Longest input-to-command time the loops allow, in virtual seconds
+CARD_LIMIT = rfid.POLL_TIMEOUT + power.IDLE_POLL_INTERVAL + 0.5
+BUTTON_LIMIT = buttons.DEBOUNCE + buttons.POLL_INTERVAL + 0.1
+UIDS = [f"04{i:06X}" for i in range(1, 21)]
+
+
+class _HouseholdSpot(FakeSpotInstance):
+    """A player that takes a token from a real AccountSession on every call."""
+
+    def __init__(self):
+        super().__init__()
+        self.playing = False
+        self.previous = 0
+        self.session = spot.AccountSession("SOAK")
+        self.session._fetch_token = self._fetch_token
+        self.fetched_at = []
+        self.expires = {}  # {token: virtual time it expires}
+        self.expired_calls = 0
+
+    def _fetch_token(self):
+        token = f"token-{len(self.fetched_at)}"
+        self.fetched_at.append(clock.monotonic())
+        self.expires[token] = clock.monotonic() + spot.TOKEN_LIFETIME
+        return token, spot.TOKEN_LIFETIME
+
+    def _call(self):
+        super()._call()
+        if clock.monotonic() >= self.expires[self.session.get_access_token()]:
+            self.expired_calls += 1
+
+    def play_url(self, url):
+        self.playing = True
+        return super().play_url(url)
+
+    def pause(self):
+        super().pause()
+        self.playing = False
+
+    def get_current_playback(self, fresh=False):
+        self._call()
+        return PlaybackState(self.playing, "spotify:track:soak", self.device_id, 50)
+
+    def previous_track(self, device_id=None):
+        super().previous_track(device_id)
+        self.previous += 1
+
+
+class Household:
+    """Drives inputs at virtual times and checks what came of them."""
+
+    def __init__(self, virtual, gpio, pn532, player, rng):
+        self.clock = virtual
+        self.gpio = gpio
+        self.pn532 = pn532
+        self.player = player
+        self.rng = rng
+        self.start = virtual.now
+        self.ran = []  # (command, virtual time), from the commands hold hook
+        self.latency = {"card": [], "button": []}
+        self.inputs = {"cards": 0, "unknown cards": 0, "button presses": 0, "double presses": 0}
+        self.missed = []
+        self.not_idle = 0
+        commands.set_hold(self._record)
+
+    def _record(self, name, spot_instance, source, args):
+        self.ran.append((name, self.clock.now))
+        return False
+
+    def _wait(self, kind, command, before, started, limit, count=1):
+        """Advance until command has run count times since ran[before], or limit has passed"""
+        def done():
+            return sum(1 for name, _ in self.ran[before:] if name == command) >= count
+
+        if not self.clock.advance(max(0.0, started + limit - self.clock.now), until=done):
+            self.missed.append(f"{kind} {command} at {self.elapsed() / 3600:.2f} h")
+            return
+        self.latency[kind].append([t for name, t in self.ran[before:] if name == command][-1] - started)
+
+    def elapsed(self):
+        return self.clock.now - self.start
+
+    def card(self):
+        unknown = self.rng.random() < UNKNOWN_RATIO
+        uid = f"{self.rng.getrandbits(32):08X}" if unknown else self.rng.choice(UIDS)
+        self.inputs["unknown cards" if unknown else "cards"] += 1
+        before, started = len(self.ran), self.clock.now
+        self.pn532.place(bytes.fromhex(uid))
+        self._wait("card", "play_card", before, started, CARD_LIMIT)
+        self.clock.advance(max(0.0, started + CARD_HOLD - self.clock.now))
+        self.pn532.remove()
+
+    def press(self, button):
+        self.inputs["button presses"] += 1
+        before, started = len(self.ran), self.clock.now
+        self._tap(button)
+        self._wait("button", buttons.BUTTON_COMMANDS[button], before, started, BUTTON_LIMIT)
+        self.clock.advance(buttons.DEBOUNCE)
+
+    def double_press(self):
+        self.inputs["double presses"] += 1
+        previous = self.player.previous
+        before, started = len(self.ran), self.clock.now
+        self._tap("prev")
+        self.clock.advance(DOUBLE_PRESS_GAP - PRESS_HOLD)
+        self._tap("prev")
+        self._wait("button", "prev", before, started, DOUBLE_PRESS_GAP + BUTTON_LIMIT, count=2)
+        self.clock.advance(buttons.DEBOUNCE)
+        if self.player.previous != previous + 1:
+            self.missed.append(f"double press at {self.elapsed() / 3600:.2f} h skipped back "
+                               f"{self.player.previous - previous} times")
+
+    def _tap(self, button):
+        pin = buttons.BUTTON_PINS[button]
+        self.gpio.press(pin)
+        self.clock.advance(PRESS_HOLD)
+        self.gpio.release(pin)
+
+    def session(self, length):
+        end = self.clock.now + length
+        self.card()
+        actions = ((self.card, 3), (lambda: self.press("play"), 2), (lambda: self.press("volu"), 2),
+                   (lambda: self.press("vold"), 2), (lambda: self.press("next"), 2), (self.double_press, 1))
+        while True:
+            gap = self.rng.uniform(*EVENT_GAP)
+            if self.clock.now + gap >= end:
+                break
+            self.clock.advance(gap)
+            self.rng.choices([a for a, _ in actions], [w for _, w in actions])[0]()
+        self.clock.advance(max(0.0, end - self.clock.now))
+        if self.player.playing:
+            self.press("play")
+        # Quiet from here: the box should be idle once IDLE_AFTER has passed
+        self.clock.advance(power.IDLE_AFTER + 2 * power.CHECK_INTERVAL)
+        if not power.is_idle():
+            self.not_idle += 1
+
+    def day(self, day):
+        for start, length in SESSIONS:
+            at = self.start + day * DAY + start + self.rng.uniform(-JITTER, JITTER)
+            self.clock.advance(max(0.0, at - self.clock.now))
+            self.session(length)
+        self.clock.advance(max(0.0, self.start + (day + 1) * DAY - self.clock.now))
+
+
+def _percentiles(values):
+    if not values:
+        return "no samples"
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(len(values) * p / 100))] * 1e3
+    return f"p50 {pick(50):6.0f} ms  p99 {pick(99):6.0f} ms  max {values[-1] * 1e3:6.0f} ms"
+
+
+def _start_loops(route, reader):
+    loops = ((buttons._listener, (route,)), (rfid._reader_loop, (reader,)), (rfid._dispatch, (route,)),
+             (power._monitor, ()))
+    for target, args in loops:
+        threading.Thread(target=target, args=args, daemon=True).start()
+    return len(loops) + 1  # + the LED engine
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    midnight = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+    virtual = clock.use(clock.VirtualClock(wall=midnight))
+    gpio = install_fake_hardware()
+    leds.start()
+    buttons.start()
+    pn532 = FakePN532(ready_poll=READY_POLL)
+    reader = rfid.Reader({"name": "soak"})
+    reader.pn532 = pn532
+    rfid.readers = {"soak": reader}
+    rfid.swipe_data = {uid: CardEntry(f"spotify:album:{i:022d}", f"Album {i}") for i, uid in enumerate(UIDS)}
+    player = _HouseholdSpot()
+    power.keep_awake_while(lambda: player.playing)
+    loops = _start_loops(lambda zone=commands.DEFAULT_ZONE: player, reader)
+    while virtual.participants < loops:
+        time.sleep(0.01)
+
+    house = Household(virtual, gpio, pn532, player, random.Random(args.seed))
+    print(f"=== Household soak: {args.days} simulated days (seed {args.seed}, idle after {power.IDLE_AFTER:.0f}s) ===")
+    out = sys.stdout
+    started = time.perf_counter()
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for day in range(args.days):
+            day_started, steps = time.perf_counter(), virtual.steps
+            house.day(day)
+            print(f"day {day + 1}: {time.perf_counter() - day_started:5.1f}s real, {virtual.steps - steps:,} clock steps, "
+                  f"{len(house.missed)} missed so far", file=out, flush=True)
+    real = time.perf_counter() - started
+    rfid.stop_event.set()
+    buttons._stop_listener = True
+    virtual.advance(power.IDLE_WAIT)
+
+    simulated = house.elapsed()
+    print(f"\nSimulated {simulated / 3600:.0f} h in {real:.1f}s ({simulated / real:,.0f}x), "
+          f"{virtual.steps:,} clock steps, {virtual.stalls} stalls")
+    print("inputs: " + ", ".join(f"{count} {kind}" for kind, count in house.inputs.items()))
+    for kind, values in house.latency.items():
+        print(f"{kind:>6} → command  {_percentiles(values)}")
+
+    gaps = [b - a for a, b in zip(player.fetched_at, player.fetched_at[1:])]
+    early = [gap for gap in gaps if gap < spot.TOKEN_LIFETIME - spot.TOKEN_MARGIN - 1]
+    print(f"tokens: {len(player.fetched_at)} fetched for {player.calls} calls, "
+          f"shortest gap {min(gaps, default=0) / 60:.0f} min, {player.expired_calls} calls with an expired token")
+    idle = power.MODE_SECONDS.labels(power.IDLE).value
+    active = power.MODE_SECONDS.labels(power.ACTIVE).value
+    print(f"idle: {power.TRANSITIONS.labels(power.IDLE, 'timeout').value:.0f} transitions, "
+          f"{100 * idle / max(1.0, idle + active):.1f}% of the time, {house.not_idle} sessions not followed by idle")
+    for problem in house.missed[:10]:
+        print(f"  missed: {problem}")
+
+    failed = house.missed or player.expired_calls or early or house.not_idle
+    print("FAIL" if failed else "PASS")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# bench/soak_memory.py
+"""Memory soak: a simulated week of household events, as fast as possible.
+
+    python -m bench.soak_memory [days]
+
+Each simulated day drives swipes (known and unknown cards), button
+presses, playback-state fetches with full-size API responses, LED
+patterns and metrics scrapes through the real code paths with fake
+hardware and Spotify. The flight recorder ring is filled first, so its
+slots filling up over the week does not read as growth.
+Traced Python memory and RSS are printed per day; the run fails if
+traced memory moves by more than FLAT_EPSILON from one day to the next
+over the last FLAT_DAYS days, or grows by more than ALLOWED_GROWTH
+after day 1.
+"""
+import contextlib
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+import buttons
+import cards
+import flightrec
+import leds
+import membudget
+import metrics
+import rfid
+from bench.fakes import FakeSpotInstance, install_fake_hardware
+from spot import PlaybackState
+
+SWIPES_PER_DAY = 400
+UNKNOWN_RATIO = 0.2
+PRESSES_PER_DAY = 1500
+PLAYBACK_FETCHES_PER_DAY = 3000
+SCRAPES_PER_DAY = 96
+ALLOWED_GROWTH = 256 * 1024  # bytes of traced memory after day 1
+FLAT_DAYS = 3                # the last days whose day-to-day change must stay within FLAT_EPSILON
+FLAT_EPSILON = 4 * 1024      # bytes
+
+
+def _raw_playback(i):
+    """A current_playback() response about the size of the real thing."""
+    artists = [{"name": f"Artist {i % 7}", "uri": "spotify:artist:x", "external_urls": {"spotify": "https://x"}}]
+    return {
+        "is_playing": i % 3 != 0,
+        "progress_ms": i * 1000,
+        "device": {"id": "fake-device", "name": "raspotify", "volume_percent": 40 + i % 20, "type": "Speaker"},
+        "item": {
+            "uri": f"spotify:track:{i:022d}",
+            "name": f"Track {i}",
+            "artists": artists,
+            "album": {"name": f"Album {i % 50}", "artists": artists,
+                      "images": [{"url": f"https://i.scdn.co/image/{i}", "height": 640, "width": 640}] * 3},
+            "available_markets": ["GB", "US", "DE", "FR", "NL", "SE"] * 20,
+        },
+    }
+
+
+class _SoakSpot(FakeSpotInstance):
+    def get_current_playback(self, fresh=False):
+        self._call()
+        self.last = PlaybackState.from_api(_raw_playback(self.calls))
+        return self.last
+
+
+def _simulate_day(day, spot, known_uids, rng):
+    for i in range(SWIPES_PER_DAY):
+        if rng.random() < UNKNOWN_RATIO:
+            rfid.handle_uid(f"{rng.getrandbits(32):08X}", spot)
+        else:
+            rfid.handle_uid(rng.choice(known_uids), spot)
+    actions = (buttons._toggle_play, buttons._next_track, buttons._restart_or_prev,
+               buttons._vol_up, buttons._vol_down)
+    for i in range(PRESSES_PER_DAY):
+        name = rng.choice(list(buttons.BUTTON_PINS))
+        buttons.PRESSES.labels(name).inc()
+        rng.choice(actions)(spot)
+    for i in range(PLAYBACK_FETCHES_PER_DAY):
+        spot.get_current_playback()
+    for i in range(SCRAPES_PER_DAY):
+        metrics.render()
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    rng = random.Random(42)
+    install_fake_hardware()
+    leds.init_leds()
+    rfid.swipe_data = cards.compile_cards({
+        f"{i:08X}": {"URL": f"spotify:album:{i:022d}", "METADATA": {"Album": f"Album {i}", "Artist": "Someone"}}
+        for i in range(200)
+    })
+    known_uids = list(rfid.swipe_data)
+    spot = _SoakSpot()
+
+    print(f"=== Memory soak: {days} simulated days (budget mode {'on' if membudget.ENABLED else 'off'}) ===")
+    tracemalloc.start()
+    baseline = None
+    rows = []
+    # Twice round the ring, so no slot is left holding a small cached int as its sequence number
+    for _ in range(2 * flightrec.SIZE):
+        flightrec.record("led", "red", "blinking")  # what the soak records: a time, thread and sequence number
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for day in range(1, days + 1):
+            _simulate_day(day, spot, known_uids, rng)
+            sink.flush()  # lines waiting in the devnull buffer are not growth
+            gc.collect()
+            traced, _ = tracemalloc.get_traced_memory()
+            rows.append((day, traced, membudget.rss_bytes()))
+            if day == 1:
+                baseline = traced
+    leds.shutdown_leds()
+
+    print(f"{'day':>4} {'traced KiB':>11} {'RSS KiB':>9}")
+    for day, traced, rss in rows:
+        print(f"{day:>4} {traced / 1024:>11.0f} {rss / 1024:>9.0f}")
+    sizes = {name: size for (name,), size in membudget.structure_sizes().items()}
+    print("structures: " + ", ".join(f"{name}={size / 1024:.1f} KiB" for name, size in sizes.items()))
+
+    growth = rows[-1][1] - baseline
+    tail = [traced for _, traced, _ in rows[-FLAT_DAYS - 1:]]
+    worst = max((abs(b - a) for a, b in zip(tail, tail[1:])), default=0)
+    verdict = "PASS" if growth <= ALLOWED_GROWTH and worst <= FLAT_EPSILON else "FAIL"
+    print(f"{verdict}: traced memory grew {growth / 1024:+.0f} KiB after day 1 (allowed {ALLOWED_GROWTH // 1024} KiB), "
+          f"largest day-to-day change over the last {FLAT_DAYS} days {worst / 1024:.1f} KiB "
+          f"(allowed {FLAT_EPSILON // 1024} KiB)")
+    return 0 if verdict == "PASS" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,19 @@
 # buttons.py
+import os
 import threading
-import RPi.GPIO as GPIO
-import time
 import logging
+import clock
+import commands
+import flightrec
+import metrics
+import power
 
 log = logging.getLogger("Buttons")
 
+PRESSES = metrics.counter("kidspot_button_presses_total", "Button presses", ["button"])
+
+GPIO = None  # RPi.GPIO, imported by start()
+
 # ---------------------------
 # Configuration
 # ---------------------------
@@ -17,13 +25,31 @@ BUTTON_PINS = {
     "vold": 26
 }
 
+# Command sent for each button (see commands.py)
+BUTTON_COMMANDS = {
+    "play": "toggle",
+    "next": "next",
+    "prev": "prev",
+    "volu": "volume_up",
+    "vold": "volume_down"
+}
+
+BUTTON_ZONE = os.getenv("KIDSPOT_BUTTON_ZONE", commands.DEFAULT_ZONE)  # device the buttons control
+
 vol_step = 5  # % increment for Spotify volume
+STALL_TIMEOUT = 30  # seconds without a loop iteration before the supervisor restarts us
+POLL_INTERVAL = 0.05
+DEBOUNCE = 0.3  # seconds after a press before the buttons are read again
+DOUBLE_PRESS_WINDOW = 0.5  # seconds between prev presses that skip back instead of restarting
+IDLE_POLL_INTERVAL = 0.1  # idle polling when edge detection is unavailable
 
 # Internal state
 _stop_listener = False
 _listener_thread = None
 _last_prev_press = 0
 _prev_press_count = 0
+_edges = False       # GPIO edge detection armed on every button
+_edge_pin = None     # pin whose edge woke the box from idle
 
 # ---------------------------
 # Helper functions
@@ -31,12 +57,12 @@ _prev_press_count = 0
 def _toggle_play(spot_instance):
     if not spot_instance:
         return
-    playback = spot_instance.get_current_playback()
-    if playback and playback.get("is_playing", False):
+    playback = spot_instance.get_current_playback(fresh=True)
+    if playback and playback.is_playing:
         spot_instance.pause()
     else:
-        if playback and playback.get("item"):
-            spot_instance.play_url(playback["item"]["uri"])
+        if playback and playback.item_uri:
+            spot_instance.play_url(playback.item_uri)
         else:
             log.info("Play pressed but no track available")
 
@@ -44,7 +70,7 @@ def _next_track(spot_instance):
     """Send Spotify API call to skip to the next track"""
     if spot_instance and spot_instance.sp and spot_instance.device_id:
         try:
-            spot_instance.sp.next_track(device_id=spot_instance.device_id)
+            spot_instance.api("play").next_track(device_id=spot_instance.device_id)
             log.info("Next track triggered")
         except Exception as e:
             log.warning(f"Next track error: {e}")
@@ -53,7 +79,7 @@ def _prev_track(spot_instance):
     """Send Spotify API call to skip to the previous track"""
     if spot_instance and spot_instance.sp and spot_instance.device_id:
         try:
-            spot_instance.sp.previous_track(device_id=spot_instance.device_id)
+            spot_instance.api("play").previous_track(device_id=spot_instance.device_id)
             log.info("Previous track triggered")
         except Exception as e:
             log.warning(f"Previous track error: {e}")
@@ -61,8 +87,8 @@ def _prev_track(spot_instance):
 def _restart_or_prev(spot_instance):
     """Short press: restart track; double press: previous track"""
     global _last_prev_press, _prev_press_count
-    now = time.time()
-    if now - _last_prev_press < 0.5:  # double press window
+    now = clock.monotonic()
+    if now - _last_prev_press < DOUBLE_PRESS_WINDOW:
         _prev_press_count += 1
     else:
         _prev_press_count = 1
@@ -73,72 +99,105 @@ def _restart_or_prev(spot_instance):
         _prev_press_count = 0
     else:
         # restart current track
-        playback = spot_instance.get_current_playback()
-        if playback and playback.get("item"):
-            spot_instance.play_url(playback["item"]["uri"])
+        playback = spot_instance.get_current_playback(fresh=True)
+        if playback and playback.item_uri:
+            spot_instance.play_url(playback.item_uri)
             log.info("Prev button short press - restart track")
 
+def _change_volume(spot_instance, step):
+    """Step the volume from the device's current one (set_volume clamps and logs errors)"""
+    if not spot_instance:
+        return
+    percent = max(0, min(100, spot_instance.current_volume() + step))
+    if spot_instance.set_volume(percent):
+        log.info(f"Volume {'increased' if step > 0 else 'decreased'} to {percent}%")
+
 def _vol_up(spot_instance):
-    if spot_instance and spot_instance.sp and spot_instance.device_id:
-        try:
-            playback = spot_instance.get_current_playback()
-            if playback:
-                current_vol = playback.get("device", {}).get("volume_percent", 50)
-                new_vol = min(100, current_vol + vol_step)
-                spot_instance.sp.volume(new_vol, device_id=spot_instance.device_id)
-                log.info(f"Volume increased to {new_vol}%")
-        except Exception as e:
-            log.warning(f"Volume up error: {e}")
+    _change_volume(spot_instance, vol_step)
 
 def _vol_down(spot_instance):
-    if spot_instance and spot_instance.sp and spot_instance.device_id:
-        try:
-            playback = spot_instance.get_current_playback()
-            if playback:
-                current_vol = playback.get("device", {}).get("volume_percent", 50)
-                new_vol = max(0, current_vol - vol_step)
-                spot_instance.sp.volume(new_vol, device_id=spot_instance.device_id)
-                log.info(f"Volume decreased to {new_vol}%")
-        except Exception as e:
-            log.warning(f"Volume down error: {e}")
+    _change_volume(spot_instance, -vol_step)
+
+commands.register("toggle", _toggle_play)
+commands.register("next", _next_track)
+commands.register("prev", _restart_or_prev)
+commands.register("volume_up", _vol_up)
+commands.register("volume_down", _vol_down)
 
 # ---------------------------
 # Button listener
 # ---------------------------
-def _listener(spot_instance):
-    global _stop_listener
+def _on_edge(pin):
+    """GPIO callback thread: only used to leave idle mode, polling handles the rest"""
+    global _edge_pin
+    if power.is_idle():
+        _edge_pin = pin
+        power.wake("button")
+
+
+def _listener(route, heartbeat=None):
+    global _stop_listener, _edge_pin
     while not _stop_listener:
+        if heartbeat is not None:
+            if heartbeat.stopped():
+                return
+            heartbeat.beat()
+        woken_by, _edge_pin = _edge_pin, None
         for name, pin in BUTTON_PINS.items():
-            if GPIO.input(pin) == GPIO.LOW:  # pressed
-                if name == "play":
-                    _toggle_play(spot_instance)
-                elif name == "next":
-                    _next_track(spot_instance)
-                elif name == "prev":
-                    _restart_or_prev(spot_instance)
-                elif name == "volu":
-                    _vol_up(spot_instance)
-                elif name == "vold":
-                    _vol_down(spot_instance)
-                time.sleep(0.3)  # debounce
-        time.sleep(0.05)
-
-def button_listener(spot_instance):
-    global _stop_listener, _listener_thread
-    _stop_listener = False
-
+            # A short press that woke the box may be released by now
+            if GPIO.input(pin) == GPIO.LOW or pin == woken_by:  # pressed
+                PRESSES.labels(name).inc()
+                flightrec.record("button", name, pin)
+                try:
+                    commands.execute(BUTTON_COMMANDS[name], route(BUTTON_ZONE), source="button")
+                except Exception as e:
+                    log.warning(f"Button {name} error: {e}")
+                clock.sleep(DEBOUNCE)
+        # Idle: wait for an edge (or, without edge detection, poll slower)
+        power.sleep(POLL_INTERVAL, power.IDLE_WAIT if _edges else IDLE_POLL_INTERVAL, "buttons")
+
+def start():
+    """Import RPi.GPIO and configure the button pins"""
+    global GPIO, _edges
+    if GPIO is None:
+        import RPi.GPIO as gpio
+        GPIO = gpio
     GPIO.setmode(GPIO.BCM)
     for pin in BUTTON_PINS.values():
         GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+    if not _edges:
+        try:
+            for pin in BUTTON_PINS.values():
+                GPIO.add_event_detect(pin, GPIO.FALLING, callback=_on_edge, bouncetime=50)
+            _edges = True
+        except RuntimeError as e:
+            log.warning(f"Button edge detection unavailable, idle mode keeps polling: {e}")
 
-    _listener_thread = threading.Thread(target=_listener, args=(spot_instance,), daemon=True)
-    _listener_thread.start()
+
+def button_listener(spot_instance, supervisor=None):
+    """Start the button thread (restarted by supervisor if given).
+
+    spot_instance may be a zone -> SpotInstance callable (see BUTTON_ZONE).
+    """
+    global _stop_listener, _listener_thread
+    _stop_listener = False
+    start()
+    route = commands.router(spot_instance)
+
+    if supervisor is not None:
+        _listener_thread = supervisor.add("buttons", _listener, args=(route,),
+                                          stall_timeout=STALL_TIMEOUT)
+    else:
+        _listener_thread = threading.Thread(target=_listener, args=(route,), daemon=True)
+        _listener_thread.start()
     log.info("Button listener started")
 
 def stop_buttons():
-    global _stop_listener, _listener_thread
+    global _stop_listener, _listener_thread, _edges
     _stop_listener = True
+    _edges = False  # cleanup() removes the edge detection
     if _listener_thread:
-        _listener_thread.join()
-    GPIO.cleanup()
+        _listener_thread.join(timeout=1)
+    if GPIO is not None:
+        GPIO.cleanup()
     log.info("Button listener stopped")
@@ -0,0 +1,105 @@
+# cards.py
+"""Card map loaded from swipe.json.
+
+Entries are compiled into slotted CardEntry records: the URL plus the
+metadata pre-joined into the one display string handle_uid prints, so
+the map costs one small object per card instead of nested dicts.
+Both key spellings written by the register tools ("URL"/"url",
+"METADATA"/"metadata") are accepted.
+
+A card can also play a list of tracks/episodes instead of one URL:
+
+    "04A3B2C1D5": {
+      "URIS": ["spotify:track:...", "https://open.spotify.com/episode/...", ...],
+      "OFFSET": 2,          # index or URI of the item to start with
+      "SHUFFLE": true,
+      "METADATA": {"Title": "Bedtime mix"}
+    }
+
+The list is resolved here, once: links become spotify: URIs and the
+offset becomes a position. A swipe is one start_playback call with at
+most PLAY_CHUNK URIs (the Web API's limit): items queued after it
+would play before the rest of the list, so longer cards play the
+PLAY_CHUNK items from the starting one (ending at the last item if
+fewer are left). A shuffled card keeps every item and draws a fresh
+PLAY_CHUNK of them, starting item first, on each swipe.
+"""
+import json
+import logging
+import random
+import re
+
+log = logging.getLogger("Cards")
+
+PLAY_CHUNK = 500  # URIs per start_playback body
+
+_OPEN_LINK = re.compile(r"https?://open\.spotify\.com/(?:intl-[a-z]+/)?(\w+)/([0-9A-Za-z]+)")
+
+
+class CardEntry:
+    __slots__ = ("url", "label", "uris", "offset", "shuffle")
+
+    def __init__(self, url, label="", uris=None, offset=0, shuffle=False):
+        self.url = url
+        self.label = label
+        self.uris = uris         # tuple of URIs for multi-item cards, else None
+        self.offset = offset     # position in uris to start at
+        self.shuffle = shuffle
+
+    def __repr__(self):
+        if self.uris:
+            return f"CardEntry({len(self.uris)} items, {self.label!r})"
+        return f"CardEntry({self.url!r}, {self.label!r})"
+
+
+def spotify_uri(url):
+    """open.spotify.com link -> spotify:<type>:<id>; anything else unchanged"""
+    match = _OPEN_LINK.match(url) if url else None
+    return f"spotify:{match.group(1)}:{match.group(2)}" if match else url
+
+
+def _compile_items(uris, offset, shuffle, label):
+    """(uris, offset) for CardEntry; non-shuffled cards are cut to PLAY_CHUNK items"""
+    uris = [spotify_uri(u) for u in uris]
+    if isinstance(offset, str):
+        offset = uris.index(spotify_uri(offset)) if spotify_uri(offset) in uris else 0
+    offset = max(0, min(int(offset or 0), len(uris) - 1))
+    if shuffle or len(uris) <= PLAY_CHUNK:
+        return tuple(uris), offset
+    start = min(offset, len(uris) - PLAY_CHUNK)
+    log.warning(f"Card {label!r} has {len(uris)} items; only items {start + 1}-{start + PLAY_CHUNK} will play")
+    return tuple(uris[start:start + PLAY_CHUNK]), offset - start
+
+
+def compile_entry(entry):
+    url = entry.get("URL") or entry.get("url")
+    metadata = entry.get("METADATA") or entry.get("metadata") or {}
+    label = " - ".join(f"{v}" for v in metadata.values())
+    uris = entry.get("URIS") or entry.get("uris")
+    if not uris:
+        return CardEntry(spotify_uri(url), label)
+    shuffle = bool(entry.get("SHUFFLE", entry.get("shuffle", False)))
+    uris, offset = _compile_items(uris, entry.get("OFFSET", entry.get("offset", 0)), shuffle, label)
+    return CardEntry(url, label, uris, offset, shuffle)
+
+
+def play_order(entry):
+    """(uris, offset) for one swipe, at most PLAY_CHUNK URIs; shuffled cards get a fresh draw each time"""
+    if not entry.shuffle:
+        return entry.uris, entry.offset
+    items = list(entry.uris)
+    first = items.pop(entry.offset) if entry.offset else None
+    random.shuffle(items)
+    if first is not None:
+        items.insert(0, first)
+    return tuple(items[:PLAY_CHUNK]), 0
+
+
+def compile_cards(raw):
+    """{uid: swipe.json entry} -> {uid: CardEntry}"""
+    return {uid.upper(): compile_entry(entry) for uid, entry in raw.items()}
+
+
+def load_cards(path):
+    with open(path, "r") as f:
+        return compile_cards(json.load(f))
@@ -0,0 +1,220 @@
+# clock.py
+"""Time for the timing logic, swappable for accelerated simulation.
+
+Button debounce and the double-press window, LED patterns, reader
+polling, idle mode, token expiry, device wake-up and the devices()
+cache read and wait on time through this module instead of the time
+module:
+
+    clock.time(), clock.monotonic(), clock.sleep(seconds)
+    clock.Event, clock.Condition, clock.Queue   (their waits and timeouts)
+
+Until use() installs a VirtualClock these are the time module's own
+functions and plain threading/queue behaviour. Virtual time only moves
+in VirtualClock.advance(): it jumps to the earliest deadline any thread
+is waiting for, releases that thread, and waits until every thread on
+the clock is blocked again before the next jump. Loops run in the same
+order as in real time, but skip the waiting, so days of household use
+take seconds (bench/soak_household.py).
+
+Waits outside this module (an IRQ edge wait, a Spotify request) still
+take real time; advance() gives a thread stuck in one SETTLE_TIMEOUT
+real seconds before moving on without it, and counts a stall.
+"""
+import queue
+import threading
+import time as _time
+
+SETTLE_TIMEOUT = 1.0  # real seconds advance() waits for a busy thread
+
+time = _time.time
+monotonic = _time.monotonic
+sleep = _time.sleep
+
+_virtual = None  # the installed VirtualClock, if any
+
+
+class VirtualClock:
+    """Simulated time that only moves in advance().
+
+    Starts at the real clocks' current readings, so times taken before
+    use() (module import, the LED timer wheel origin) stay comparable.
+    """
+
+    def __init__(self, start=None, wall=None):
+        self.now = _time.monotonic() if start is None else start
+        self.offset = (_time.time() if wall is None else wall) - self.now
+        self.steps = 0    # deadlines reached
+        self.stalls = 0   # times advance() gave up waiting for a busy thread
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)  # advance() waits here
+        self._threads = {}   # {ident: (Thread, Condition it waits on while blocked)}
+        self._blocked = {}   # {ident: (deadline or None, released by notify())}
+        self._driver = None  # the thread calling advance()
+
+    @property
+    def participants(self):
+        return len(self._threads)
+
+    def time(self):
+        return self.now + self.offset
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.block(max(0.0, seconds))
+
+    def block(self, timeout, ready=None, wakeable=False, unlock=None):
+        """Block the calling thread until ready() or timeout seconds of virtual time.
+
+        ready() is re-checked after every notify(); without it, a
+        wakeable block returns on the first notify() (a Condition wait).
+        unlock() runs once the thread counts as blocked. Returns ready(),
+        or for a wakeable block whether it was notified before the timeout.
+        """
+        deadline = None if timeout is None else self.now + timeout
+        me = threading.current_thread()
+        if me is self._driver:
+            if unlock is not None:
+                unlock()
+            if deadline is None:
+                raise RuntimeError("the thread advancing a VirtualClock cannot wait without a timeout")
+            return self.advance(deadline - self.now, until=ready)
+        with self._lock:
+            if me.ident not in self._threads:
+                self._threads[me.ident] = (me, threading.Condition(self._lock))
+            released = self._threads[me.ident][1]
+            while True:
+                if ready is not None and ready():
+                    return True
+                if deadline is not None and self.now >= deadline:
+                    return False
+                self._blocked[me.ident] = (deadline, wakeable or ready is not None)
+                self._settled.notify()
+                if unlock is not None:
+                    unlock()
+                    unlock = None
+                while me.ident in self._blocked:
+                    released.wait()
+                if ready is None and wakeable:
+                    return deadline is None or self.now < deadline
+
+    def notify(self):
+        """Something a blocked thread may be waiting for happened (Event set, Condition notified, Queue put)"""
+        with self._lock:
+            self._release(lambda deadline, wakeable: wakeable)
+
+    def advance(self, seconds, until=None):
+        """Move time forward by seconds, releasing every blocked thread at its deadline in order.
+
+        Stops early once until() is true (checked between steps, with the
+        clock locked, so it must not wait). Returns until(), or True.
+        """
+        self._driver = threading.current_thread()
+        target = self.now + seconds
+        with self._lock:
+            while True:
+                self._settle()
+                if until is not None and until():
+                    return True
+                due = [deadline for deadline, _ in self._blocked.values()
+                       if deadline is not None and deadline <= target]
+                if not due:
+                    break
+                self.now = max(self.now, min(due))
+                self.steps += 1
+                self._release(lambda deadline, wakeable: deadline is not None and deadline <= self.now)
+            self.now = max(self.now, target)
+        return until() if until is not None else True
+
+    def _release(self, match):
+        """Unblock the threads whose (deadline, wakeable) match. Caller holds _lock."""
+        for ident in [ident for ident, entry in self._blocked.items() if match(*entry)]:
+            del self._blocked[ident]
+            self._threads[ident][1].notify()
+
+    def _settle(self):
+        """Wait until every live thread on the clock is blocked on it. Caller holds _lock."""
+        give_up = _time.monotonic() + SETTLE_TIMEOUT
+        while True:
+            for ident in [ident for ident, (thread, _) in self._threads.items() if not thread.is_alive()]:
+                del self._threads[ident]
+                self._blocked.pop(ident, None)
+            if len(self._blocked) >= len(self._threads):
+                return
+            remaining = give_up - _time.monotonic()
+            if remaining <= 0:
+                self.stalls += 1
+                return
+            self._settled.wait(remaining)
+
+
+def use(virtual):
+    """Install a VirtualClock (None: real time again); returns it.
+
+    Call before starting the threads that should run on it.
+    """
+    global time, monotonic, sleep, _virtual
+    _virtual = virtual
+    if virtual is None:
+        time, monotonic, sleep = _time.time, _time.monotonic, _time.sleep
+    else:
+        time, monotonic, sleep = virtual.time, virtual.monotonic, virtual.sleep
+    return virtual
+
+# ---------------------------
+# Clock-aware primitives
+# ---------------------------
+class Event(threading.Event):
+    """threading.Event whose wait() timeout runs on the installed clock."""
+
+    def set(self):
+        super().set()
+        if _virtual is not None:
+            _virtual.notify()
+
+    def wait(self, timeout=None):
+        if _virtual is None:
+            return super().wait(timeout)
+        return _virtual.block(timeout, ready=self.is_set)
+
+
+class Condition(threading.Condition):
+    """threading.Condition whose wait() timeout runs on the installed clock."""
+
+    def notify(self, n=1):  # notify_all() calls this too
+        super().notify(n)
+        if _virtual is not None:
+            _virtual.notify()
+
+    def wait(self, timeout=None):
+        if _virtual is None:
+            return super().wait(timeout)
+        if not self._is_owned():
+            raise RuntimeError("cannot wait on un-acquired lock")
+        saved = []
+        try:
+            return _virtual.block(timeout, wakeable=True, unlock=lambda: saved.append(self._release_save()))
+        finally:
+            if saved:
+                self._acquire_restore(saved[0])
+
+
+class Queue(queue.Queue):
+    """queue.Queue whose get() timeout runs on the installed clock."""
+
+    def put(self, item, block=True, timeout=None):  # put_nowait() calls this too
+        super().put(item, block, timeout)
+        if _virtual is not None:
+            _virtual.notify()
+
+    def get(self, block=True, timeout=None):
+        if _virtual is None or not block:
+            return super().get(block, timeout)
+        while True:
+            try:
+                return super().get(False)
+            except queue.Empty:
+                if not _virtual.block(timeout, ready=lambda: self.qsize() > 0):
+                    raise
@@ -0,0 +1,115 @@
+# commands.py
+"""The single command path shared by every input.
+
+The RFID reader, the buttons and the control socket all turn their
+input into a named command and call execute(). Input modules register
+their handlers at import time; handlers take the SpotInstance first
+and keyword arguments after it.
+"""
+import inspect
+import time
+import logging
+import flightrec
+import metrics
+import power
+
+log = logging.getLogger("Commands")
+
+COMMANDS = metrics.counter("kidspot_commands_total", "Commands executed", ["command", "source", "status"])
+COMMAND_SECONDS = metrics.histogram("kidspot_command_seconds", "Command execution time", ["command"])
+
+DEFAULT_ZONE = "default"
+PASSIVE = {"status"}  # commands that don't count as activity (idle mode, power.py)
+
+_handlers = {}
+_forward = None  # set_forward(): commands run in another process (ipc.py)
+_hold = None     # set_hold(): commands kept until Spotify is usable (frontdoor.py)
+
+
+def register(name, handler):
+    _handlers[name] = handler
+
+
+def names():
+    return sorted(_handlers)
+
+
+def check_args(name, args):
+    """Raise TypeError if args don't fit the handler's keyword arguments"""
+    inspect.signature(_handlers[name]).bind(None, **args)
+
+
+def router(target):
+    """Turn a SpotInstance, or a zone -> SpotInstance callable, into the callable.
+
+    Inputs look up the device for their zone on every command, so one
+    daemon can drive several devices (see kidspot.py KIDSPOT_ZONES).
+    """
+    if callable(target):
+        return target
+    return lambda zone=DEFAULT_ZONE: target
+
+
+def set_forward(forward):
+    """Hand every command to forward(name, spot_instance, source, args) instead of running it"""
+    global _forward
+    _forward = forward
+
+
+def set_hold(hold):
+    """Offer every command to hold(name, spot_instance, source, args) first; it returns True if it took it"""
+    global _hold
+    _hold = hold
+
+
+def execute(name, spot_instance, source="local", **args):
+    """Run a command; returns the handler's result. Raises KeyError for unknown commands."""
+    if name not in PASSIVE:
+        power.wake(source)
+    if _forward is not None:
+        return _forward(name, spot_instance, source, args)
+    if _hold is not None and _hold(name, spot_instance, source, args):
+        return None
+    handler = _handlers[name]
+    status = "ok"
+    started = time.perf_counter()
+    try:
+        return handler(spot_instance, **args)
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        COMMAND_SECONDS.labels(name).observe(elapsed)
+        COMMANDS.labels(name, source, status).inc()
+        flightrec.record("command", name, f"{source} {status}", elapsed)
+
+
+# ---------------------------
+# Spotify commands (no input module of their own)
+# ---------------------------
+def _play_uri(spot_instance, uri):
+    return spot_instance.play_url(uri)
+
+
+def _pause(spot_instance):
+    spot_instance.pause()
+    return True
+
+
+def _volume(spot_instance, percent=None, step=None):
+    """Absolute volume (percent) or relative change (step, may be negative)."""
+    if percent is None:
+        percent = spot_instance.current_volume() + (step or 0)
+    return spot_instance.set_volume(percent)
+
+
+def _status(spot_instance):
+    playback = spot_instance.get_current_playback()
+    return playback.to_dict() if playback is not None else None
+
+
+register("play_uri", _play_uri)
+register("pause", _pause)
+register("volume", _volume)
+register("status", _status)
@@ -0,0 +1,123 @@
+# control.py
+"""Local control socket for home automation.
+
+Newline-delimited JSON over a Unix socket (and optionally localhost TCP).
+Each request line is a command for commands.execute():
+
+    {"cmd": "play_card", "uid": "04A3B2C1D5", "id": 1}
+    {"cmd": "play_uri", "uri": "spotify:album:..."}
+    {"cmd": "pause"} {"cmd": "next"} {"cmd": "volume", "percent": 40}
+    {"cmd": "status", "zone": "kids"}
+
+"zone" picks the device on multi-device units (default: "default"),
+and each request line gets exactly one response line, in order, echoing "id":
+
+    {"id": 1, "ok": true, "result": true}
+
+Clients may pipeline: write many lines before reading any responses.
+    echo '{"cmd": "pause"}' | nc -U /tmp/kidspot.sock
+"""
+import json
+import os
+import socketserver
+import threading
+import logging
+import commands
+import metrics
+
+log = logging.getLogger("Control")
+
+SOCKET_PATH = os.getenv("KIDSPOT_CONTROL_SOCKET", "/tmp/kidspot.sock")
+TCP_PORT = int(os.getenv("KIDSPOT_CONTROL_PORT", 0))  # 0 = Unix socket only
+MAX_LINE = 64 * 1024
+
+CONNECTIONS = metrics.gauge("kidspot_control_connections", "Open control socket connections")
+
+_servers = []
+
+
+def handle_line(line, get_spot):
+    """Execute one request line and return the response dict."""
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+    except ValueError as e:
+        return {"ok": False, "error": f"bad request: {e}"}
+
+    request_id = request.pop("id", None)
+    name = request.pop("cmd", None)
+    zone = request.pop("zone", commands.DEFAULT_ZONE)
+    response = {"id": request_id} if request_id is not None else {}
+    if name not in commands.names():
+        response.update(ok=False, error=f"unknown command {name!r}; known: {commands.names()}")
+        return response
+    try:
+        commands.check_args(name, request)
+    except TypeError as e:
+        response.update(ok=False, error=f"bad arguments for {name}: {e}")
+        return response
+    try:
+        result = commands.execute(name, get_spot(zone), source="control", **request)
+        response.update(ok=True, result=result)
+    except Exception as e:
+        response.update(ok=False, error=f"{name} failed: {type(e).__name__}: {e}")
+    return response
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        CONNECTIONS.inc()
+        try:
+            while True:
+                line = self.rfile.readline(MAX_LINE)
+                if not line:
+                    return
+                if not line.strip():
+                    continue
+                response = handle_line(line, self.server.get_spot)
+                self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+        except (ConnectionError, BrokenPipeError):
+            pass
+        finally:
+            CONNECTIONS.dec()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start(get_spot, socket_path=SOCKET_PATH, tcp_port=TCP_PORT):
+    """Serve the control API; get_spot is a SpotInstance or a zone -> SpotInstance callable."""
+    get_spot = commands.router(get_spot)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # stale socket from a previous run
+        server = _UnixServer(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+        _serve(server, get_spot, "control-unix")
+        log.info(f"🎛️ Control socket at {socket_path}")
+    if tcp_port:
+        server = _TCPServer(("127.0.0.1", tcp_port), _Handler)
+        _serve(server, get_spot, "control-tcp")
+        log.info(f"🎛️ Control on 127.0.0.1:{tcp_port}")
+
+
+def _serve(server, get_spot, name):
+    server.get_spot = get_spot
+    threading.Thread(target=server.serve_forever, name=name, daemon=True).start()
+    _servers.append(server)
+
+
+def stop():
+    while _servers:
+        server = _servers.pop()
+        server.shutdown()
+        server.server_close()
+        if isinstance(server, _UnixServer) and os.path.exists(server.server_address):
+            os.unlink(server.server_address)
@@ -0,0 +1,138 @@
+# flightrec.py
+"""Flight recorder: the last few thousand events, dumped when things go wrong.
+
+Modules call record(kind, subject, value, duration) on UID reads, button
+edges, commands, Spotify API calls and LED changes. Events go into a
+fixed-size ring of preallocated slots: one counter increment and a few
+list stores, no allocation beyond the values passed in, no lock.
+
+dump(reason) writes the ring, oldest first, as JSON lines under
+KIDSPOT_FLIGHT_DIR. It runs on unhandled exceptions (install()), when
+the supervisor finds a dead or stalled worker, and on SIGQUIT:
+
+    kill -QUIT <pid>
+"""
+import itertools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import logging
+import membudget
+
+log = logging.getLogger("FlightRecorder")
+
+FLIGHT_DIR = os.getenv("KIDSPOT_FLIGHT_DIR", "/tmp/kidspot_flight")
+SIZE = membudget.cap(4096, 1024)
+KEEP_DUMPS = 10
+MIN_DUMP_INTERVAL = 5.0  # seconds; a crash loop must not fill the disk
+
+_seq = itertools.count()
+_seqs = [-1] * SIZE  # sequence number each slot holds, to skip half-written and stale slots
+_times = [0.0] * SIZE
+_threads = [0] * SIZE
+_kinds = [None] * SIZE
+_subjects = [None] * SIZE
+_values = [None] * SIZE
+_durations = [None] * SIZE
+_last_dump = 0.0
+_dump_lock = threading.Lock()
+
+
+def record(kind, subject, value=None, duration=None):
+    """Store one event; overwrites the oldest once the ring is full."""
+    i = next(_seq)
+    slot = i % SIZE
+    _times[slot] = time.monotonic()
+    _threads[slot] = threading.get_ident()
+    _kinds[slot] = kind
+    _subjects[slot] = subject
+    _values[slot] = value
+    _durations[slot] = duration
+    _seqs[slot] = i
+
+
+def events():
+    """The recorded events, oldest first, as dicts"""
+    total = next(_seq)  # consumes a sequence number; that slot is skipped as stale
+    names = {t.ident: t.name for t in threading.enumerate()}
+    offset = time.time() - time.monotonic()
+    out = []
+    for i in range(max(0, total - SIZE), total):
+        slot = i % SIZE
+        if _seqs[slot] != i:
+            continue
+        event = {
+            "seq": i,
+            "time": round(_times[slot] + offset, 6),
+            "thread": names.get(_threads[slot], _threads[slot]),
+            "kind": _kinds[slot],
+            "subject": _subjects[slot],
+        }
+        if _values[slot] is not None:
+            event["value"] = _values[slot]
+        if _durations[slot] is not None:
+            event["ms"] = round(_durations[slot] * 1000, 3)
+        out.append(event)
+    return out
+
+
+def dump(reason, force=False):
+    """Write the ring to FLIGHT_DIR; returns the path (None if rate-limited or failed)."""
+    global _last_dump
+    with _dump_lock:
+        now = time.monotonic()
+        if not force and now - _last_dump < MIN_DUMP_INTERVAL:
+            return None
+        _last_dump = now
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in reason)
+    path = os.path.join(FLIGHT_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe}.jsonl")
+    try:
+        os.makedirs(FLIGHT_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            for event in events():
+                f.write(json.dumps(event, default=str) + "\n")
+        _rotate()
+    except OSError as e:
+        log.warning(f"Could not write flight recording: {e}")
+        return None
+    log.warning(f"🛩️ Flight recording ({reason}) written to {path}")
+    return path
+
+
+def _rotate():
+    dumps = sorted(f for f in os.listdir(FLIGHT_DIR) if f.endswith(".jsonl"))
+    for old in dumps[:-KEEP_DUMPS]:
+        os.unlink(os.path.join(FLIGHT_DIR, old))
+
+# ---------------------------
+# Triggers
+# ---------------------------
+def _excepthook(exc_type, exc, tb):
+    record("crash", "main", repr(exc))
+    dump("exception")
+    _previous_excepthook(exc_type, exc, tb)
+
+
+def _thread_excepthook(args):
+    record("crash", args.thread.name if args.thread else None, repr(args.exc_value))
+    dump("thread-exception")
+    _previous_thread_excepthook(args)
+
+
+def _on_signal(signum, frame):
+    # Write from a helper thread: the main thread may hold a lock the dump needs
+    threading.Thread(target=dump, args=("signal", True), name="flightrec-dump", daemon=True).start()
+
+
+_previous_excepthook = sys.excepthook
+_previous_thread_excepthook = threading.excepthook
+
+
+def install():
+    """Dump on unhandled exceptions and on SIGQUIT; call from the main thread."""
+    sys.excepthook = _excepthook
+    threading.excepthook = _thread_excepthook
+    signal.signal(signal.SIGQUIT, _on_signal)
@@ -0,0 +1,183 @@
+# frontdoor.py
+"""Early input readiness: inputs run before Spotify is usable.
+
+kidspot.py starts the RFID readers and buttons first and hands them
+route(). Until set_route() is called with the real route and the zone's
+account session holds a token, and again whenever netmon marks the
+network down, route() returns a Pending placeholder and
+commands.execute() passes the command to hold() instead of a handler. Per zone, one meaningful command is kept: the
+latest swipe, or a pause/toggle. A held swipe is only replaced by a
+newer swipe or cancelled by pause; a toggle pressed after it (a child
+pressing play to "start" the card) is ignored. Volume and skip commands
+are dropped, since there is nothing playing to change yet.
+The kept commands run the moment an account is usable: on set_route()
+if it already is, once a retry every ACCOUNT_RETRY seconds brings the
+default zone's account up, or when the network comes back.
+
+Readiness milestones (seconds since startup_profile was imported) are
+recorded with mark(), exported as kidspot_readiness_seconds, and shown
+in the supervisor status file, so boot-to-first-sound can be measured:
+inputs, first_input, spotify, network_down/network_up, first_sound.
+"""
+import threading
+import time
+import logging
+import commands
+import flightrec
+import leds
+import metrics
+import netmon
+import startup_profile
+
+log = logging.getLogger("FrontDoor")
+
+MEANINGFUL = {"play_card", "play_uri", "toggle", "pause"}  # worth running late; anything else is dropped
+SWIPES = {"play_card", "play_uri"}  # kept over a later toggle; only pause cancels them
+MAX_AGE = 300.0  # seconds; a held command older than this is dropped instead of run
+ACCOUNT_RETRY = 5.0  # seconds between attempts to bring up an account that has no token yet
+
+READINESS = metrics.gauge("kidspot_readiness_seconds", "Seconds from startup to each readiness milestone",
+                          ["milestone"])
+HELD = metrics.counter("kidspot_frontdoor_commands_total", "Commands arriving before Spotify was usable",
+                       ["result"])
+
+milestones = {}   # {milestone: seconds since startup}, first occurrence
+_route = None
+_held = {}        # {zone: (name, source, args, monotonic time)}
+_lock = threading.Lock()
+
+
+class Pending:
+    """What route() returns while no account is usable."""
+
+    __slots__ = ("zone",)
+
+    def __init__(self, zone):
+        self.zone = zone
+
+
+def mark(milestone):
+    """Record a readiness milestone (later repeats only go to the flight recorder)"""
+    seconds = startup_profile.elapsed()
+    flightrec.record("ready", milestone, round(seconds, 3))
+    if milestone in milestones:
+        return
+    milestones[milestone] = seconds
+    READINESS.labels(milestone).set(seconds)
+    log.info(f"🚦 {milestone} after {seconds * 1000:.0f} ms")
+
+
+def _usable(instance):
+    """instance's account session holds a token (SpotInstance.sp is only set once one was fetched)"""
+    return instance is not None and getattr(instance, "sp", None) is not None
+
+
+def route(zone=commands.DEFAULT_ZONE):
+    """The inputs' route(): the zone's SpotInstance once usable, else a Pending"""
+    if _route is None or not netmon.is_up():
+        return Pending(zone)
+    instance = _route(zone)
+    return instance if _usable(instance) else Pending(zone)
+
+
+def ready(zone=commands.DEFAULT_ZONE):
+    return not isinstance(route(zone), Pending)
+
+
+def hold(name, target, source, args):
+    """commands hook: keep the latest meaningful command per zone; True if taken"""
+    if "first_input" not in milestones:
+        mark("first_input")
+    if not isinstance(target, Pending):
+        return False
+    if name not in MEANINGFUL:
+        HELD.labels("dropped").inc()
+        log.info(f"⏳ {name} from {source} ignored: Spotify not ready")
+        return True
+    with _lock:
+        replaced = _held.get(target.zone)
+        keep = name == "toggle" and replaced is not None and replaced[0] in SWIPES
+        if not keep:
+            _held[target.zone] = (name, source, args, time.monotonic())
+    if keep:
+        HELD.labels("ignored").inc()
+        log.info(f"⏳ {name} from {source} ignored: holding {replaced[0]} from {replaced[1]}")
+        return True
+    HELD.labels("replaced" if replaced else "held").inc()
+    leds.blink_led("yellow", duration=1)
+    log.info(f"⏳ Holding {name} from {source} until Spotify is ready")
+    # Readiness may have arrived while this was being held
+    if ready(target.zone):
+        _flush_async()
+    return True
+
+
+def _flush():
+    with _lock:
+        held = list(_held.items())
+        _held.clear()
+    for zone, (name, source, args, held_at) in held:
+        age = time.monotonic() - held_at
+        if age > MAX_AGE:
+            HELD.labels("expired").inc()
+            continue
+        target = route(zone)
+        if isinstance(target, Pending):
+            with _lock:  # keep holding it, unless a newer command took its place
+                _held.setdefault(zone, (name, source, args, held_at))
+            continue
+        HELD.labels("flushed").inc()
+        log.info(f"▶️ Running held {name} from {source} ({age:.1f}s late)")
+        try:
+            commands.execute(name, target, source=f"{source} (held)", **args)
+        except Exception as e:
+            log.warning(f"Held {name} from {source} failed: {e}")
+
+
+def _flush_async():
+    threading.Thread(target=_flush, name="frontdoor-flush", daemon=True).start()
+
+
+def _await_account():
+    """Retry the default zone's account until it has a token, then run what was held"""
+    while True:
+        instance = _route(commands.DEFAULT_ZONE)
+        if instance is None:
+            log.warning("⚠️ No Spotify account to route to: held commands will expire")
+            return
+        if _usable(instance):
+            break
+        time.sleep(ACCOUNT_RETRY)
+        instance.refresh_token_if_needed()
+    _account_ready()
+
+
+def _account_ready():
+    mark("spotify")
+    if netmon.is_up():
+        _flush_async()
+
+
+def _on_network_change(up):
+    mark("network_up" if up else "network_down")
+    if up and _route is not None:
+        _flush_async()
+
+# ---------------------------
+# Public start functions
+# ---------------------------
+def start():
+    """Hold commands until set_route(); call before starting the inputs"""
+    commands.set_hold(hold)
+    netmon.on_change(_on_network_change)
+
+
+def set_route(real_route):
+    """Route to real_route from now on; run what was held once its default account has a token"""
+    global _route
+    _route = commands.router(real_route)
+    if _usable(_route(commands.DEFAULT_ZONE)):
+        _account_ready()
+    else:
+        log.info("⏳ Spotify account not authenticated yet, holding commands")
+        threading.Thread(target=_await_account, name="frontdoor-account", daemon=True).start()
@@ -0,0 +1,282 @@
+# ipc.py
+"""Split-process mode (KIDSPOT_PROCESSES=split).
+
+kidspot.py forks into two processes linked by System V IPC:
+
+- hardware (parent): LEDs, RFID readers and buttons. commands.execute()
+  forwards every command over the message queue instead of running it,
+  so input threads never share a GIL with Spotify work.
+- control (child): Spotify sessions, netmon, player events and the
+  control socket. It runs the forwarded commands, and its LED calls
+  are sent back over the queue for the hardware process to play.
+
+A shared-memory status block holds the latest playback state (written by
+control) and the pattern showing on each LED (written by hardware).
+Each half is a seqlock: an odd sequence number means a write is in
+progress, and readers retry until they see the same even number on
+both sides of their read.
+"""
+import json
+import os
+import signal
+import struct
+import time
+import logging
+import commands
+import leds
+import metrics
+import power
+
+log = logging.getLogger("IPC")
+
+KEY = int(os.getenv("KIDSPOT_IPC_KEY", "0x4B5350"), 0)
+MSG_COMMAND = 1   # hardware -> control: {"cmd", "zone", "source", "args", "t"}
+MSG_LED = 2       # control -> hardware: {"led", "name", "steps", "repeat", "duration", "priority"}
+MAX_MESSAGE = 4096
+STATUS_INTERVAL = 0.5  # seconds between playback status writes
+NO_STALL = float("inf")  # receivers block in receive() while idle; only death is supervised
+
+_SEQ = struct.Struct("<I")
+_PLAYBACK = struct.Struct("<d??b96s")                      # updated, is_playing, network_up, volume, item_uri
+_LEDS = struct.Struct("<d" + "16s" * len(leds.colours))    # updated, pattern name per LED
+PLAYBACK_AT = 0
+LEDS_AT = 128
+STATUS_SIZE = 256
+
+MESSAGES = metrics.counter("kidspot_ipc_messages_total", "Messages over the IPC queue", ["type", "result"])
+COMMAND_DELAY = metrics.histogram("kidspot_ipc_command_delay_seconds",
+                                  "Time from an input to the control process picking up its command",
+                                  buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+
+role = "single"
+_queue = None
+_memory = None
+_child = None
+_seqs = {PLAYBACK_AT: 0, LEDS_AT: 0}
+_remotes = {}
+
+
+# ---------------------------
+# Setup
+# ---------------------------
+def split():
+    """Create the queue and status block and fork; returns "hardware" or "control"."""
+    import sysv_ipc
+
+    global role, _queue, _memory, _child
+    _queue = sysv_ipc.MessageQueue(KEY, sysv_ipc.IPC_CREAT, max_message_size=MAX_MESSAGE)
+    _memory = sysv_ipc.SharedMemory(KEY, sysv_ipc.IPC_CREAT, size=STATUS_SIZE)
+    _memory.write(b"\0" * STATUS_SIZE)
+    _drain()
+    _child = os.fork()
+    role = "hardware" if _child else "control"
+    if role == "hardware":
+        commands.set_forward(_forward)
+    else:
+        leds.set_sink(_send_led)
+    return role
+
+
+def child_exit():
+    """Hardware side: the control child's exit code once it has died, else None"""
+    global _child
+    if role != "hardware" or not _child:
+        return None
+    try:
+        pid, status = os.waitpid(_child, os.WNOHANG)
+    except ChildProcessError:
+        pid, status = _child, 0
+    if pid == 0:
+        return None
+    _child = None
+    return os.waitstatus_to_exitcode(status) if status else 0
+
+
+def _drain():
+    """Drop messages left in the queue by a previous run"""
+    import sysv_ipc
+
+    while True:
+        try:
+            _queue.receive(block=False)
+        except sysv_ipc.BusyError:
+            return
+
+# ---------------------------
+# Status block
+# ---------------------------
+def _write(offset, layout, values):
+    seq = _seqs[offset] + 1
+    _memory.write(_SEQ.pack(seq), offset)  # odd: write in progress
+    _memory.write(layout.pack(*values), offset + _SEQ.size)
+    _memory.write(_SEQ.pack(seq + 1), offset)
+    _seqs[offset] = seq + 1
+
+
+def _read(offset, layout, attempts=100):
+    for _ in range(attempts):
+        before = _SEQ.unpack(_memory.read(_SEQ.size, offset))[0]
+        if before % 2:
+            continue
+        values = layout.unpack(_memory.read(layout.size, offset + _SEQ.size))
+        if _SEQ.unpack(_memory.read(_SEQ.size, offset))[0] == before:
+            return values
+    return None
+
+
+def write_playback(playback, network_up=True):
+    """Publish a PlaybackState (or None) to the status block"""
+    if playback is None:
+        values = (time.time(), False, network_up, -1, b"")
+    else:
+        volume = playback.volume_percent if playback.volume_percent is not None else -1
+        values = (time.time(), playback.is_playing, network_up, volume, (playback.item_uri or "").encode()[:96])
+    _write(PLAYBACK_AT, _PLAYBACK, values)
+
+
+def write_leds(patterns):
+    names = [(patterns.get(led) or "").encode()[:16] for led in leds.colours]
+    _write(LEDS_AT, _LEDS, [time.time()] + names)
+
+
+def status():
+    """Both halves of the status block as a dict (None for a half never written)"""
+    playback = _read(PLAYBACK_AT, _PLAYBACK)
+    led_state = _read(LEDS_AT, _LEDS)
+    out = {"playback": None, "leds": None}
+    if playback and playback[0]:
+        updated, is_playing, network_up, volume, uri = playback
+        out["playback"] = {"updated": updated, "is_playing": is_playing, "network_up": network_up,
+                           "volume_percent": None if volume < 0 else volume,
+                           "item_uri": uri.rstrip(b"\0").decode() or None}
+    if led_state and led_state[0]:
+        out["leds"] = {led: name.rstrip(b"\0").decode() for led, name in zip(leds.colours, led_state[1:])}
+    return out
+
+# ---------------------------
+# Hardware side
+# ---------------------------
+class Remote:
+    """Stands in for a zone's SpotInstance in the hardware process."""
+
+    __slots__ = ("zone",)
+
+    def __init__(self, zone):
+        self.zone = zone
+
+
+def remote_route(zone):
+    """route() for the hardware process: commands are forwarded with their zone"""
+    remote = _remotes.get(zone)
+    if remote is None:
+        remote = _remotes[zone] = Remote(zone)
+    return remote
+
+
+def _forward(name, target, source, args):
+    import sysv_ipc
+
+    message = json.dumps({"cmd": name, "zone": getattr(target, "zone", commands.DEFAULT_ZONE),
+                          "source": source, "args": args, "t": time.monotonic()})
+    try:
+        _queue.send(message, block=False, type=MSG_COMMAND)
+    except sysv_ipc.BusyError:
+        MESSAGES.labels("command", "full").inc()
+        leds.blink_led("red", duration=1)
+        return False
+    MESSAGES.labels("command", "sent").inc()
+    return True
+
+
+def _receive_leds(heartbeat=None):
+    showing = {}
+    while heartbeat is None or not heartbeat.stopped():
+        if heartbeat is not None:
+            heartbeat.beat()
+        raw, _ = _queue.receive(type=MSG_LED)
+        message = json.loads(raw)
+        if message.get("led") is None:
+            return
+        steps = [tuple(step) for step in message["steps"]]
+        pattern = leds.Pattern(message["name"], steps, message["repeat"], message["duration"], message["priority"])
+        if leds.play_pattern(message["led"], pattern):
+            showing[message["led"]] = pattern.name
+            write_leds(showing)
+        MESSAGES.labels("led", "received").inc()
+
+
+def start_hardware(supervisor):
+    supervisor.add("ipc-leds", _receive_leds, stall_timeout=NO_STALL)
+
+# ---------------------------
+# Control side
+# ---------------------------
+def _send_led(led_name, pattern):
+    import sysv_ipc
+
+    message = json.dumps({"led": led_name, "name": pattern.name, "steps": pattern.steps, "repeat": pattern.repeat,
+                          "duration": pattern.duration, "priority": pattern.priority})
+    try:
+        _queue.send(message, block=False, type=MSG_LED)
+        MESSAGES.labels("led", "sent").inc()
+    except sysv_ipc.BusyError:
+        MESSAGES.labels("led", "full").inc()
+    return True
+
+
+def _receive_commands(route, heartbeat=None):
+    while heartbeat is None or not heartbeat.stopped():
+        if heartbeat is not None:
+            heartbeat.beat()
+        raw, _ = _queue.receive(type=MSG_COMMAND)
+        message = json.loads(raw)
+        if message.get("cmd") is None:
+            return
+        COMMAND_DELAY.observe(time.monotonic() - message["t"])
+        MESSAGES.labels("command", "received").inc()
+        try:
+            commands.execute(message["cmd"], route(message["zone"]), source=message["source"], **message["args"])
+        except Exception as e:
+            log.warning(f"Forwarded {message['cmd']} from {message['source']} failed: {e}")
+
+
+def _publish_status(route, heartbeat=None):
+    import netmon
+
+    while heartbeat is None or not heartbeat.stopped():
+        if heartbeat is not None:
+            heartbeat.beat()
+        instance = route(commands.DEFAULT_ZONE)
+        # Only local player state: publishing must not poll the Web API
+        local = getattr(instance, "local", None)
+        write_playback(local.snapshot(instance.device_id) if local is not None and local.known() else None,
+                       netmon.is_up())
+        power.sleep(STATUS_INTERVAL, loop="ipc-status")
+
+
+def start_control(route, supervisor):
+    supervisor.add("ipc-commands", _receive_commands, args=(route,), stall_timeout=NO_STALL)
+    supervisor.add("ipc-status", _publish_status, args=(route,))
+
+# ---------------------------
+# Shutdown
+# ---------------------------
+def stop():
+    """Wake both receivers so they exit; the hardware side also stops the child and removes the IPC objects"""
+    if _queue is None:
+        return
+    try:
+        _queue.send(json.dumps({}), block=False, type=MSG_COMMAND if role == "control" else MSG_LED)
+    except Exception:
+        pass
+    if role == "hardware" and _child:
+        try:
+            os.kill(_child, signal.SIGINT)
+            os.waitpid(_child, 0)
+        except OSError:
+            pass
+        for ipc_object in (_queue, _memory):
+            try:
+                ipc_object.remove()
+            except Exception:
+                pass
@@ -1,89 +1,274 @@
 # kidspot.py
+import startup_profile as profile
+import flightrec
 import os
-import leds
-import rfid
-import buttons
-from spot import SpotInstance
-from dotenv import load_dotenv
 import time
 import signal
 
-leds.init_leds()
-
-# ---------------------------
-# Load environment
-# ---------------------------
+# .env first: most modules read their KIDSPOT_* settings at import time
+with profile.phase("dotenv", "import"):
+    from dotenv import load_dotenv
 load_dotenv()
-DEVICE_NAME = os.getenv("device_name")
-DEFAULT_VOLUME = int(os.getenv("default_volume", 50))
+
+# Hardware modules and spot.py import nothing heavy at module level;
+# GPIO/PN532/spotipy are loaded by the explicit start() calls below.
+with profile.phase("local modules", "import"):
+    import leds
+    import rfid
+    import buttons
+    import control
+    import frontdoor
+    import ipc
+    import kidspot_verify
+    import logpipe
+    import metrics
+    import netmon
+    import player_events
+    import power
+    import profiler
+    from supervisor import Supervisor
+
 ACCOUNT_PREFIXES = ["BEN", "NICOLA", "KIDS"]
+STATUS_FILE = os.getenv("KIDSPOT_STATUS_FILE", "/tmp/kidspot_supervisor.json")
+STATUS_EXPORT_INTERVAL = 10  # seconds
+PROCESS_MODE = os.getenv("KIDSPOT_PROCESSES", "single")  # "split": inputs and Spotify in two processes (ipc.py)
+
 
 # ---------------------------
 # Multi-account setup
 # ---------------------------
-spot_instances = {}  # <-- initialize dictionary here
+def load_spot_instances(device_name, default_volume, preflight=None):
+    """Create a SpotInstance per configured account, reusing preflight tokens/devices"""
+    accounts = preflight.data if preflight is not None and preflight.ok else {}
+    tokens = accounts.get("tokens", {})
+    device_ids = accounts.get("device_ids", {})
+
+    with profile.phase("spot", "import"):
+        from spot import SpotInstance
+
+    spot_instances = {}
+    for prefix in ACCOUNT_PREFIXES:
+        client_id = os.getenv(f"SPOTIFY_{prefix}_CLIENT_ID")
+        client_secret = os.getenv(f"SPOTIFY_{prefix}_CLIENT_SECRET")
+        refresh_token = os.getenv(f"SPOTIFY_{prefix}_REFRESH_TOKEN")
+
+        if not (client_id and client_secret and refresh_token):
+            print(f"⚠️ Skipping account {prefix} (missing credentials)")
+            continue
+        try:
+            with profile.phase(f"spotify {prefix}"):
+                instance = SpotInstance(prefix, device_name, default_volume,
+                                        access_token=tokens.get(prefix), device_id=device_ids.get(prefix))
+            spot_instances[prefix] = instance
+        except Exception as e:
+            print(f"❌ Failed to initialize Spotify for {prefix}: {e}")
+    return spot_instances
+
+
+def load_zones(device_name):
+    """{zone: (account prefix or None, device name)}: "default" is device_name, more from KIDSPOT_ZONES.
+
+    KIDSPOT_ZONES=kids=Kidspot Kids,living=NICOLA:Living Room
+
+    A device name starting with one of ACCOUNT_PREFIXES and ":" is played
+    on that account; otherwise on the primary (selected) account.
+    """
+    zones = {"default": (None, device_name)}
+    for entry in os.getenv("KIDSPOT_ZONES", "").split(","):
+        if "=" in entry:
+            zone, name = entry.split("=", 1)
+            account, sep, device = name.partition(":")
+            if sep and account.strip().upper() in ACCOUNT_PREFIXES:
+                zones[zone.strip()] = (account.strip().upper(), device.strip())
+            else:
+                zones[zone.strip()] = (None, name.strip())
+    return zones
+
+
+def load_zone_instances(spot_instances, primary, zones, default_volume):
+    """One SpotInstance per zone, on its account (default: the primary's).
+
+    Each shares its account's AccountSession: one token, one connection
+    pool, and device IDs from the account's cached devices() answer.
+    """
+    from spot import SpotInstance
+
+    routes = {"default": primary}
+    for zone, (account, name) in zones.items():
+        if zone == "default":
+            continue
+        base = spot_instances.get(account) if account else primary
+        if base is None:
+            print(f"⚠️ Zone {zone}: account {account} is not configured, using the default zone")
+            continue
+        routes[zone] = SpotInstance(base.account_prefix, name, default_volume, session=base.session,
+                                    device_id=base.device_id if name == base.device_name else None)
+    return routes
+
+
+def select_instance(spot_instances, preferred=None):
+    """Preflight's selected account if usable, else first active account for listeners"""
+    if preferred in spot_instances and spot_instances[preferred].active:
+        return spot_instances[preferred]
+    for inst in spot_instances.values():
+        if inst.active:
+            return inst
+    if spot_instances:
+        # fallback to first available account
+        return next(iter(spot_instances.values()))
+    return None
+
+
+def start_spotify(device_name, default_volume, supervisor):
+    """Preflight, Spotify sessions and the services around them; returns route(zone)"""
+    with profile.phase("preflight"):
+        checks = kidspot_verify.run_preflight(device_name, ACCOUNT_PREFIXES)
+    for name, result in checks.items():
+        if not result.ok:
+            print(f"⚠️ Preflight {name}: {result.detail}")
+    accounts = checks["spotify_accounts"]
 
-for prefix in ACCOUNT_PREFIXES:
-    client_id = os.getenv(f"SPOTIFY_{prefix}_CLIENT_ID")
-    client_secret = os.getenv(f"SPOTIFY_{prefix}_CLIENT_SECRET")
-    refresh_token = os.getenv(f"SPOTIFY_{prefix}_REFRESH_TOKEN")
+    spot_instances = load_spot_instances(device_name, default_volume, accounts)
+    spot_instance = select_instance(spot_instances, accounts.data.get("selected"))
+    zones = load_zones(device_name)
+    routes = load_zone_instances(spot_instances, spot_instance, zones, default_volume) if spot_instance else {}
 
-    if not (client_id and client_secret and refresh_token):
-        print(f"⚠️ Skipping account {prefix} (missing credentials)")
-        continue
+    def route(zone):
+        return routes.get(zone, spot_instance)
+
+    netmon.start(supervisor)
+    try:
+        player_events.start(supervisor)
+        if spot_instance is not None:
+            spot_instance.local = player_events.player  # device_name is the raspotify on this Pi
+    except OSError as e:
+        print(f"⚠️ Player event socket unavailable: {e}")
     try:
-        instance = SpotInstance(prefix, DEVICE_NAME, DEFAULT_VOLUME)
-        spot_instances[prefix] = instance
-    except Exception as e:
-        print(f"❌ Failed to initialize Spotify for {prefix}: {e}")
+        control.start(route)
+    except OSError as e:
+        print(f"⚠️ Control socket unavailable: {e}")
+    return route
 
-# ---------------------------
-# Select first available active account for listeners
-# ---------------------------
-spot_instance = None
-for inst in spot_instances.values():
-    if inst.active:
-        spot_instance = inst
-        break
-if spot_instance is None and spot_instances:
-    # fallback to first available account
-    spot_instance = next(iter(spot_instances.values()))
 
-# ---------------------------
-# Start other components
-# ---------------------------
-rfid.listener(spot_instance)
-buttons.button_listener(spot_instance)
+def start_inputs(route, supervisor):
+    """RFID readers and buttons, sending their commands through route(zone)"""
+    with profile.phase("rfid"):
+        rfid.start()
+    with profile.phase("buttons"):
+        buttons.start()
+    rfid.listener(route, supervisor)
+    buttons.button_listener(route, supervisor)
+    frontdoor.mark("inputs")
 
-# ---------------------------
-# Test LEDs
-# ---------------------------
-for color in ["red", "yellow", "green"]:
-    leds.turn_on_led(color)
-time.sleep(1)
-for color in ["red", "yellow", "green"]:
-    leds.turn_off_led(color)
 
-# ---------------------------
-# Shutdown handling
-# ---------------------------
-def shutdown(signal_received, frame):
-    print("Shutting down Kidspot...")
-    rfid.stop_rfid()
-    buttons.stop_buttons()
-    leds.shutdown_leds()
-    exit(0)
+def main():
+    # In split mode the hardware process (inputs + LEDs) forks off the
+    # Spotify process here, before any thread is started
+    role = ipc.split() if PROCESS_MODE == "split" else "single"
+    inputs = role in ("single", "hardware")
+    # All print()/logging output goes through a queue from here on
+    log_file = logpipe.LOG_FILE
+    if role == "control" and log_file:
+        log_file += ".control"
+    logpipe.install(log_file)
 
-signal.signal(signal.SIGINT, shutdown)
+    if inputs:
+        with profile.phase("leds"):
+            leds.start()
 
-# ---------------------------
-# Keep main thread alive
-# ---------------------------
-print("🟢 Kidspot running. Waiting for events...")
+    device_name = os.getenv("device_name")
+    default_volume = int(os.getenv("default_volume", 50))
+
+    # ---------------------------
+    # Start components
+    # ---------------------------
+    supervisor = Supervisor()
+    if role == "hardware":
+        # Commands are forwarded at once; the control process holds them
+        ipc.start_hardware(supervisor)
+        start_inputs(ipc.remote_route, supervisor)
+    else:
+        # Inputs first: commands arriving before Spotify is usable are held
+        frontdoor.start()
+        if role == "control":
+            rfid.load_swipe_data()  # play_card runs here
+            ipc.start_control(frontdoor.route, supervisor)
+        else:
+            start_inputs(frontdoor.route, supervisor)
+        frontdoor.set_route(start_spotify(device_name, default_volume, supervisor))
+    if role == "hardware":
+        power.keep_awake_while(lambda: bool((ipc.status()["playback"] or {}).get("is_playing")))
+    else:
+        power.keep_awake_while(lambda: player_events.player.is_playing)
+    power.start(supervisor)
+    port = metrics.DEFAULT_PORT
+    if port and role == "control":
+        port += 1  # the hardware process serves the configured port
+    try:
+        metrics.start_server(port)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint unavailable: {e}")
 
-try:
-    while True:
+    print(f"🟢 Kidspot running ({role} process). Waiting for events...")
+    profile.report()
+
+    # ---------------------------
+    # Test LEDs
+    # ---------------------------
+    if inputs:
+        for color in ["red", "yellow", "green"]:
+            leds.turn_on_led(color)
         time.sleep(1)
-except KeyboardInterrupt:
-    print("🛑 Shutdown requested")
-    leds.shutdown_leds()
+        for color in ["red", "yellow", "green"]:
+            leds.turn_off_led(color)
+
+    # ---------------------------
+    # Shutdown handling
+    # ---------------------------
+    def shutdown(signal_received=None, frame=None, code=0):
+        print("Shutting down Kidspot...")
+        supervisor.stop()
+        control.stop()
+        player_events.stop()
+        ipc.stop()
+        rfid.stop_rfid()
+        if inputs:
+            buttons.stop_buttons()
+        leds.shutdown_leds()
+        exit(code)
+
+    signal.signal(signal.SIGINT, shutdown)
+    profiler.install()  # SIGUSR1/SIGUSR2 start/stop on-demand profiling
+    flightrec.install()  # dump recent events on crash or SIGQUIT
+
+    # ---------------------------
+    # Keep main thread alive, supervising listeners
+    # ---------------------------
+    status_file = STATUS_FILE if role != "control" else f"{STATUS_FILE}.control"
+    last_export = 0
+    try:
+        while True:
+            time.sleep(1)
+            supervisor.check()
+            # Nothing runs forwarded commands without the control process:
+            # exit non-zero so the service manager restarts both halves
+            code = ipc.child_exit()
+            if code is not None:
+                flightrec.record("ipc", "control exited", code)
+                print(f"❌ Control process exited with {code}, stopping")
+                shutdown(code=1)
+            if time.monotonic() - last_export >= STATUS_EXPORT_INTERVAL:
+                last_export = time.monotonic()
+                try:
+                    supervisor.export(status_file, readers=rfid.reader_stats(), power=power.stats(),
+                                      readiness=frontdoor.milestones)
+                except OSError as e:
+                    print(f"⚠️ Could not write supervisor status: {e}")
+    except KeyboardInterrupt:
+        print("🛑 Shutdown requested")
+        ipc.stop()
+        leds.shutdown_leds()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,16 @@ echo "\nInstalling all packages listed in requirements .txt. \n"
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Player event socket: /run/kidspot, shared only with the raspotify service
+echo "\nCreating the kidspot group and /run/kidspot.\n"
+sudo groupadd -f kidspot
+sudo usermod -aG kidspot "$USER"
+echo "d /run/kidspot 0750 $USER kidspot -" | sudo tee /etc/tmpfiles.d/kidspot.conf
+sudo systemd-tmpfiles --create /etc/tmpfiles.d/kidspot.conf
+sudo mkdir -p /etc/systemd/system/raspotify.service.d
+printf "[Service]\nSupplementaryGroups=kidspot\n" | sudo tee /etc/systemd/system/raspotify.service.d/kidspot.conf
+sudo systemctl daemon-reload
+
 # Enable Raspotify (assumes /etc/default/raspotify configured)
 echo "\n Starting Raspotify \n"
 sudo systemctl enable raspotify
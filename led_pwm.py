@@ -0,0 +1,207 @@
+# led_pwm.py
+"""PWM backends for the LED engine in leds.py.
+
+A backend owns brightness and blink timing for a pin so the LED engine
+only has to wake up when an effect changes, not on every on/off edge:
+
+- GPIOPWMBackend:  RPi.GPIO PWM (timing runs in the library's C thread)
+- SysfsPWMBackend: kernel PWM via /sys/class/pwm (true hardware timing,
+                   only for pins routed to a PWM channel by dtoverlay)
+- FakePWMBackend:  records every call, for running without a Pi
+
+Only GPIO12/13/18/19 have a hardware PWM channel. The stock LED pins in
+leds.colours (17, 27, 22, 23, 24) have none, so with that wiring sysfs
+drives every LED through its software fallback; each such pin is
+logged at setup.
+"""
+import os
+import threading
+import time
+import logging
+
+log = logging.getLogger("LEDPWM")
+
+PWM_FREQUENCY = 200  # Hz, flicker-free for brightness control
+HARDWARE_PWM_PINS = (12, 13, 18, 19)  # BCM pins a dtoverlay can route to a PWM channel
+
+
+# ---------------------------
+# RPi.GPIO software PWM
+# ---------------------------
+class GPIOPWMBackend:
+    def __init__(self, frequency=PWM_FREQUENCY):
+        import RPi.GPIO as GPIO
+        self.GPIO = GPIO
+        self.frequency = frequency
+        self.channels = {}  # {pin: GPIO.PWM}
+        self.freqs = {}     # {pin: current frequency}
+
+    def setup(self, pin):
+        self.GPIO.setup(pin, self.GPIO.OUT)
+        pwm = self.GPIO.PWM(pin, self.frequency)
+        pwm.start(0)
+        self.channels[pin] = pwm
+        self.freqs[pin] = self.frequency
+
+    def _frequency(self, pin, frequency):
+        if self.freqs[pin] != frequency:
+            self.channels[pin].ChangeFrequency(frequency)
+            self.freqs[pin] = frequency
+
+    def set_level(self, pin, level):
+        self._frequency(pin, self.frequency)
+        self.channels[pin].ChangeDutyCycle(max(0.0, min(1.0, level)) * 100)
+
+    def blink(self, pin, rate, level=1.0):
+        """Blink with rate seconds on / rate seconds off, timed by the PWM."""
+        self._frequency(pin, 1.0 / (2 * rate))
+        self.channels[pin].ChangeDutyCycle(50 if level > 0 else 0)
+
+    def cleanup(self):
+        for pwm in self.channels.values():
+            pwm.stop()
+        self.channels.clear()
+        self.freqs.clear()
+
+
+# ---------------------------
+# Kernel PWM (sysfs)
+# ---------------------------
+class SysfsPWMBackend:
+    """Drive /sys/class/pwm/pwmchipN/pwmM for pins mapped to a channel.
+
+    channels: {pin: (chip, channel)}, e.g. {18: (0, 0), 19: (0, 1)} with
+    the pwm-2chan overlay. Unmapped pins fall back to ``fallback``.
+    """
+
+    root = "/sys/class/pwm"
+
+    def __init__(self, channels, fallback=None, frequency=PWM_FREQUENCY):
+        for pin in channels:
+            if pin not in HARDWARE_PWM_PINS:
+                log.warning(f"⚠️ GPIO{pin} is mapped to a PWM channel but is not a hardware PWM pin "
+                            f"{HARDWARE_PWM_PINS}; the channel will not drive it")
+        self.channels = dict(channels)
+        self.fallback = fallback
+        self.period_ns = int(1e9 / frequency)
+        self._paths = {}
+        self._periods = {}
+
+    def _write(self, path, value):
+        with open(path, "w") as f:
+            f.write(str(value))
+
+    def setup(self, pin):
+        if pin not in self.channels:
+            if self.fallback is None:
+                raise RuntimeError(f"GPIO{pin} has no PWM channel and no fallback backend")
+            log.warning(f"⚠️ GPIO{pin} has no kernel PWM channel: software PWM "
+                        f"({type(self.fallback).__name__}), blinks are software-timed")
+            self.fallback.setup(pin)
+            return
+        chip, channel = self.channels[pin]
+        chip_path = f"{self.root}/pwmchip{chip}"
+        path = f"{chip_path}/pwm{channel}"
+        if not os.path.isdir(path):
+            self._write(f"{chip_path}/export", channel)
+        self._paths[pin] = path
+        self._periods[pin] = self.period_ns
+        self._write(f"{path}/duty_cycle", 0)
+        self._write(f"{path}/period", self.period_ns)
+        self._write(f"{path}/duty_cycle", 0)
+        self._write(f"{path}/enable", 1)
+
+    def _set(self, pin, period_ns, duty_ns):
+        path = self._paths[pin]
+        if period_ns != self._periods[pin]:
+            # duty_cycle may never exceed period, so clear it before shrinking
+            self._write(f"{path}/duty_cycle", 0)
+            self._write(f"{path}/period", period_ns)
+            self._periods[pin] = period_ns
+        self._write(f"{path}/duty_cycle", duty_ns)
+
+    def set_level(self, pin, level):
+        if pin not in self._paths:
+            return self.fallback.set_level(pin, level)
+        level = max(0.0, min(1.0, level))
+        self._set(pin, self.period_ns, int(self.period_ns * level))
+
+    def blink(self, pin, rate, level=1.0):
+        if pin not in self._paths:
+            return self.fallback.blink(pin, rate, level)
+        period_ns = int(2 * rate * 1e9)
+        self._set(pin, period_ns, period_ns // 2 if level > 0 else 0)
+
+    def cleanup(self):
+        for path in self._paths.values():
+            try:
+                self._write(f"{path}/enable", 0)
+            except OSError:
+                pass
+        self._paths.clear()
+        self._periods.clear()
+        if self.fallback is not None:
+            self.fallback.cleanup()
+
+
+# ---------------------------
+# Fake backend (no hardware)
+# ---------------------------
+class FakePWMBackend:
+    """Keeps levels in memory and logs (time, pin, op, value) for inspection."""
+
+    def __init__(self):
+        self.levels = {}
+        self.blinking = {}
+        self.events = []
+        self.lock = threading.Lock()
+
+    def _record(self, pin, op, value):
+        with self.lock:
+            self.events.append((time.monotonic(), pin, op, value))
+
+    def setup(self, pin):
+        self.levels[pin] = 0.0
+        self._record(pin, "setup", None)
+
+    def set_level(self, pin, level):
+        self.levels[pin] = max(0.0, min(1.0, level))
+        self.blinking.pop(pin, None)
+        self._record(pin, "level", self.levels[pin])
+
+    def blink(self, pin, rate, level=1.0):
+        self.blinking[pin] = rate
+        self._record(pin, "blink", rate)
+
+    def cleanup(self):
+        self.levels.clear()
+        self.blinking.clear()
+        self._record(None, "cleanup", None)
+
+
+# ---------------------------
+# Selection from environment
+# ---------------------------
+def _parse_channels(spec):
+    """Parse "18=0:0,19=0:1" into {18: (0, 0), 19: (0, 1)}."""
+    channels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        pin, chip_channel = item.split("=")
+        chip, channel = chip_channel.split(":")
+        channels[int(pin)] = (int(chip), int(channel))
+    return channels
+
+
+def create_backend(kind=None):
+    """Build the backend named by LED_PWM_BACKEND (gpio/sysfs/fake); None disables PWM."""
+    kind = (kind if kind is not None else os.getenv("LED_PWM_BACKEND", "")).strip().lower()
+    if not kind:
+        return None
+    if kind == "gpio":
+        return GPIOPWMBackend()
+    if kind == "sysfs":
+        channels = _parse_channels(os.getenv("LED_PWM_SYSFS_CHANNELS", ""))
+        return SysfsPWMBackend(channels, fallback=GPIOPWMBackend())
+    if kind == "fake":
+        return FakePWMBackend()
+    raise ValueError(f"Unknown LED_PWM_BACKEND: {kind}")
@@ -1,8 +1,13 @@
+import math
 import threading
 import time
-import RPi.GPIO as GPIO
-GPIO.setmode(GPIO.BCM)
-GPIO.setwarnings(False)
+import clock
+import flightrec
+import led_pwm
+import membudget
+import metrics
+
+GPIO = None  # RPi.GPIO, imported by start()/init_leds()
 
 # LED configuration
 blink_rate = 0.5  # seconds
@@ -15,65 +20,455 @@ colours = {
     "white": 24
 }
 
-for pin in colours.values():
-    GPIO.setup(pin, GPIO.OUT)
-    GPIO.output(pin, GPIO.LOW)
+# Pattern priorities: a pattern only preempts one of equal or lower priority
+PRIORITY_BASE = 0     # steady on/off set by turn_on_led/turn_off_led
+PRIORITY_STATUS = 10  # long-running status indication
+PRIORITY_ALERT = 20   # short error/attention feedback
+
+# Effects
+breathe_period = 3.0  # seconds per breath
+effect_step_rate = 25  # Hz, duty updates for breathe/fade
 
 # Internal state
-led_states = {}  # {led_name: "off"/"on"/"blinking"}
-stop_event = threading.Event()
+led_states = {}  # {led_name: "off"/"on"/"blinking"/pattern name}
+stop_event = clock.Event()
+_pwm = None  # led_pwm backend when brightness/hardware blink is available
+_sink = None  # set_sink(): patterns go to another process instead of the pins
+_dim = 1.0    # set_dim(): scale for every brightness level (idle mode, power.py)
+
+
+# ---------------------------
+# Patterns
+# ---------------------------
+class Pattern:
+    """A list of (level, seconds) steps played on one LED.
+
+    ``seconds=None`` holds the level until the pattern is replaced.
+    ``duration=None`` makes the pattern indefinite; it then becomes the
+    pin's base pattern, which timed patterns fall back to when they end.
+    """
+
+    __slots__ = ("name", "steps", "repeat", "duration", "priority")
+
+    def __init__(self, name, steps, repeat=True, duration=None, priority=PRIORITY_BASE):
+        self.name = name
+        self.steps = list(steps)
+        self.repeat = repeat
+        self.duration = duration
+        self.priority = priority
+
+
+class HardwareBlink:
+    """Step level asking the PWM backend to blink on its own timing."""
+
+    __slots__ = ("rate",)
+
+    def __init__(self, rate):
+        self.rate = rate
+
+
+def solid(on=True, duration=None, priority=PRIORITY_BASE):
+    return Pattern("on" if on else "off", [(1 if on else 0, None)],
+                   duration=duration, priority=priority)
+
+
+def blink(rate=None, duration=None, priority=PRIORITY_ALERT):
+    rate = blink_rate if rate is None else rate
+    if _pwm is not None:
+        # The backend times the edges; the engine only wakes to end the pattern
+        return Pattern("blinking", [(HardwareBlink(rate), None)], duration=duration, priority=priority)
+    return Pattern("blinking", [(1, rate), (0, rate)], duration=duration, priority=priority)
+
+
+def pulse(on_time=0.1, period=1.0, duration=None, priority=PRIORITY_STATUS):
+    """Short flash once per period (heartbeat style)."""
+    return Pattern("pulse", [(1, on_time), (0, max(0.0, period - on_time))],
+                   duration=duration, priority=priority)
+
+
+def sequence(steps, repeat=False, duration=None, priority=PRIORITY_ALERT):
+    """Arbitrary (level, seconds) steps; plays once unless repeat is set."""
+    steps = list(steps)
+    if duration is None and not repeat:
+        duration = sum(seconds or 0 for _, seconds in steps)
+    return Pattern("sequence", steps, repeat=repeat, duration=duration, priority=priority)
+
+
+def breathe(period=None, low=0.0, high=1.0, duration=None, priority=PRIORITY_STATUS):
+    """Smooth sine brightness cycle; needs a PWM backend."""
+    period = breathe_period if period is None else period
+    count = max(2, int(period * effect_step_rate))
+    step = period / count
+    levels = (low + (high - low) * (1 - math.cos(2 * math.pi * i / count)) / 2 for i in range(count))
+    return Pattern("breathing", [(level, step) for level in levels],
+                   duration=duration, priority=priority)
+
+
+def fade(start, end, seconds=1.0, priority=PRIORITY_BASE):
+    """Linear brightness ramp that holds the end level; needs a PWM backend."""
+    count = max(1, int(seconds * effect_step_rate))
+    step = seconds / count
+    steps = [(start + (end - start) * i / count, step) for i in range(count)]
+    steps.append((end, None))
+    return Pattern("fading", steps, repeat=False, priority=priority)
+
+
+# ---------------------------
+# Timer wheel
+# ---------------------------
+class _TimerWheel:
+    """Hashed timer wheel keyed on absolute tick numbers.
+
+    Scheduling is O(1); entries more than one rotation ahead simply wait
+    in their slot until their tick comes round.
+    """
+
+    def __init__(self, tick=0.01, slots=512):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.origin = clock.monotonic()
+        self.current = 0
+        self.count = 0
+
+    def _tick_at(self, when):
+        # Small epsilon so a wake-up exactly at a deadline counts as due
+        return int((when - self.origin) / self.tick + 1e-6)
+
+    def schedule(self, when, item):
+        target = max(self.current + 1, math.ceil((when - self.origin) / self.tick))
+        self.slots[target % len(self.slots)].append((target, item))
+        self.count += 1
+
+    def next_deadline(self):
+        """Monotonic time of the earliest pending entry, or None."""
+        if not self.count:
+            return None
+        n = len(self.slots)
+        for offset in range(1, n + 1):
+            target = self.current + offset
+            if any(t == target for t, _ in self.slots[target % n]):
+                return self.origin + target * self.tick
+        # Everything pending is more than a rotation away
+        target = min(t for slot in self.slots for t, _ in slot)
+        return self.origin + target * self.tick
+
+    def pop_due(self, now):
+        now_tick = self._tick_at(now)
+        if now_tick <= self.current:
+            return []
+        n = len(self.slots)
+        due = []
+        if now_tick - self.current >= n:
+            indices = range(n)
+        else:
+            indices = (t % n for t in range(self.current + 1, now_tick + 1))
+        for i in indices:
+            slot = self.slots[i]
+            if not slot:
+                continue
+            keep = []
+            for target, item in slot:
+                (due if target <= now_tick else keep).append((target, item))
+            self.slots[i] = keep
+        self.current = now_tick
+        self.count -= len(due)
+        due.sort(key=lambda entry: entry[0])
+        return [item for _, item in due]
+
+
+# ---------------------------
+# LED engine (single thread)
+# ---------------------------
+class _PinState:
+    __slots__ = ("pattern", "base", "generation", "step", "ends_at", "level",
+                 "started", "cpu", "wakeups")
+
+    def __init__(self):
+        self.pattern = None
+        self.base = solid(False)
+        self.generation = 0
+        self.step = 0
+        self.ends_at = None
+        self.level = 0
+        # CPU accounting for the running pattern
+        self.started = clock.monotonic()
+        self.cpu = 0.0
+        self.wakeups = 0
+
+
+_cond = clock.Condition()
+_wheel = _TimerWheel(slots=membudget.cap(512, 128))
+_pins = {}
+_engine_thread = None
+
+metrics.gauge("kidspot_led_timers_pending", "Entries waiting in the LED timer wheel", fn=lambda: _wheel.count)
+membudget.track("led_timer_wheel", lambda: _wheel.slots)
 
 
-def init_leds():
+def _write(led_name, level):
+    pin = colours[led_name]
+    try:
+        if _pwm is None:
+            GPIO.output(pin, GPIO.HIGH if level else GPIO.LOW)
+        elif isinstance(level, HardwareBlink):
+            _pwm.blink(pin, level.rate)
+        else:
+            _pwm.set_level(pin, level * _dim)
+    except RuntimeError:
+        # GPIO already cleaned up during shutdown
+        pass
+
+
+def _apply_step(led_name, state, now):
+    """Drive the current step and schedule the next transition. Caller holds _cond."""
+    level, seconds = state.pattern.steps[state.step]
+    _write(led_name, level)
+    state.level = level
+    if state.pattern.name in ("on", "off"):
+        led_states[led_name] = "on" if level else "off"
+    else:
+        led_states[led_name] = state.pattern.name
+
+    wake_at = None if seconds is None else now + seconds
+    if state.ends_at is not None and (wake_at is None or state.ends_at < wake_at):
+        wake_at = state.ends_at
+    if wake_at is not None:
+        _wheel.schedule(wake_at, (led_name, state.generation))
+        _cond.notify()
+
+
+def _start(led_name, state, pattern, now):
+    state.generation += 1
+    state.pattern = pattern
+    state.step = 0
+    state.started = now
+    state.cpu = 0.0
+    state.wakeups = 0
+    state.ends_at = None if pattern.duration is None else now + pattern.duration
+    if pattern.duration is None:
+        state.base = pattern
+    _apply_step(led_name, state, now)
+
+
+def _fire(led_name, generation, now):
+    state = _pins.get(led_name)
+    if state is None or state.generation != generation:
+        return  # preempted since this entry was scheduled
+    if state.ends_at is not None and now >= state.ends_at - _wheel.tick:
+        _start(led_name, state, state.base, now)
+        return
+    cpu_start = time.thread_time()
+    state.step += 1
+    if state.step >= len(state.pattern.steps):
+        if not state.pattern.repeat:
+            if state.pattern.duration is None:
+                state.step -= 1  # indefinite one-shot (e.g. fade) holds its last level
+                return
+            _start(led_name, state, state.base, now)
+            return
+        state.step = 0
+    _apply_step(led_name, state, now)
+    state.cpu += time.thread_time() - cpu_start
+    state.wakeups += 1
+
+
+def _run():
+    with _cond:
+        while not stop_event.is_set():
+            deadline = _wheel.next_deadline()
+            if deadline is None:
+                _cond.wait()  # nothing animating: sleep until a pattern is played
+                continue
+            now = clock.monotonic()
+            if deadline > now:
+                _cond.wait(deadline - now)
+                continue
+            for led_name, generation in _wheel.pop_due(now):
+                _fire(led_name, generation, now)
+
+
+def _ensure_engine():
+    global _engine_thread
+    if _engine_thread is None or not _engine_thread.is_alive():
+        _engine_thread = threading.Thread(target=_run, name="leds", daemon=True)
+        _engine_thread.start()
+
+
+def _load_gpio():
+    global GPIO
+    if GPIO is None:
+        import RPi.GPIO as gpio
+        GPIO = gpio
     GPIO.setmode(GPIO.BCM)
-    for led_name, pin in colours.items():
-        GPIO.setup(pin, GPIO.OUT)
-        GPIO.output(pin, GPIO.LOW)
-        led_states[led_name] = "off"
+    GPIO.setwarnings(False)
+    return GPIO
+
+
+def play_pattern(led_name, pattern):
+    """Show a pattern on an LED.
+
+    Preempts the running pattern unless a timed pattern of higher priority
+    is showing, in which case an indefinite pattern still replaces the
+    pin's base so it shows once the timed one ends.
+    Returns True if the pattern is now showing; False as well once
+    shutdown_leds() has run, so a late call can't re-claim the pins.
+    """
+    if led_name not in colours:
+        raise KeyError(led_name)
+    if _sink is not None:
+        return _sink(led_name, pattern)
+    if stop_event.is_set() or (not _pins and not init_leds()):
+        return False
+    with _cond:
+        if stop_event.is_set():
+            return False
+        _ensure_engine()
+        state = _pins.setdefault(led_name, _PinState())
+        running = state.pattern
+        if running is not None and running.duration is not None and running.priority > pattern.priority:
+            if pattern.duration is None:
+                state.base = pattern
+            flightrec.record("led", led_name, f"{pattern.name} deferred")
+            return False
+        _start(led_name, state, pattern, clock.monotonic())
+        flightrec.record("led", led_name, pattern.name)
+        return True
+
+
+def set_sink(sink):
+    """Send every pattern to sink(led_name, pattern) instead of driving GPIO.
+
+    Used by the Spotify process in split-process mode (ipc.py), which has
+    no pins of its own.
+    """
+    global _sink
+    _sink = sink
+
+
+def set_dim(scale):
+    """Scale every LED's brightness by 0..1 (PWM backends only; plain GPIO stays on/off)."""
+    global _dim
+    with _cond:
+        _dim = scale
+        if _pwm is None:
+            return
+        for led_name, state in _pins.items():
+            if not isinstance(state.level, HardwareBlink):
+                _write(led_name, state.level)
+
+
+def effect_stats():
+    """CPU cost of each LED's running (non-steady) pattern.
+
+    {led_name: {"effect", "cpu_seconds", "wakeups", "cpu_percent"}}
+    """
+    now = clock.monotonic()
+    stats = {}
+    with _cond:
+        for led_name, state in _pins.items():
+            if state.pattern is None or state.pattern.name in ("on", "off"):
+                continue
+            elapsed = max(now - state.started, 1e-9)
+            stats[led_name] = {
+                "effect": state.pattern.name,
+                "cpu_seconds": state.cpu,
+                "wakeups": state.wakeups,
+                "cpu_percent": 100.0 * state.cpu / elapsed,
+            }
+    return stats
+
+
+# ---------------------------
+# Public API
+# ---------------------------
+def init_leds(pwm_backend=None):
+    """Set up LED pins; PWM comes from pwm_backend or LED_PWM_BACKEND.
+
+    Returns False, touching nothing, once shutdown_leds() has run.
+    """
+    global _pwm
+    if stop_event.is_set():
+        return False
+    _load_gpio()
+    with _cond:
+        if stop_event.is_set():
+            return False
+        _pwm = pwm_backend if pwm_backend is not None else led_pwm.create_backend()
+        for led_name, pin in colours.items():
+            if _pwm is not None:
+                _pwm.setup(pin)
+            else:
+                GPIO.setup(pin, GPIO.OUT)
+                GPIO.output(pin, GPIO.LOW)
+            _pins[led_name] = _PinState()
+            led_states[led_name] = "off"
+        _ensure_engine()
+    return True
+
+
+start = init_leds
 
 
 def turn_on_led(led_name):
-    pin = colours[led_name]
-    GPIO.output(pin, GPIO.HIGH)
-    led_states[led_name] = "on"
+    play_pattern(led_name, solid(True))
 
 
 def turn_off_led(led_name):
-    pin = colours[led_name]
-    GPIO.output(pin, GPIO.LOW)
-    led_states[led_name] = "off"
+    play_pattern(led_name, solid(False))
 
 
 def blink_led(led_name, duration=None):
     if duration is None:
         duration = default_duration
+    play_pattern(led_name, blink(duration=duration))
+
 
-    def _blink():
-        end_time = time.time() + duration
-        while time.time() < end_time and not stop_event.is_set():
-            turn_on_led(led_name)
-            time.sleep(blink_rate)
-            turn_off_led(led_name)
-            time.sleep(blink_rate)
-        led_states[led_name] = "off"
+def set_brightness(led_name, level):
+    """Steady brightness 0..1 (plain on/off without a PWM backend)."""
+    if _pwm is None:
+        level = 1 if level >= 0.5 else 0
+    play_pattern(led_name, Pattern("on" if level else "off", [(level, None)]))
 
-    threading.Thread(target=_blink, daemon=True).start()
+
+def breathe_led(led_name, period=None, duration=None):
+    if _pwm is None:
+        return play_pattern(led_name, pulse(duration=duration))
+    return play_pattern(led_name, breathe(period, duration=duration))
+
+
+def fade_led(led_name, level, seconds=1.0):
+    """Fade from the current brightness to level and hold it there."""
+    if _pwm is None:
+        return set_brightness(led_name, level)
+    with _cond:
+        state = _pins.get(led_name)
+        current = state.level if state is not None and not isinstance(state.level, HardwareBlink) else 0
+    return play_pattern(led_name, fade(current, level, seconds))
 
 
 def test_all_leds():
     for led_name in colours:
         turn_on_led(led_name)
-    time.sleep(1)
+    clock.sleep(1)
     for led_name in colours:
         turn_off_led(led_name)
 
 
 def shutdown_leds():
-    stop_event.set()
-    for led_name in colours:
-        try:
-            GPIO.output(pin, GPIO.LOW)
-        except RuntimeError:
-            # If GPIO not initialized, skip
-            pass
-    GPIO.cleanup()
+    global _pwm
+    if _sink is not None:
+        return
+    with _cond:
+        stop_event.set()
+        _cond.notify_all()
+        for led_name in colours:
+            _write(led_name, 0)
+            led_states[led_name] = "off"
+        _pins.clear()
+        if _pwm is not None:
+            _pwm.cleanup()
+            _pwm = None
+    if _engine_thread is not None and _engine_thread is not threading.current_thread():
+        _engine_thread.join(timeout=1)
+    if GPIO is not None:
+        GPIO.cleanup()
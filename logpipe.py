@@ -0,0 +1,258 @@
+# logpipe.py
+"""Non-blocking log pipeline: print() and logging both go through one queue.
+
+install() replaces sys.stdout/sys.stderr and the root logging handler
+with cheap enqueuers, so a swipe, button press or Spotify call only
+pays for building a record and a put_nowait(). One background writer
+thread then:
+
+- rate-limits repeats: after REPEAT_BURST similar records (same logger
+  and level, digits and hex IDs ignored) within REPEAT_WINDOW seconds,
+  the rest are counted, and one summary line is written when the window
+  ends (checked every FLUSH_INTERVAL while the queue is quiet)
+- writes a short line to the original stdout (the systemd journal)
+- writes a JSON line per record to LOG_FILE, rotated at LOG_MAX_BYTES;
+  the default path is on tmpfs so the SD card is never touched
+
+If the queue is full the record is dropped and counted, never waited
+for. bench/log_overhead.py measures the per-call cost.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import membudget
+import metrics
+
+log = logging.getLogger("LogPipe")
+
+LOG_LEVEL = os.getenv("KIDSPOT_LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("KIDSPOT_LOG_FILE", "/dev/shm/kidspot/kidspot.log")  # "" = journal only
+LOG_MAX_BYTES = int(os.getenv("KIDSPOT_LOG_MAX_BYTES", 1024 * 1024))
+LOG_BACKUPS = 2
+QUEUE_SIZE = membudget.cap(2048, 256)
+REPEAT_WINDOW = 60.0  # seconds
+REPEAT_BURST = 5      # similar records let through per window
+FLUSH_INTERVAL = 5.0  # seconds the writer waits for a record before summarising ended windows
+
+WRITTEN = metrics.counter("kidspot_log_records_total", "Log records written", ["level"])
+DROPPED = metrics.counter("kidspot_log_dropped_total", "Log records dropped because the queue was full")
+SUPPRESSED = metrics.counter("kidspot_log_suppressed_total", "Repeated log records suppressed", ["logger"])
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+metrics.gauge("kidspot_log_queue_depth", "Log records waiting for the writer", fn=_queue.qsize)
+_listener = None
+_streams = None  # (stdout, stderr) before install()
+
+# Record attributes that are not user-supplied extra={...} fields
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _enqueue(record):
+    try:
+        _queue.put_nowait(record)
+    except queue.Full:
+        DROPPED.inc()
+
+
+class _QueueHandler(logging.Handler):
+    """Root handler: hands the record to the writer as is (messages are f-strings already)."""
+
+    def handle(self, record):
+        _enqueue(record)
+        return True
+
+
+class _PrintStream:
+    """Stands in for sys.stdout/stderr: each complete line becomes a log record."""
+
+    def __init__(self, name, level, original):
+        self.name = name
+        self.level = level
+        self.original = original
+        self.encoding = getattr(original, "encoding", "utf-8")
+        self._partial = threading.local()
+
+    def write(self, text):
+        # print() writes the text and the newline separately
+        pending = getattr(self._partial, "text", "") + text
+        *lines, rest = pending.split("\n")
+        self._partial.text = rest
+        for line in lines:
+            if line:
+                _enqueue(logging.LogRecord(self.name, self.level, "", 0, line, None, None))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def fileno(self):
+        return self.original.fileno()
+
+# ---------------------------
+# Writer side
+# ---------------------------
+_NUMBERS = re.compile(r"\b[0-9A-Fa-f]*\d[0-9A-Fa-f]*\b")
+
+
+class _Repeats:
+    """Lets REPEAT_BURST similar records through per REPEAT_WINDOW, counts the rest."""
+
+    MAX_KEYS = 256
+
+    def __init__(self):
+        self.windows = {}  # {key: [window start, seen, first suppressed record]}
+
+    def allow(self, record):
+        """The records to write now: [], [record], or [summary, record]"""
+        text = record.msg if record.args else str(record.msg)
+        key = (record.name, record.levelno, _NUMBERS.sub("#", text))
+        now = record.created
+        window = self.windows.get(key)
+        out = []
+        if window is None or now - window[0] >= REPEAT_WINDOW:
+            if window is not None and window[1] > REPEAT_BURST:
+                out.append(self._summary(window))
+            if window is None and len(self.windows) >= self.MAX_KEYS:
+                self._prune(now)
+            window = self.windows[key] = [now, 0, None]
+        window[1] += 1
+        if window[1] > REPEAT_BURST:
+            if window[2] is None:
+                window[2] = record
+            SUPPRESSED.labels(record.name).inc()
+            return out
+        out.append(record)
+        return out
+
+    def expired(self, now):
+        """Summaries for windows that have ended, which are then forgotten"""
+        ended = [key for key, w in self.windows.items() if now - w[0] >= REPEAT_WINDOW]
+        return [self._summary(w) for w in map(self.windows.pop, ended) if w[1] > REPEAT_BURST]
+
+    def pending(self):
+        """Summaries for windows still suppressing (written on stop())"""
+        return [self._summary(w) for w in self.windows.values() if w[1] > REPEAT_BURST]
+
+    def _summary(self, window):
+        first = window[2]
+        summary = logging.LogRecord(first.name, first.levelno, "", 0,
+                                    f"(suppressed {window[1] - REPEAT_BURST} more like: {first.getMessage()})",
+                                    None, None)
+        summary.created = first.created
+        return summary
+
+    def _prune(self, now):
+        for key in [k for k, w in self.windows.items() if now - w[0] >= REPEAT_WINDOW]:
+            del self.windows[key]
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, thread, message and any extra fields."""
+
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name,
+                 "thread": record.threadName, "msg": record.getMessage()}
+        for name, value in vars(record).items():
+            if name not in _STANDARD:
+                entry[name] = value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _ConsoleFormatter(logging.Formatter):
+    """Journal lines: print() output as it was, log records with level and logger."""
+
+    def format(self, record):
+        if record.name in ("stdout", "stderr"):
+            return record.getMessage()
+        return super().format(record)
+
+
+class _Writer(logging.handlers.QueueListener):
+    def __init__(self, handlers):
+        super().__init__(_queue, *handlers, respect_handler_level=True)
+        self.repeats = _Repeats()
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, FLUSH_INTERVAL)
+            except queue.Empty:
+                if not block:
+                    raise
+                for summary in self.repeats.expired(time.time()):
+                    self._write(summary)
+
+    def handle(self, record):
+        for out in self.repeats.allow(record):
+            self._write(out)
+
+    def _write(self, record):
+        WRITTEN.labels(record.levelname).inc()
+        super().handle(record)
+
+
+def _file_handler(path):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                                       encoding="utf-8")
+    except OSError as e:
+        print(f"⚠️ Log file {path} unavailable, journal only: {e}", file=_streams[1])
+        return None
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+# ---------------------------
+# Public start/stop functions
+# ---------------------------
+def install(log_file=LOG_FILE, level=LOG_LEVEL, console=None):
+    """Route print() and logging through the queue; idempotent. console defaults to the real stdout."""
+    global _listener, _streams
+    if _listener is not None:
+        return
+    _streams = (sys.stdout, sys.stderr)
+    stream = logging.StreamHandler(console or sys.stdout)
+    stream.setFormatter(_ConsoleFormatter("%(levelname).1s %(name)s: %(message)s"))
+    handlers = [stream]
+    file_handler = _file_handler(log_file) if log_file else None
+    if file_handler is not None:
+        handlers.append(file_handler)
+
+    root = logging.getLogger()
+    root.handlers = [_QueueHandler()]
+    root.setLevel(level)
+    sys.stdout = _PrintStream("stdout", logging.INFO, _streams[0])
+    sys.stderr = _PrintStream("stderr", logging.WARNING, _streams[1])
+    _listener = _Writer(handlers)
+    _listener.start()
+    atexit.register(stop)
+
+
+def stop():
+    """Write out everything queued and give print() its streams back"""
+    global _listener
+    if _listener is None:
+        return
+    sys.stdout, sys.stderr = _streams
+    try:
+        _listener.stop()
+    except queue.Full:
+        pass
+    for summary in _listener.repeats.pending():
+        logging.handlers.QueueListener.handle(_listener, summary)
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger().handlers = []
+    _listener = None
@@ -0,0 +1,80 @@
+# membudget.py
+"""Memory budget for low-RAM units (e.g. a 512 MB Pi Zero 2 next to raspotify).
+
+KIDSPOT_MEMORY_BUDGET=1 shrinks every bounded cache and queue via cap().
+Structures registered with track() are sized at scrape time and exported
+by metrics.py, with the process RSS, as kidspot_structure_bytes and
+kidspot_rss_bytes.
+"""
+import os
+import sys
+import threading
+import logging
+
+log = logging.getLogger("MemBudget")
+
+ENABLED = os.getenv("KIDSPOT_MEMORY_BUDGET", "0") not in ("", "0")
+
+_tracked = {}  # {structure name: callable returning the object}
+_lock = threading.Lock()
+
+
+def cap(normal, budget):
+    """Size limit for a cache/queue: budget in memory-budget mode, else normal."""
+    return budget if ENABLED else normal
+
+
+def rss_bytes():
+    """Resident set size from /proc (0 where unavailable).
+
+    A raw os.read(): every text-mode open() leaves a little memory behind,
+    and this runs on each metrics scrape for the life of the daemon.
+    """
+    try:
+        fd = os.open("/proc/self/statm", os.O_RDONLY)
+    except OSError:
+        return 0
+    try:
+        return int(os.read(fd, 128).split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+    finally:
+        os.close(fd)
+
+
+def deep_size(obj, _seen=None):
+    """Approximate bytes held by obj and everything it references (containers and slots)."""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in list(obj))
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_size(getattr(obj, name), seen)
+                    for name in obj.__slots__ if hasattr(obj, name))
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+def track(name, getter):
+    """Export the deep size of getter() as kidspot_structure_bytes{structure=name}."""
+    with _lock:
+        _tracked[name] = getter
+
+
+def structure_sizes():
+    with _lock:
+        items = list(_tracked.items())
+    sizes = {}
+    for name, getter in items:
+        try:
+            sizes[(name,)] = deep_size(getter())
+        except Exception as e:
+            log.warning(f"Could not size {name}: {e}")
+    return sizes
+
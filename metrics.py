@@ -0,0 +1,292 @@
+# metrics.py
+"""In-process metrics in Prometheus text format.
+
+Modules declare their metrics at import time, next to their logger:
+
+    SWIPES = metrics.counter("kidspot_swipes_total", "Card swipes", ["result"])
+    SWIPES.labels("unknown").inc()
+
+Updating a metric is a dict lookup plus a locked add, cheap enough for
+the swipe and button paths (see bench/metrics_overhead.py). start_server()
+serves /metrics on localhost for a Prometheus scrape or a plain curl.
+"""
+import bisect
+import os
+import threading
+import time
+import logging
+import membudget
+
+log = logging.getLogger("Metrics")
+
+DEFAULT_PORT = int(os.getenv("KIDSPOT_METRICS_PORT", 9464))
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_LABEL_SETS = membudget.cap(200, 50)  # per metric; further label sets are folded into "other"
+
+_registry = {}
+_registry_lock = threading.Lock()
+_server = None
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# ---------------------------
+# Metric types
+# ---------------------------
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                if values not in self._children and len(self._children) >= MAX_LABEL_SETS:
+                    values = ("other",) * len(self.labelnames)
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield from child._samples(self.name, self.labelnames, values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def _samples(self, name, labelnames, values):
+        yield name, _format_labels(labelnames, values), self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), fn=None):
+        """fn: optional callable evaluated at scrape time; returns a value,
+        or {label_values_tuple: value} for a labelled gauge."""
+        self.fn = fn
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._children[()].set(value)
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def dec(self, amount=1):
+        self._children[()].dec(amount)
+
+    def _samples(self):
+        if self.fn is None:
+            yield from super()._samples()
+            return
+        try:
+            result = self.fn()
+        except Exception as e:
+            log.warning(f"Gauge {self.name} callback failed: {e}")
+            return
+        if isinstance(result, dict):
+            for values, value in result.items():
+                yield self.name, _format_labels(self.labelnames, values), value
+        else:
+            yield self.name, "", result
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "total", "count", "lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.total += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def _samples(self, name, labelnames, values):
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            yield f"{name}_bucket", _format_labels(labelnames, values, [("le", _format_value(float(bound)))]), cumulative
+        yield f"{name}_sum", _format_labels(labelnames, values), self.total
+        yield f"{name}_count", _format_labels(labelnames, values), self.count
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+
+# ---------------------------
+# Registry
+# ---------------------------
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        existing = _registry.get(name)
+        if existing is not None:
+            # Re-importing a module reuses the metric instead of resetting it
+            return existing
+        metric = cls(name, *args, **kwargs)
+        _registry[name] = metric
+        return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=(), fn=None):
+    return _register(Gauge, name, documentation, labelnames, fn=fn)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+def render():
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+# Process-wide gauges
+gauge("kidspot_threads", "Live Python threads", fn=threading.active_count)
+gauge("kidspot_uptime_seconds", "Seconds since the metrics module was loaded",
+      fn=lambda t0=time.monotonic(): time.monotonic() - t0)
+gauge("kidspot_rss_bytes", "Resident set size of the daemon", fn=membudget.rss_bytes)
+gauge("kidspot_structure_bytes", "Approximate size of tracked in-memory structures",
+      ["structure"], fn=membudget.structure_sizes)
+
+
+# ---------------------------
+# HTTP exposition
+# ---------------------------
+def start_server(port=DEFAULT_PORT, host="127.0.0.1"):
+    """Serve /metrics in a daemon thread; port 0 disables the endpoint."""
+    global _server
+    if not port or _server is not None:
+        return _server
+    # Imported here so loading metrics.py stays cheap at boot
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes would otherwise flood the journal
+
+    _server = ThreadingHTTPServer((host, port), _Handler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    log.info(f"📈 Metrics on http://{host}:{port}/metrics")
+    return _server
+
+
+def stop_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server = None
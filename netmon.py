@@ -0,0 +1,120 @@
+# netmon.py
+"""Connectivity monitor: is the Spotify Web API reachable right now?
+
+A supervised worker resolves the API host and opens a TCP connection to
+it every few seconds. While that fails the network is marked down and
+require() raises Offline at once, so RFID/button threads get an answer
+(and a red LED) instead of sitting in a Wi-Fi timeout. Callbacks
+registered with on_change() run in the monitor thread on every
+transition; spot.py uses the "up" transition to re-arm all sessions.
+Until start() runs the network is assumed up.
+"""
+import socket
+import threading
+import time
+import logging
+import flightrec
+import leds
+import metrics
+import power
+
+log = logging.getLogger("Netmon")
+
+API_HOST = "api.spotify.com"
+API_PORT = 443
+CHECK_TIMEOUT = 2.0    # seconds for the TCP connect
+INTERVAL_UP = 10.0     # seconds between checks while online
+INTERVAL_DOWN = 2.0    # ... and while offline, to notice recovery quickly
+FAILURES_TO_DOWN = 2   # consecutive failed checks before marking down
+STALL_TIMEOUT = 60     # getaddrinfo has no timeout of its own
+
+ONLINE = metrics.gauge("kidspot_network_up", "1 if the Spotify API host is reachable")
+TRANSITIONS = metrics.counter("kidspot_network_transitions_total", "Connectivity changes", ["state"])
+OFFLINE_CALLS = metrics.counter("kidspot_offline_calls_total", "Spotify calls refused because the network is down")
+ONLINE.set(1)
+
+
+class Offline(ConnectionError):
+    """Raised by require() while the network is marked down."""
+
+
+_up = threading.Event()
+_up.set()
+_callbacks = []
+_failures = 0
+_down_since = None
+
+
+def is_up():
+    return _up.is_set()
+
+
+def require():
+    """Raise Offline (and flash red) if the network is marked down."""
+    if not _up.is_set():
+        OFFLINE_CALLS.inc()
+        leds.blink_led("red", duration=1)
+        raise Offline(f"network down for {time.monotonic() - _down_since:.0f}s")
+
+
+def on_change(callback):
+    """Call callback(up) on every transition, from the monitor thread."""
+    _callbacks.append(callback)
+
+
+def check(host=API_HOST, port=API_PORT, timeout=CHECK_TIMEOUT):
+    """One DNS lookup plus TCP connect; returns True if the host answered."""
+    try:
+        address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4]
+        with socket.create_connection(address[:2], timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _set_state(up):
+    global _down_since
+    if up == _up.is_set():
+        return
+    if up:
+        log.info(f"🌐 Network back after {time.monotonic() - _down_since:.0f}s")
+        _up.set()
+        leds.turn_off_led("red")
+    else:
+        log.warning("📴 Network down, failing Spotify calls fast")
+        _down_since = time.monotonic()
+        _up.clear()
+        leds.play_pattern("red", leds.pulse(on_time=0.2, period=2.0))
+    flightrec.record("network", API_HOST, "up" if up else "down")
+    ONLINE.set(1 if up else 0)
+    TRANSITIONS.labels("up" if up else "down").inc()
+    for callback in _callbacks:
+        try:
+            callback(up)
+        except Exception:
+            log.exception("Network change callback failed")
+
+
+def _monitor(heartbeat=None):
+    global _failures
+    while heartbeat is None or not heartbeat.stopped():
+        if heartbeat is not None:
+            heartbeat.beat()
+        if check():
+            _failures = 0
+            _set_state(True)
+        else:
+            _failures += 1
+            if _failures >= FAILURES_TO_DOWN:
+                _set_state(False)
+        # Suspended while idle: the next command wakes it for a fresh check
+        power.sleep(INTERVAL_UP if _up.is_set() else INTERVAL_DOWN, STALL_TIMEOUT / 2, "netmon")
+
+
+def start(supervisor=None):
+    """Start the monitor thread (restarted by supervisor if given)"""
+    if supervisor is not None:
+        return supervisor.add("netmon", _monitor, stall_timeout=STALL_TIMEOUT)
+    t = threading.Thread(target=_monitor, name="netmon", daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,116 @@
+# player_events.py
+"""Local player events from the raspotify device on this Pi.
+
+player_hook.py (librespot's onevent hook) sends each event as a JSON
+datagram to EVENT_SOCKET. A listener thread feeds them into a
+spot.LocalPlayer, which SpotInstance.get_current_playback() answers
+from without calling the Web API; the Web API is then only used for
+commands. The green LED follows the local play/pause state.
+
+The socket lives in a private runtime directory (mode 0750, socket
+0660), both owned by EVENT_GROUP, which the raspotify user is added to
+(kidspot_setup.sh); nobody else can send events.
+"""
+import grp
+import json
+import os
+import socket
+import threading
+import logging
+import frontdoor
+import leds
+import metrics
+import power
+import spot
+
+log = logging.getLogger("PlayerEvents")
+
+EVENT_SOCKET = os.getenv("KIDSPOT_EVENT_SOCKET", "/run/kidspot/events.sock")
+EVENT_GROUP = os.getenv("KIDSPOT_EVENT_GROUP", "kidspot")  # shared with the raspotify user
+STALL_TIMEOUT = 30
+MAX_DATAGRAM = 8192
+
+EVENTS = metrics.counter("kidspot_player_events_total", "librespot player events received", ["event"])
+
+player = spot.LocalPlayer()
+_sock = None
+
+
+def handle(event):
+    """Apply one event dict to the local player and the LEDs"""
+    name = event.get("PLAYER_EVENT", "unknown")
+    was_playing = player.is_playing
+    if not player.apply(event):
+        name = "ignored"
+    EVENTS.labels(name).inc()
+    if player.is_playing != was_playing:
+        if player.is_playing:
+            power.wake("player")  # started from the app while idle
+            frontdoor.mark("first_sound")
+            leds.turn_on_led("green")
+        else:
+            leds.turn_off_led("green")
+
+
+def _listen(heartbeat=None):
+    _sock.settimeout(1.0)
+    while heartbeat is None or not heartbeat.stopped():
+        if heartbeat is not None:
+            heartbeat.beat()
+        try:
+            data = _sock.recv(MAX_DATAGRAM)
+        except socket.timeout:
+            continue
+        except OSError:
+            return  # socket closed by stop()
+        try:
+            handle(json.loads(data))
+        except ValueError as e:
+            log.warning(f"Bad player event: {e}")
+
+
+def _share(path, mode):
+    """chmod path and hand it to EVENT_GROUP (left as is if the group is missing)"""
+    os.chmod(path, mode)
+    try:
+        os.chown(path, -1, grp.getgrnam(EVENT_GROUP).gr_gid)
+    except KeyError:
+        log.warning(f"⚠️ Group {EVENT_GROUP} missing: only this user can send player events")
+
+# ---------------------------
+# Public start/stop functions
+# ---------------------------
+def start(supervisor=None, path=EVENT_SOCKET):
+    """Bind the event socket and start the listener (restarted by supervisor if given)"""
+    global _sock
+    runtime_dir = os.path.dirname(path)
+    os.makedirs(runtime_dir, mode=0o750, exist_ok=True)
+    if os.stat(runtime_dir).st_mode & 0o002:
+        raise PermissionError(f"{runtime_dir} is world-writable; use a private directory for the event socket")
+    if os.path.exists(path):
+        os.unlink(path)
+    _sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    old_umask = os.umask(0o117)  # no window where the socket is open to others
+    try:
+        _sock.bind(path)
+    finally:
+        os.umask(old_umask)
+    if os.stat(runtime_dir).st_uid == os.getuid():
+        _share(runtime_dir, 0o750)
+    _share(path, 0o660)
+    log.info(f"🎧 Listening for player events on {path}")
+    if supervisor is not None:
+        return supervisor.add("player-events", _listen, stall_timeout=STALL_TIMEOUT)
+    t = threading.Thread(target=_listen, name="player-events", daemon=True)
+    t.start()
+    return t
+
+
+def stop():
+    global _sock
+    if _sock is not None:
+        path = _sock.getsockname()
+        _sock.close()
+        _sock = None
+        if path and os.path.exists(path):
+            os.unlink(path)
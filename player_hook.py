@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# player_hook.py
+"""librespot --onevent hook: forward one player event to kidspot.
+
+librespot runs this once per event with the details in environment
+variables (PLAYER_EVENT, TRACK_ID, POSITION_MS, VOLUME, ...). It sends
+them as one JSON datagram to the kidspot event socket and exits; if
+kidspot isn't running the event is dropped. Standard library only, so it
+starts fast. In /etc/default/raspotify:
+
+    LIBRESPOT_ONEVENT="/usr/bin/python3 /home/pi/kidspot/player_hook.py"
+"""
+import json
+import os
+import socket
+import time
+
+SOCKET_PATH = os.getenv("KIDSPOT_EVENT_SOCKET", "/run/kidspot/events.sock")
+FIELDS = ("PLAYER_EVENT", "TRACK_ID", "OLD_TRACK_ID", "URI", "ITEM_TYPE", "NAME",
+          "DURATION_MS", "POSITION_MS", "VOLUME", "CLIENT_NAME")
+
+
+def send(event, path=SOCKET_PATH):
+    """Send one event dict; returns False if kidspot isn't listening."""
+    event.setdefault("time", time.time())
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.sendto(json.dumps(event).encode(), path)
+            return True
+        except OSError:
+            return False
+
+
+if __name__ == "__main__":
+    send({name: os.environ[name] for name in FIELDS if name in os.environ})
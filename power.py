@@ -0,0 +1,164 @@
+# power.py
+"""Whole-system idle mode (KIDSPOT_IDLE_AFTER seconds, 0 = never).
+
+kidspot.py runs the monitor. After IDLE_AFTER seconds with no command
+and nothing playing, the box goes idle:
+
+- polled RFID readers poll every IDLE_POLL_INTERVAL and power the PN532
+  down between polls (IRQ readers already sleep on their edge)
+- the button loop stops polling and waits for a GPIO edge
+- background pollers (netmon, IPC status) stop ticking
+- LEDs dim to IDLE_BRIGHTNESS
+
+Every command (commands.execute) and every button edge calls wake().
+Loops waiting in sleep() return at once, and each records how long it
+took to get back to full speed in kidspot_wake_latency_seconds. A loop
+inside a PN532 read or an IRQ edge wait resumes once that returns, so
+the worst case is about POLL_TIMEOUT/IRQ_WAIT_MS (rfid.py).
+
+Idle power is reported as process CPU per wall second in each mode
+(kidspot_power_cpu_seconds_total / kidspot_power_mode_seconds_total,
+and stats() in the supervisor status file).
+"""
+import os
+import threading
+import time
+import logging
+import clock
+import flightrec
+import leds
+import metrics
+
+log = logging.getLogger("Power")
+
+IDLE_AFTER = float(os.getenv("KIDSPOT_IDLE_AFTER", 300))  # seconds without activity, 0 = never idle
+IDLE_POLL_INTERVAL = 1.0   # seconds between polls of a polled RFID reader while idle
+IDLE_WAIT = 10.0           # longest a suspended loop waits before beating its heartbeat
+IDLE_BRIGHTNESS = 0.2
+CHECK_INTERVAL = 5.0       # seconds between idle checks
+
+ACTIVE = "active"
+IDLE = "idle"
+
+IDLE_STATE = metrics.gauge("kidspot_idle", "1 while the box is in idle power mode")
+TRANSITIONS = metrics.counter("kidspot_power_transitions_total", "Power mode changes", ["state", "source"])
+WAKE_SECONDS = metrics.histogram("kidspot_wake_latency_seconds", "Time from wake() to a suspended loop running again",
+                                 ["loop"], buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0))
+CPU_SECONDS = metrics.counter("kidspot_power_cpu_seconds_total", "Process CPU time by power mode", ["mode"])
+MODE_SECONDS = metrics.counter("kidspot_power_mode_seconds_total", "Wall time by power mode", ["mode"])
+
+state = ACTIVE
+_awake = clock.Event()
+_awake.set()
+_lock = threading.Lock()
+_last_activity = clock.monotonic()
+_woke_at = 0.0
+_idle_since = None
+_busy = []          # callables; any returning True keeps the box active (e.g. playing)
+_wake_latency = {}  # {loop: last wake latency}
+
+
+def is_idle():
+    return not _awake.is_set()
+
+
+def keep_awake_while(predicate):
+    """Never go idle while predicate() is True"""
+    _busy.append(predicate)
+
+
+def wake(source):
+    """Note activity; leave idle mode if in it. Cheap enough for every input."""
+    global _last_activity, state, _woke_at, _idle_since
+    _last_activity = clock.monotonic()
+    if _awake.is_set():
+        return
+    with _lock:
+        if _awake.is_set():
+            return
+        state = ACTIVE
+        _woke_at = clock.monotonic()
+        _idle_since = None
+        _awake.set()
+    IDLE_STATE.set(0)
+    TRANSITIONS.labels(ACTIVE, source).inc()
+    flightrec.record("power", ACTIVE, source)
+    leds.set_dim(1.0)
+    log.info(f"☀️ Awake ({source})")
+
+
+def sleep(active_seconds, idle_seconds=IDLE_WAIT, loop=None):
+    """Sleep active_seconds; while idle, wait up to idle_seconds but return as soon as wake() runs."""
+    if _awake.is_set():
+        clock.sleep(active_seconds)
+        return
+    if _awake.wait(idle_seconds) and loop is not None:
+        latency = clock.monotonic() - _woke_at
+        _wake_latency[loop] = latency
+        WAKE_SECONDS.labels(loop).observe(latency)
+
+
+def _go_idle():
+    global state, _idle_since
+    with _lock:
+        state = IDLE
+        _idle_since = clock.time()
+        _awake.clear()
+    IDLE_STATE.set(1)
+    TRANSITIONS.labels(IDLE, "timeout").inc()
+    flightrec.record("power", IDLE, f"{IDLE_AFTER:.0f}s quiet")
+    leds.set_dim(IDLE_BRIGHTNESS)
+    log.info(f"🌙 Idle after {IDLE_AFTER:.0f}s without activity")
+
+
+def _busy_now():
+    for predicate in _busy:
+        try:
+            if predicate():
+                return True
+        except Exception as e:
+            log.warning(f"Idle check failed: {e}")
+            return True
+    return False
+
+
+def _monitor(heartbeat=None):
+    global _last_activity
+    cpu_at, wall_at = time.process_time(), clock.monotonic()
+    while heartbeat is None or not heartbeat.stopped():
+        if heartbeat is not None:
+            heartbeat.beat()
+        clock.sleep(CHECK_INTERVAL)
+        cpu, wall = time.process_time(), clock.monotonic()
+        mode = state
+        CPU_SECONDS.labels(mode).inc(cpu - cpu_at)
+        MODE_SECONDS.labels(mode).inc(wall - wall_at)
+        cpu_at, wall_at = cpu, wall
+        if mode == ACTIVE and wall - _last_activity >= IDLE_AFTER:
+            if _busy_now():
+                _last_activity = wall  # playing counts as activity
+            else:
+                _go_idle()
+
+
+def stats():
+    """Mode, CPU share per mode and the last wake latency of each loop (for the status file)"""
+    cpu = {mode: CPU_SECONDS.labels(mode).value for mode in (ACTIVE, IDLE)}
+    wall = {mode: MODE_SECONDS.labels(mode).value for mode in (ACTIVE, IDLE)}
+    return {
+        "state": state,
+        "idle_since": _idle_since,
+        "cpu_percent": {mode: round(100.0 * cpu[mode] / wall[mode], 3) if wall[mode] else None for mode in cpu},
+        "wake_latency": {loop: round(latency, 4) for loop, latency in _wake_latency.items()},
+    }
+
+
+def start(supervisor=None):
+    """Start the idle monitor (nothing if IDLE_AFTER is 0)"""
+    if not IDLE_AFTER:
+        return None
+    if supervisor is not None:
+        return supervisor.add("power", _monitor)
+    t = threading.Thread(target=_monitor, name="power", daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,177 @@
+# profiler.py
+"""On-demand profiling of the running daemon.
+
+    kill -USR1 <pid>   start sampling all threads + tracemalloc
+    kill -USR2 <pid>   stop and write a report
+
+Each report is a directory under KIDSPOT_PROFILE_DIR holding:
+- top_functions.txt  self/total samples per function
+- threads.txt        hottest stacks per thread
+- stacks.folded      collapsed stacks (flamegraph.pl / speedscope)
+- memory.txt         tracemalloc allocation diff start → stop
+Only the newest KEEP_REPORTS directories are kept. Nothing runs and
+tracemalloc is off until SIGUSR1 arrives.
+"""
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+import logging
+import membudget
+from collections import Counter, defaultdict
+
+log = logging.getLogger("Profiler")
+
+PROFILE_DIR = os.getenv("KIDSPOT_PROFILE_DIR", "/tmp/kidspot_profiles")
+SAMPLE_INTERVAL = 0.01   # seconds between stack samples
+KEEP_REPORTS = 5
+TRACEMALLOC_FRAMES = membudget.cap(10, 3)
+TOP_N = 40
+
+_session = None
+_lock = threading.RLock()  # re-entrant: handlers may interrupt the main thread mid-call
+
+
+class _Session:
+    def __init__(self, interval):
+        self.interval = interval
+        self.started = time.time()
+        self.samples = 0
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self.stacks = defaultdict(Counter)  # {thread name: {folded stack: samples}}
+        self.stop_event = threading.Event()
+        self.snapshot = None
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                self.self_counts[stack[0]] += 1
+                for entry in set(stack):
+                    self.total_counts[entry] += 1
+                self.stacks[names.get(ident, str(ident))][";".join(reversed(stack))] += 1
+            self.samples += 1
+        try:
+            path = self._write_report()
+            log.info(f"📝 Profile written to {path}")
+        except OSError as e:
+            log.warning(f"Could not write profile report: {e}")
+        finally:
+            self._stop_tracing()
+
+    def _stop_tracing(self):
+        """Stop tracemalloc, unless a newer session has started tracing since"""
+        if self.snapshot is None:
+            return
+        with _lock:
+            if _session is None or _session.snapshot is None:
+                tracemalloc.stop()
+
+    def _report_dir(self):
+        """A new directory named after the start time (-2, -3... if that second is taken)"""
+        base = os.path.join(PROFILE_DIR, time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started)))
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path, n = base, 1
+        while True:
+            try:
+                os.mkdir(path)
+                return path
+            except FileExistsError:
+                n += 1
+                path = f"{base}-{n}"
+
+    def _write_report(self):
+        path = self._report_dir()
+        duration = time.time() - self.started
+
+        with open(os.path.join(path, "top_functions.txt"), "w") as f:
+            f.write(f"{self.samples} samples over {duration:.1f}s every {self.interval * 1000:.0f} ms\n\n")
+            f.write(f"{'self':>7} {'total':>7}  function\n")
+            for entry, count in self.self_counts.most_common(TOP_N):
+                f.write(f"{count:>7} {self.total_counts[entry]:>7}  {entry}\n")
+
+        with open(os.path.join(path, "threads.txt"), "w") as f:
+            for name, stacks in sorted(self.stacks.items()):
+                f.write(f"=== {name} ({sum(stacks.values())} samples) ===\n")
+                for stack, count in stacks.most_common(5):
+                    f.write(f"{count:>7}  {stack.replace(';', chr(10) + ' ' * 9 + '→ ')}\n")
+                f.write("\n")
+
+        with open(os.path.join(path, "stacks.folded"), "w") as f:
+            for name, stacks in self.stacks.items():
+                for stack, count in stacks.items():
+                    f.write(f"{name};{stack} {count}\n")
+
+        if self.snapshot is not None:
+            end = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            with open(os.path.join(path, "memory.txt"), "w") as f:
+                f.write(f"traced now {current / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB\n\n")
+                for stat in end.compare_to(self.snapshot, "lineno")[:TOP_N]:
+                    f.write(f"{stat}\n")
+
+        _rotate()
+        return path
+
+
+def _rotate():
+    reports = sorted(d for d in os.listdir(PROFILE_DIR) if os.path.isdir(os.path.join(PROFILE_DIR, d)))
+    for old in reports[:-KEEP_REPORTS]:
+        shutil.rmtree(os.path.join(PROFILE_DIR, old), ignore_errors=True)
+
+
+# ---------------------------
+# Public start/stop functions
+# ---------------------------
+def start(interval=SAMPLE_INTERVAL, memory=True):
+    global _session
+    with _lock:
+        if _session is not None:
+            return False
+        _session = _Session(interval)
+        if memory:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            _session.snapshot = tracemalloc.take_snapshot()
+        _session.thread.start()
+    log.info("🔬 Profiling started")
+    return True
+
+
+def stop():
+    """Stop sampling; the report is written by the sampler thread."""
+    global _session
+    with _lock:
+        if _session is None:
+            return None
+        session, _session = _session, None
+    session.stop_event.set()
+    return session.thread
+
+
+def _on_start(signum, frame):
+    start()
+
+
+def _on_stop(signum, frame):
+    stop()
+
+
+def install():
+    """Bind SIGUSR1 (start) and SIGUSR2 (stop + report); call from the main thread."""
+    signal.signal(signal.SIGUSR1, _on_start)
+    signal.signal(signal.SIGUSR2, _on_stop)
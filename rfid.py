@@ -1,53 +1,235 @@
-import board
-import busio
-from digitalio import DigitalInOut
-from adafruit_pn532.i2c import PN532_I2C
+"""RFID input: one worker per PN532 reader feeding a shared event stream.
+
+Readers are listed in readers.json (KIDSPOT_READERS_FILE); without it a
+single I2C reader on board.SCL/SDA is used, as before:
+
+    [
+      {"name": "main",  "bus": "i2c"},
+      {"name": "shelf", "bus": "i2c", "scl": "D1", "sda": "D0", "irq": 16, "zone": "kids"},
+      {"name": "pad",   "bus": "spi", "cs": "D5", "command": "toggle"}
+    ]
+
+"address" overrides the PN532 I2C address for boards strapped
+differently, "zone" picks the device the reader controls (KIDSPOT_ZONES
+in kidspot.py), and "command" picks what a swipe does (default
+play_card; other commands get no uid).
+
+Readers with an "irq" pin arm the PN532 and block on the GPIO edge, so
+they cost nothing while idle. Readers without one are polled. At most
+POLL_SLOTS polls run at once across all buses (default 1), so adding
+readers spreads the same polling effort over more readers instead of
+multiplying it: with N polled readers each is read about every
+N * POLL_TIMEOUT. Raising KIDSPOT_RFID_POLL_SLOTS lets readers on
+different buses poll together, at up to that many times the CPU; readers
+on one bus always take turns.
+
+All workers share one deduplicating event stream: a UID seen again
+within DEDUP_WINDOW (a card left on a reader, or one card seen by two
+neighbouring readers) is dropped. Each zone has its own queue and
+dispatcher, so a slow command (a device waking for seconds) only delays
+swipes for that zone.
+"""
 import json
+import os
+import queue
 import threading
 import time
+import cards
+import clock
+import commands
+import flightrec
 import leds
+import membudget
+import metrics
+import power
+
+SWIPE_FILE = "swipe.json"
+READERS_FILE = os.getenv("KIDSPOT_READERS_FILE", "readers.json")
+DEFAULT_READERS = [{"name": "main", "bus": "i2c"}]
+
+POLL_TIMEOUT = 0.5   # seconds per read_passive_target on polled readers
+POLL_INTERVAL = 0.1  # pause between polls of one reader
+POLL_SLOTS = int(os.getenv("KIDSPOT_RFID_POLL_SLOTS", 1))  # polls in flight at once, across all buses
+IRQ_WAIT_MS = 1000   # edge wait per loop on IRQ readers, keeps the heartbeat going
+DEDUP_WINDOW = 2.0   # seconds a UID is ignored after being seen
+EVENT_QUEUE_SIZE = membudget.cap(64, 16)
+
+swipe_data = {}   # {uid: cards.CardEntry}, loaded by start()
+readers = {}      # {name: Reader}, built by start()
 
-# I2C setup
-i2c = busio.I2C(board.SCL, board.SDA)
-pn532 = PN532_I2C(i2c, debug=False)
-pn532.SAM_configuration()
+SWIPES = metrics.counter("kidspot_swipes_total", "Card swipes by outcome", ["result"])
+SWIPE_SECONDS = metrics.histogram("kidspot_swipe_seconds", "Time to handle a swipe, including the Spotify call")
+READ_ERRORS = metrics.counter("kidspot_rfid_read_errors_total", "Exceptions raised by PN532 reads", ["reader"])
+READ_SECONDS = metrics.histogram("kidspot_rfid_read_seconds", "Time to read a UID once a card is present",
+                                 ["reader"], buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+DUPLICATES = metrics.counter("kidspot_rfid_duplicates_total", "UIDs dropped as repeats within the dedup window")
+DROPPED = metrics.counter("kidspot_rfid_events_dropped_total", "UIDs dropped because the event queue was full")
 
 # ---------------------------
-# Load swipe data
+# Thread control
 # ---------------------------
-with open("swipe.json", "r") as f:
-    swipe_data = json.load(f)
+stop_event = clock.Event()
+STALL_TIMEOUT = 30  # seconds without a loop iteration before the supervisor restarts us
+
+_events = {}                   # {zone: clock.Queue}, see _queue()
+_last_seen = {}                # {uid: monotonic time it was last read by any reader}
+_seen_lock = threading.Lock()
+_poll_budget = threading.BoundedSemaphore(POLL_SLOTS)  # polled readers take turns on this
+_bus_locks = {}                # {bus key: Lock}: readers on one bus never poll together
 
 # ---------------------------
-# Thread control
+# Reader registry
 # ---------------------------
-stop_event = threading.Event()
+class Reader:
+    def __init__(self, config):
+        self.name = config["name"]
+        self.zone = config.get("zone", commands.DEFAULT_ZONE)
+        self.command = config.get("command", "play_card")
+        self.irq = config.get("irq")
+        self.config = config
+        self.poll_lock = _bus_lock(config)
+        self.pn532 = None
+        self.reads = 0
+        self.detections = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    def open(self):
+        """Create and configure the PN532 driver for this reader's bus"""
+        import board
+        import busio
+
+        bus = self.config.get("bus", "i2c")
+        if bus == "i2c":
+            from adafruit_pn532.i2c import PN532_I2C
+            scl = getattr(board, self.config.get("scl", "SCL"))
+            sda = getattr(board, self.config.get("sda", "SDA"))
+            kwargs = {"address": self.config["address"]} if "address" in self.config else {}
+            device = PN532_I2C(_i2c_bus(busio, scl, sda), debug=False, **kwargs)
+        elif bus == "spi":
+            from digitalio import DigitalInOut
+            from adafruit_pn532.spi import PN532_SPI
+            spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
+            device = PN532_SPI(spi, DigitalInOut(getattr(board, self.config["cs"])), debug=False)
+        else:
+            raise ValueError(f"reader {self.name}: unknown bus {bus!r}")
+        device.SAM_configuration()
+        self.pn532 = device
+
+    def stats(self):
+        return {
+            "zone": self.zone,
+            "command": self.command,
+            "irq": self.irq is not None,
+            "online": self.pn532 is not None,
+            "reads": self.reads,
+            "detections": self.detections,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_latency": round(self.last_latency, 4),
+            "max_latency": round(self.max_latency, 4),
+        }
+
+
+def _bus_lock(config):
+    """The poll lock shared by readers on the same bus (I2C pins, or the one SPI bus)"""
+    bus = config.get("bus", "i2c")
+    key = (bus, config.get("scl", "SCL"), config.get("sda", "SDA")) if bus == "i2c" else (bus,)
+    return _bus_locks.setdefault(key, threading.Lock())
+
+
+_i2c_buses = {}
+
+
+def _i2c_bus(busio, scl, sda):
+    # Readers on the same pins share one busio.I2C, which locks the bus itself
+    key = (str(scl), str(sda))
+    if key not in _i2c_buses:
+        _i2c_buses[key] = busio.I2C(scl, sda)
+    return _i2c_buses[key]
+
+
+def load_reader_config(path=READERS_FILE):
+    if not os.path.exists(path):
+        return DEFAULT_READERS
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def reader_stats():
+    return {name: reader.stats() for name, reader in readers.items()}
+
+# ---------------------------
+# Hardware / data setup
+# ---------------------------
+def load_swipe_data(path=SWIPE_FILE):
+    global swipe_data
+    swipe_data = cards.load_cards(path)
+    return swipe_data
+
+
+membudget.track("card_map", lambda: swipe_data)
+
+
+def start():
+    """Load swipe.json and bring up every configured PN532"""
+    load_swipe_data()
+    for config in load_reader_config():
+        reader = readers.get(config["name"])
+        if reader is None:
+            reader = readers[config["name"]] = Reader(config)
+        if reader.pn532 is None:
+            try:
+                reader.open()
+            except Exception as e:
+                # Its worker retries the open; one missing reader must not stop the rest
+                reader.errors += 1
+                reader.last_error = repr(e)
+                print(f"❌ RFID reader {reader.name} failed to start: {e}")
 
 # ---------------------------
 # UID handling
 # ---------------------------
 def handle_uid(uid, spot_instance):
-    """Play Spotify item based on swiped UID"""
+    """Play Spotify item based on swiped UID; returns played, failed, unknown, no_url or error"""
+    started = time.perf_counter()
+    result = "error"
     try:
         uid_entry = swipe_data.get(uid)
         if not uid_entry:
+            result = "unknown"
             print(f"⚠️ Unknown card: {uid}")
             leds.blink_led("red", duration=2)
-            return
+            return result
+
+        if uid_entry.uris:
+            uris, offset = cards.play_order(uid_entry)
+            result = "played" if spot_instance.play_uris(uris, offset) else "failed"
+            if result == "played":
+                print(f"🎵 Playing {len(uris)} items: {uid_entry.label or uid}")
+            else:
+                print(f"❌ Could not play {len(uris)} items: {uid_entry.label or uid}")
+                leds.blink_led("red", duration=2)
+            return result
 
-        url = uid_entry.get("URL")
+        url = uid_entry.url
         if not url:
+            result = "no_url"
             print(f"⚠️ No URL set for UID {uid}")
             leds.blink_led("red", duration=2)
-            return
+            return result
 
         # Pass only the URL string to spot.py
-        spot_instance.play_url(url)
+        result = "played" if spot_instance.play_url(url) else "failed"
+        if result == "failed":
+            print(f"❌ Could not play: {uid_entry.label or url}")
+            leds.blink_led("red", duration=2)
+            return result
         print("Spotify RFID card detected: Playing")
-        metadata = uid_entry.get("METADATA", {})
-        if metadata:
-            metadata_str = " - ".join(f"{v}" for k, v in metadata.items())
-            print(f"🎵 Playing: {metadata_str}")
+        if uid_entry.label:
+            print(f"🎵 Playing: {uid_entry.label}")
         else:
             print(f"🎵 Playing URL: {url} (no metadata available)")
 #        time.sleep(0.1)
@@ -55,28 +237,161 @@ def handle_uid(uid, spot_instance):
     except Exception as e:
         print(f"❌ Error handling UID {uid}: {e}")
         leds.blink_led("red", duration=2)
+    finally:
+        SWIPES.labels(result).inc()
+        SWIPE_SECONDS.observe(time.perf_counter() - started)
+    return result
+
+commands.register("play_card", lambda spot_instance, uid: handle_uid(uid.upper(), spot_instance))
+
+# ---------------------------
+# Event stream
+# ---------------------------
+def _queue(zone=commands.DEFAULT_ZONE):
+    """The zone's event queue, created on first use"""
+    events = _events.get(zone)
+    if events is None:
+        with _seen_lock:
+            events = _events.setdefault(zone, clock.Queue(maxsize=EVENT_QUEUE_SIZE))
+    return events
+
+
+def publish(reader, uid):
+    """Queue a read unless the UID was seen within DEDUP_WINDOW; returns True if queued"""
+    now = clock.monotonic()
+    with _seen_lock:
+        last = _last_seen.get(uid)
+        _last_seen[uid] = now
+        if len(_last_seen) > EVENT_QUEUE_SIZE * 4:
+            for old in [u for u, seen in _last_seen.items() if now - seen > DEDUP_WINDOW]:
+                del _last_seen[old]
+    if last is not None and now - last < DEDUP_WINDOW:
+        DUPLICATES.inc()
+        flightrec.record("uid_dup", reader.name, uid)
+        return False
+    try:
+        _queue(reader.zone).put_nowait((reader, uid))
+        return True
+    except queue.Full:
+        DROPPED.inc()
+        return False
+
+
+def _dispatch(route, zone=commands.DEFAULT_ZONE, heartbeat=None):
+    """Run the zone's readers' commands on its device, in arrival order"""
+    events = _queue(zone)
+    while not stop_event.is_set():
+        if heartbeat is not None:
+            if heartbeat.stopped():
+                return
+            heartbeat.beat()
+        try:
+            reader, uid = events.get(timeout=1)
+        except queue.Empty:
+            continue
+        args = {"uid": uid} if reader.command == "play_card" else {}
+        try:
+            commands.execute(reader.command, route(reader.zone), source=f"rfid:{reader.name}", **args)
+        except Exception as e:
+            print(f"❌ {reader.command} from reader {reader.name} failed: {e}")
+            leds.blink_led("red", duration=2)
 
 # ---------------------------
-# Listening loop
+# Reader workers
 # ---------------------------
-def _listen(spot_instance):
+def _record_latency(reader, latency):
+    reader.detections += 1
+    reader.last_latency = latency
+    reader.max_latency = max(reader.max_latency, latency)
+    READ_SECONDS.labels(reader.name).observe(latency)
+
+
+def _poll(reader):
+    with _poll_budget, reader.poll_lock:
+        started = time.perf_counter()
+        uid = reader.pn532.read_passive_target(timeout=POLL_TIMEOUT)
+    if uid:
+        _record_latency(reader, time.perf_counter() - started)
+    return uid
+
+
+def _wait_irq(reader, GPIO):
+    # listen_for_passive_target returns False while a previous request is still armed
+    reader.pn532.listen_for_passive_target()
+    if GPIO.wait_for_edge(reader.irq, GPIO.FALLING, timeout=IRQ_WAIT_MS) is None:
+        return None
+    started = time.perf_counter()
+    uid = reader.pn532.get_passive_target()
+    if uid:
+        _record_latency(reader, time.perf_counter() - started)
+    return uid
+
+
+def _power_down(reader):
+    """Put an idle polled PN532 to sleep until the next read wakes it"""
+    try:
+        reader.pn532.power_down()
+    except (AttributeError, RuntimeError, OSError):
+        pass  # older driver or a busy bus: it just stays powered
+
+
+def _reader_loop(reader, heartbeat=None):
+    if reader.pn532 is None:
+        reader.open()
+    GPIO = None
+    if reader.irq is not None:
+        import RPi.GPIO as GPIO
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(reader.irq, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+
     while not stop_event.is_set():
-        uid = pn532.read_passive_target(timeout=0.5)
+        if heartbeat is not None:
+            if heartbeat.stopped():
+                return
+            heartbeat.beat()
+        reader.reads += 1
+        try:
+            uid = _wait_irq(reader, GPIO) if GPIO is not None else _poll(reader)
+        except Exception as e:
+            reader.errors += 1
+            reader.last_error = repr(e)
+            reader.pn532 = None  # the restarted worker reopens it
+            READ_ERRORS.labels(reader.name).inc()
+            flightrec.record("read_error", reader.name, repr(e))
+            raise
         if uid:
-            # Convert UID from bytes to hex string or whatever format you use
-            uid_str = ''.join([f'{x:02X}' for x in uid])
-            handle_uid(uid_str, spot_instance)
-        time.sleep(0.1)
+            uid = "".join(f"{x:02X}" for x in uid)
+            flightrec.record("uid", reader.name, uid, reader.last_latency)
+            publish(reader, uid)
+        if GPIO is None:
+            if power.is_idle():
+                _power_down(reader)
+            power.sleep(POLL_INTERVAL, power.IDLE_POLL_INTERVAL, f"rfid:{reader.name}")
 
 # ---------------------------
 # Public start/stop functions
 # ---------------------------
-def listener(spot_instance):
-    """Start listening thread for RFID swipes"""
-    t = threading.Thread(target=_listen, args=(spot_instance,), daemon=True)
-    t.start()
-    return t
+def listener(spot_instance, supervisor=None):
+    """Start one worker per reader plus a dispatcher per zone (restarted by supervisor if given).
+
+    spot_instance may be a zone -> SpotInstance callable to route readers by zone.
+    """
+    if not readers:
+        start()
+    workers = [(f"rfid:{name}", _reader_loop, (reader,)) for name, reader in readers.items()]
+    route = commands.router(spot_instance)
+    for zone in sorted({reader.zone for reader in readers.values()}):
+        workers.append((f"rfid-dispatch:{zone}", _dispatch, (route, zone)))
+    threads = []
+    for name, target, args in workers:
+        if supervisor is not None:
+            threads.append(supervisor.add(name, target, args=args, stall_timeout=STALL_TIMEOUT))
+        else:
+            t = threading.Thread(target=target, args=args, name=name, daemon=True)
+            t.start()
+            threads.append(t)
+    return threads
 
 def stop_rfid():
-    """Stop the RFID listener"""
+    """Stop the RFID readers and dispatcher"""
     stop_event.set()
@@ -0,0 +1,174 @@
+# sharedcache.py
+"""Optional cache shared by every kidspot box in the house (Redis).
+
+Set KIDSPOT_REDIS_URL (e.g. redis://nas.local:6379/0) to share, per
+account:
+
+- access tokens, kept until shortly before they expire
+- the devices() answer, for DEVICES_TTL seconds
+- playback snapshots, for PLAYBACK_TTL seconds
+
+Token refresh is single-flight across boxes. Whoever wins a short lease
+(SET NX PX) refreshes and stores the token; the others wait for it to
+appear instead of refreshing too. If the lease holder dies, its lease
+expires and the next box takes over. With no URL set, or Redis down,
+every call falls through to the caller's own fetch.
+"""
+import json
+import os
+import time
+import uuid
+import logging
+import metrics
+
+log = logging.getLogger("SharedCache")
+
+REDIS_URL = os.getenv("KIDSPOT_REDIS_URL", "")
+PREFIX = "kidspot"
+TOKEN_MARGIN = 120   # seconds: stored tokens expire this long before Spotify's expiry
+DEVICES_TTL = 10
+PLAYBACK_TTL = 2
+LEASE_MS = 10000     # longest a refresh may take before another box takes over
+WAIT_POLL = 0.05     # seconds between checks while another box holds the lease
+RETRY_AFTER = 30     # seconds before trying Redis again after a connection error
+
+LOOKUPS = metrics.counter("kidspot_shared_cache_lookups_total", "Shared cache lookups", ["kind", "result"])
+LEASES = metrics.counter("kidspot_shared_cache_leases_total", "Token refresh leases", ["result"])
+
+# Releases the lease only if we still own it
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+_client = None
+_down_until = 0.0
+
+
+def _redis():
+    """The Redis client, or None when disabled or recently unreachable"""
+    global _client
+    if not REDIS_URL or time.monotonic() < _down_until:
+        return None
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(REDIS_URL, socket_timeout=1.0, socket_connect_timeout=1.0)
+    return _client
+
+
+def _failed(e):
+    global _down_until
+    _down_until = time.monotonic() + RETRY_AFTER
+    log.warning(f"⚠️ Shared cache unavailable for {RETRY_AFTER}s: {e}")
+
+
+def enabled():
+    return bool(REDIS_URL)
+
+
+def _key(kind, account):
+    return f"{PREFIX}:{kind}:{account}"
+
+
+# ---------------------------
+# Plain values
+# ---------------------------
+def get_json(kind, account):
+    client = _redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(_key(kind, account))
+    except Exception as e:
+        _failed(e)
+        return None
+    LOOKUPS.labels(kind, "hit" if raw is not None else "miss").inc()
+    return json.loads(raw) if raw is not None else None
+
+
+def put_json(kind, account, value, ttl):
+    client = _redis()
+    if client is None:
+        return
+    try:
+        client.set(_key(kind, account), json.dumps(value), px=int(ttl * 1000))
+    except Exception as e:
+        _failed(e)
+
+
+def delete(kind, account):
+    client = _redis()
+    if client is None:
+        return
+    try:
+        client.delete(_key(kind, account))
+    except Exception as e:
+        _failed(e)
+
+
+# ---------------------------
+# Tokens (single-flight)
+# ---------------------------
+def token(account, fetch, margin=TOKEN_MARGIN):
+    """(access_token, expires_in) for account, shared across boxes.
+
+    fetch() -> (access_token, expires_in) is called by at most one box at
+    a time; the others wait for its result. The stored copy expires
+    margin seconds early, which is when callers refreshing at
+    expires_in - margin come back for a new one. Without Redis, fetch()
+    is simply called.
+    """
+    client = _redis()
+    if client is None:
+        return fetch()
+    key, lease = _key("token", account), _key("lease", account)
+    try:
+        deadline = time.monotonic() + LEASE_MS / 1000
+        while time.monotonic() < deadline:
+            cached = _cached_token(client, key, margin)
+            if cached is not None:
+                return cached
+            owner = uuid.uuid4().hex
+            if client.set(lease, owner, nx=True, px=LEASE_MS):
+                LEASES.labels("acquired").inc()
+                try:
+                    cached = _cached_token(client, key, margin)  # stored while we acquired the lease
+                    if cached is not None:
+                        return cached
+                    access_token, expires_in = fetch()
+                    client.set(key, access_token, ex=max(1, int(expires_in) - margin))
+                    return access_token, expires_in
+                finally:
+                    _release(client, lease, owner)
+            LEASES.labels("waited").inc()
+            time.sleep(WAIT_POLL)
+        LEASES.labels("timeout").inc()
+    except Exception as e:
+        if not _is_redis_error(e):
+            raise  # fetch() failed: the caller handles it as a failed refresh
+        _failed(e)
+    return fetch()
+
+
+def _release(client, lease, owner):
+    try:
+        client.eval(_RELEASE, 1, lease, owner)
+    except Exception as e:
+        # The lease expires on its own; the token is already stored
+        log.warning(f"Could not release token lease {lease}: {e}")
+
+
+def _cached_token(client, key, margin):
+    pipe = client.pipeline()
+    pipe.get(key)
+    pipe.ttl(key)
+    value, ttl = pipe.execute()
+    if value is None or ttl is None or ttl <= 0:
+        LOOKUPS.labels("token", "miss").inc()
+        return None
+    LOOKUPS.labels("token", "hit").inc()
+    return value.decode(), ttl + margin
+
+
+def _is_redis_error(e):
+    import redis
+
+    return isinstance(e, redis.RedisError)
@@ -1,71 +1,472 @@
 # spot.py
 import os
+import re
 import threading
-import requests
-import spotipy
+import time
 import logging
+import clock
+import flightrec
+import metrics
+import netmon
+import sharedcache
+
+# requests and spotipy are imported on first use: they dominate import
+# time on a Pi Zero and nothing needs them until the first token refresh.
 
 log = logging.getLogger("Spot")
 
-class SpotInstance:
-    def __init__(self, account_prefix, device_name, default_volume=50):
+SPOTIFY_CALLS = metrics.counter("kidspot_spotify_calls_total", "Spotify Web API calls", ["endpoint", "status"])
+SPOTIFY_SECONDS = metrics.histogram("kidspot_spotify_call_seconds", "Spotify Web API call latency", ["endpoint"])
+TOKEN_REFRESHES = metrics.counter("kidspot_token_refreshes_total", "Access token requests", ["account", "result"])
+
+# Endpoints (overridable to run against bench/fault_proxy.py)
+API_URL = os.getenv("KIDSPOT_SPOTIFY_API_URL", "https://api.spotify.com/v1/")
+TOKEN_URL = os.getenv("KIDSPOT_SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
+
+# Latency budget per operation type (seconds, KIDSPOT_BUDGET_<OP> to override).
+# Each budget is the requests timeout of that operation's client; a call
+# that can't finish in time fails instead of holding an input thread.
+BUDGETS = {
+    op: float(os.getenv(f"KIDSPOT_BUDGET_{op.upper()}", default))
+    for op, default in (("token", 5.0), ("play", 4.0), ("volume", 2.0), ("status", 2.0))
+}
+
+# Device readiness, see SpotInstance.wake()
+MISSING = "missing"   # not in the account's device list: raspotify down or not registered yet
+DORMANT = "dormant"   # listed but not the active device; it may refuse playback until woken
+WAKING = "waking"     # transfer sent (or waiting to be listed), polling until it answers
+READY = "ready"       # active, or it just accepted a command
+WAKE_TIMEOUT = 8.0        # seconds to give a device to wake before the play fails
+WAKE_POLL_INITIAL = 0.1   # first readiness poll delay, doubled up to WAKE_POLL_MAX
+WAKE_POLL_MAX = 1.0
+
+PLAY_SECONDS = metrics.histogram("kidspot_play_seconds", "play_url latency by path (direct or via wake-up)", ["path"])
+WAKE_SECONDS = metrics.histogram("kidspot_device_wake_seconds", "Time to bring a device to ready", ["device"],
+                                 buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0))
+WAKES = metrics.counter("kidspot_device_wakes_total", "Device wake-ups by result", ["device", "result"])
+
+class PlaybackState:
+    """The fields of a current_playback() response that kidspot uses.
+
+    The raw response (full track, album and artist objects) is dropped
+    as soon as this is built.
+    """
+
+    __slots__ = ("is_playing", "item_uri", "device_id", "volume_percent", "progress_ms")
+
+    def __init__(self, is_playing=False, item_uri=None, device_id=None, volume_percent=None, progress_ms=0):
+        self.is_playing = is_playing
+        self.item_uri = item_uri
+        self.device_id = device_id
+        self.volume_percent = volume_percent
+        self.progress_ms = progress_ms
+
+    @classmethod
+    def from_api(cls, raw):
+        if not raw:
+            return None
+        item = raw.get("item") or {}
+        device = raw.get("device") or {}
+        return cls(
+            is_playing=raw.get("is_playing", False),
+            item_uri=item.get("uri"),
+            device_id=device.get("id"),
+            volume_percent=device.get("volume_percent"),
+            progress_ms=raw.get("progress_ms") or 0,
+        )
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _item_uri(event):
+    uri = event.get("URI")
+    track_id = event.get("TRACK_ID")
+    if uri or not track_id or track_id.startswith("spotify:"):
+        return uri or track_id
+    kind = "episode" if event.get("ITEM_TYPE", "").lower() == "episode" else "track"
+    return f"spotify:{kind}:{track_id}"
+
+
+class LocalPlayer:
+    """Playback state of the librespot on this Pi, kept from its onevent events.
+
+    Handles the event names of both older (start/stop/change/volume_set)
+    and newer (track_changed/playing/volume_changed/session_*) librespot.
+    known() is False until the first event and after the session
+    disconnects; callers use the Web API then.
+    """
+
+    PLAYING = {"start", "started", "playing"}
+    STOPPED = {"stop", "stopped", "paused"}
+    TRACK = {"change", "changed", "track_changed", "loading", "preloading"}
+    VOLUME = {"volume_set", "volume_changed"}
+    POSITION = {"seeked", "position_correction"}
+    SESSION = {"session_connected", "session_client_changed"}
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connected = False
+        self.is_playing = False
+        self.item_uri = None
+        self.volume_percent = None
+        self.position_ms = 0
+        self.position_at = time.monotonic()
+        self.updated_at = None
+
+    def known(self):
+        return self.connected
+
+    def apply(self, event):
+        """Update from one event dict (onevent env vars); False if the event isn't used"""
+        name = event.get("PLAYER_EVENT")
+        with self.lock:
+            if name == "session_disconnected":
+                self.connected = self.is_playing = False
+            elif name in self.SESSION:
+                self.connected = True
+            elif name in self.PLAYING or name in self.STOPPED or name in self.TRACK or name in self.POSITION:
+                self.connected = True
+                uri = _item_uri(event) if name not in self.POSITION and name != "preloading" else None
+                if uri and uri != self.item_uri:
+                    self.item_uri, self.position_ms, self.position_at = uri, 0, time.monotonic()
+                if name in self.PLAYING:
+                    self.is_playing = True
+                elif name in self.STOPPED:
+                    self.is_playing = False
+                if "POSITION_MS" in event:
+                    self.position_ms = int(event["POSITION_MS"])
+                    self.position_at = time.monotonic()
+            elif name in self.VOLUME and "VOLUME" in event:
+                self.connected = True
+                self.volume_percent = round(int(event["VOLUME"]) * 100 / 65535)
+            else:
+                return False
+            self.updated_at = time.time()
+            return True
+
+    def snapshot(self, device_id=None):
+        """The current state as a PlaybackState (progress extrapolated while playing)"""
+        with self.lock:
+            progress = self.position_ms
+            if self.is_playing:
+                progress += int((time.monotonic() - self.position_at) * 1000)
+            return PlaybackState(self.is_playing, self.item_uri, device_id, self.volume_percent, progress)
+
+
+_SPOTIFY_ID = re.compile(r"/[0-9A-Za-z]{22}(?=/|$)")
+_metered_client = None
+
+
+def _spotify_client(auth_manager, http, timeout):
+    """spotipy client that records every Web API call in metrics"""
+    global _metered_client
+    if _metered_client is None:
+        import spotipy
+
+        class MeteredSpotify(spotipy.Spotify):
+            def _internal_call(self, method, url, payload, params):
+                try:
+                    return self._metered_call(method, url, payload, params)
+                except spotipy.SpotifyException as e:
+                    if e.http_status != 401:
+                        raise
+                    # Token revoked or expired early: refresh once and retry
+                    self.auth_manager.invalidate()
+                    return self._metered_call(method, url, payload, params)
+                finally:
+                    # Play, pause, volume, skip...: the shared playback snapshot is stale now
+                    if method != "GET" and "me/player" in url:
+                        sharedcache.delete("playback", self.auth_manager.account_prefix)
+
+            def _metered_call(self, method, url, payload, params):
+                endpoint = method + " " + _SPOTIFY_ID.sub("/{id}", url.replace(self.prefix, "").split("?", 1)[0])
+                status = "ok"
+                started = time.perf_counter()
+                try:
+                    return super()._internal_call(method, url, payload, params)
+                except spotipy.SpotifyException as e:
+                    status = str(e.http_status)
+                    raise
+                except Exception:
+                    status = "error"
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - started
+                    SPOTIFY_SECONDS.labels(endpoint).observe(elapsed)
+                    SPOTIFY_CALLS.labels(endpoint, status).inc()
+                    flightrec.record("api", endpoint, status, elapsed)
+
+        _metered_client = MeteredSpotify
+    client = _metered_client(auth_manager=auth_manager, requests_session=http, requests_timeout=timeout)
+    client.prefix = API_URL
+    return client
+
+# ---------------------------
+# Per-account sessions
+# ---------------------------
+TOKEN_LIFETIME = 3600     # seconds; used when the lifetime is not known (preflight tokens)
+TOKEN_MARGIN = 120        # refresh this long before expiry
+DEVICE_CACHE_SECONDS = 5  # devices() answers shared between instances of one account
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class AccountSession:
+    """State shared by every device one account drives.
+
+    One access token (refreshed shortly before it expires), one HTTP
+    connection pool with a spotipy client per BUDGETS operation on top of
+    it, plus a short-lived cache of the account's devices() answer so N
+    devices resolve with one call. The session is the clients'
+    auth_manager, so every call picks up the current token.
+    """
+
+    def __init__(self, account_prefix, access_token=None):
         self.account_prefix = account_prefix
-        self.device_name = device_name
-        self.default_volume = default_volume
-        self.sp = None          # ensure attribute exists
-        self.device_id = None   # device will be detected later
+        self.token = access_token
+        self.expires_at = clock.monotonic() + TOKEN_LIFETIME if access_token else 0.0
         self.lock = threading.Lock()
-        self.active = False
+        self._http = None
+        self._clients = {}
+        self.instances = []  # SpotInstances using this session, re-armed by rearm()
+        self._devices = {}
+        self._devices_at = None
 
-        try:
-            self.init_spotify()
-        except Exception as e:
-            log.warning(f"⚠️ Failed to initialize Spotify for {self.account_prefix}: {e}")
+    def credentials(self):
+        """(client_id, client_secret, refresh_token) from the environment"""
+        prefix = self.account_prefix
+        creds = (os.getenv(f"SPOTIFY_{prefix}_CLIENT_ID"),
+                 os.getenv(f"SPOTIFY_{prefix}_CLIENT_SECRET"),
+                 os.getenv(f"SPOTIFY_{prefix}_REFRESH_TOKEN"))
+        if not all(creds):
+            raise RuntimeError(f"Missing credentials for {prefix}")
+        return creds
 
-    def init_spotify(self):
-        """Initialize Spotify client using refresh token (no browser)"""
-        client_id = os.getenv(f"SPOTIFY_{self.account_prefix}_CLIENT_ID")
-        client_secret = os.getenv(f"SPOTIFY_{self.account_prefix}_CLIENT_SECRET")
-        refresh_token = os.getenv(f"SPOTIFY_{self.account_prefix}_REFRESH_TOKEN")
-        scope = "user-modify-playback-state user-read-playback-state"
+    def get_access_token(self, as_dict=False):
+        """Current access token, refreshed if close to expiry (spotipy auth_manager API)"""
+        with self.lock:
+            if self.token is None or clock.monotonic() >= self.expires_at - TOKEN_MARGIN:
+                self._refresh()
+            return self.token
+
+    def invalidate(self):
+        """Drop the current token (the API rejected it); the next call refreshes"""
+        with self.lock:
+            self.expires_at = 0.0
+        sharedcache.delete("token", self.account_prefix)
 
-        if not refresh_token or not client_id or not client_secret:
-            raise RuntimeError(f"Missing credentials for {self.account_prefix}")
+    def _refresh(self):
+        # Single-flight across boxes when the shared cache is configured
+        self.token, expires_in = sharedcache.token(self.account_prefix, self._fetch_token, TOKEN_MARGIN)
+        self.expires_at = clock.monotonic() + expires_in
 
-        token = self.get_access_token(client_id, client_secret, refresh_token)
-        self.sp = spotipy.Spotify(auth=token)
-        self.ensure_device_active()
+    def _fetch_token(self):
+        """Request a new access token using the refresh token; returns (token, expires_in)"""
+        import requests
 
-    def get_access_token(self, client_id, client_secret, refresh_token):
-        """Request a new access token using refresh_token"""
-        url = "https://accounts.spotify.com/api/token"
+        client_id, client_secret, refresh_token = self.credentials()
         payload = {
             "grant_type": "refresh_token",
             "refresh_token": refresh_token,
             "client_id": client_id,
             "client_secret": client_secret
         }
-        resp = requests.post(url, data=payload)
+        netmon.require()
+        try:
+            resp = self.http.post(TOKEN_URL, data=payload, timeout=BUDGETS["token"])
+        except requests.RequestException:
+            TOKEN_REFRESHES.labels(self.account_prefix, "error").inc()
+            raise
+        TOKEN_REFRESHES.labels(self.account_prefix, str(resp.status_code)).inc()
         if resp.status_code != 200:
             raise RuntimeError(f"Failed to get access token for {self.account_prefix}: {resp.text}")
-        return resp.json()["access_token"]
+        body = resp.json()
+        return body["access_token"], body.get("expires_in", TOKEN_LIFETIME)
+
+    @property
+    def http(self):
+        """requests.Session: the account's connection pool, used for tokens and API calls"""
+        if self._http is None:
+            import requests
+
+            self._http = requests.Session()
+        return self._http
+
+    def client_for(self, op):
+        """spotipy client whose timeout is the budget for op"""
+        client = self._clients.get(op)
+        if client is None:
+            client = self._clients[op] = _spotify_client(self, self.http, BUDGETS[op])
+        return client
+
+    @property
+    def client(self):
+        return self.client_for("status")
+
+    def devices(self, max_age=DEVICE_CACHE_SECONDS):
+        """{device name: {"id", "is_active"}} for the account, from one devices() call"""
+        with self.lock:
+            fresh = self._devices_at is not None and clock.monotonic() - self._devices_at <= max_age
+        if not fresh:
+            devices = sharedcache.get_json("devices", self.account_prefix) if max_age > 0 else None
+            if devices is None:
+                devices = {d["name"]: {"id": d["id"], "is_active": d.get("is_active", False)}
+                           for d in self.client.devices().get("devices", [])}
+                sharedcache.put_json("devices", self.account_prefix, devices, sharedcache.DEVICES_TTL)
+            with self.lock:
+                self._devices, self._devices_at = devices, clock.monotonic()
+        return self._devices
+
+    def rearm(self):
+        """Forget cached devices and bring every instance back after an outage"""
+        with self.lock:
+            self._devices_at = None
+        for inst in self.instances:
+            try:
+                if inst.sp is None:
+                    inst.init_spotify()
+                else:
+                    inst.ensure_device_active()
+            except Exception as e:
+                log.warning(f"⚠️ Re-arming {inst.device_name} ({self.account_prefix}) failed: {e}")
 
-    def ensure_device_active(self):
+
+def get_session(account_prefix, access_token=None):
+    """The shared AccountSession for an account, created on first use"""
+    with _sessions_lock:
+        session = _sessions.get(account_prefix)
+        if session is None:
+            session = _sessions[account_prefix] = AccountSession(account_prefix, access_token)
+        return session
+
+
+def _on_network_change(up):
+    if up:
+        for session in list(_sessions.values()):
+            session.rearm()
+
+
+netmon.on_change(_on_network_change)
+
+
+class SpotInstance:
+    def __init__(self, account_prefix, device_name, default_volume=50, access_token=None, device_id=None,
+                 session=None):
+        """access_token/device_id: results of a preflight check to reuse instead of refetching;
+        session: AccountSession to share, by default the account's shared one"""
+        self.account_prefix = account_prefix
+        self.device_name = device_name
+        self.default_volume = default_volume
+        self.session = session or get_session(account_prefix, access_token)
+        self.sp = None          # ensure attribute exists
+        self.device_id = None   # device will be detected later
+        self.state = MISSING
+        self.local = None       # LocalPlayer when this is the device on this Pi (player_events.py)
+        self.lock = threading.Lock()
+        self._wake_lock = threading.Lock()  # wake() polls for seconds without holding self.lock
+        self.active = False
+        self.session.instances.append(self)
+
+        try:
+            self.init_spotify(device_id)
+        except Exception as e:
+            log.warning(f"⚠️ Failed to initialize Spotify for {self.account_prefix}: {e}")
+
+    def init_spotify(self, device_id=None):
+        """Initialize the Spotify client from the account session (refresh token, no browser)"""
+        self.session.credentials()
+        self.session.get_access_token()
+        self.sp = self.session.client_for("play")
+        if device_id:
+            self.device_id = device_id
+            self.state = READY
+            self.active = True
+            log.info(f"✅ Device {self.device_name} known from preflight for account {self.account_prefix}")
+        else:
+            self.ensure_device_active()
+
+    def api(self, op):
+        """The spotipy client for op; raises netmon.Offline while the network is down"""
+        netmon.require()
+        return self.session.client_for(op)
+
+    def ensure_device_active(self, max_age=DEVICE_CACHE_SECONDS):
         """Detect the Raspberry Pi device for playback"""
         if self.sp is None:
             log.warning(f"Spotify client not ready for {self.account_prefix}")
             return
+        self._use_device(self.session.devices(max_age).get(self.device_name))
 
-        devices = self.sp.devices().get("devices", [])
-        for d in devices:
-            if d["name"] == self.device_name:
-                self.device_id = d["id"]
-                log.info(f"✅ Device {self.device_name} detected for account {self.account_prefix}")
-                self.active = True
-                return
-        log.warning(f"⚠️ Device {self.device_name} not available for account {self.account_prefix}")
-        self.device_id = None
-        self.active = False
+    def _use_device(self, device):
+        """Update device_id/state from a devices() entry (None if not listed)"""
+        self.device_id = device["id"] if device else None
+        self.active = device is not None
+        if device is None:
+            self.state = MISSING
+            log.warning(f"⚠️ Device {self.device_name} not available for account {self.account_prefix}")
+        else:
+            self.state = READY if device["is_active"] else DORMANT
+            log.info(f"✅ Device {self.device_name} detected for account {self.account_prefix} ({self.state})")
+
+    def wake(self):
+        """Bring the device to READY, transferring playback only if it needs it.
+
+        Polls devices() with a short backoff (no fixed sleeps) until the
+        device is listed and active, or WAKE_TIMEOUT passes. A listed but
+        inactive device gets one transfer_playback; a missing one is
+        waited for (raspotify restarting) and transferred once it shows up.
+        Returns True if the device is ready. One wake runs at a time; the
+        instance lock is not held, so pause and volume are not held up.
+        """
+        with self._wake_lock:
+            if self.state == READY and self.device_id is not None:
+                return True  # another command woke it while this one waited
+            self.state = WAKING
+            try:
+                return self._wake()
+            finally:
+                if self.state == WAKING:  # an error ended the poll
+                    self.state = DORMANT if self.device_id is not None else MISSING
+
+    def _wake(self):
+        started = clock.monotonic()
+        deadline = started + WAKE_TIMEOUT
+        delay = WAKE_POLL_INITIAL
+        transferred = False
+        while True:
+            device = self.session.devices(max_age=0).get(self.device_name)
+            if device is not None:
+                self.device_id = device["id"]
+                if device["is_active"]:
+                    break
+                if not transferred:
+                    try:
+                        self.api("play").transfer_playback(device["id"], force_play=False)
+                        transferred = True
+                    except Exception as e:
+                        if getattr(e, "http_status", None) != 404:
+                            raise
+                        # Listed but not connected yet; poll and try again
+            if clock.monotonic() + delay > deadline:
+                self._use_device(device)
+                WAKES.labels(self.device_name, "timeout").inc()
+                log.warning(f"⏰ {self.device_name} did not wake within {WAKE_TIMEOUT:.0f}s ({self.state})")
+                return False
+            clock.sleep(delay)
+            delay = min(delay * 2, WAKE_POLL_MAX)
+
+        self.state = READY
+        self.active = True
+        elapsed = clock.monotonic() - started
+        WAKES.labels(self.device_name, "transferred" if transferred else "found").inc()
+        WAKE_SECONDS.labels(self.device_name).observe(elapsed)
+        log.info(f"⏰ {self.device_name} ready after {elapsed * 1000:.0f} ms")
+        return True
+
+    def _start_playback(self, body):
+        self.api("play").start_playback(device_id=self.device_id, **body)
 
     def refresh_token_if_needed(self):
         """Ensure self.sp is valid"""
@@ -76,30 +477,58 @@ class SpotInstance:
                 log.warning(f"⚠️ Unable to refresh Spotify client for {self.account_prefix}: {e}")
 
     def play_url(self, url):
-        """Play a Spotify URL on the device"""
-        self.refresh_token_if_needed()
-
-        if self.sp is None or self.device_id is None:
-            log.warning(f"Spotify not ready for playback ({self.account_prefix})")
-            return False
-
+        """Play a Spotify URL on the device, waking it first if it is missing or refuses"""
         if isinstance(url, dict) and "URL" in url:
             url = url["URL"]
         if not isinstance(url, str):
             log.warning(f"Invalid URL passed to play_url: {url}")
             return False
 
-        with self.lock:
+        if url.startswith("spotify:track:") or url.startswith("spotify:episode:"):
+            return self._play({"uris": [url]})
+        return self._play({"context_uri": url})
+
+    def play_uris(self, uris, offset=0):
+        """Play a multi-item card: one start_playback with its URIs (at most cards.PLAY_CHUNK)"""
+        body = {"uris": list(uris)}
+        if offset:
+            body["offset"] = {"position": offset}
+        return self._play(body)
+
+    def _play(self, body):
+        self.refresh_token_if_needed()
+
+        if self.sp is None:
+            log.warning(f"Spotify not ready for playback ({self.account_prefix})")
+            return False
+
+        started = time.perf_counter()
+        path = "direct"
+        try:
+            if self.device_id is None:
+                path = "wake"
+                if not self.wake():
+                    return False
             try:
-                if url.startswith("spotify:track:") or url.startswith("spotify:episode:"):
-                    self.sp.start_playback(device_id=self.device_id, uris=[url])
-                else:
-                    self.sp.start_playback(device_id=self.device_id, context_uri=url)
-                log.info(f"▶️ Playback started on {self.device_name} ({self.account_prefix})")
-                return True
+                with self.lock:
+                    self._start_playback(body)
             except Exception as e:
-                log.warning(f"Spotify playback error ({self.account_prefix}): {e}")
-                return False
+                # 404 "Device not found": listed but dormant; wake it and retry once
+                if getattr(e, "http_status", None) != 404 or path == "wake":
+                    raise
+                path = "wake"
+                self.state = DORMANT
+                if not self.wake():
+                    return False
+                with self.lock:
+                    self._start_playback(body)
+            self.state = READY
+            PLAY_SECONDS.labels(path).observe(time.perf_counter() - started)
+            log.info(f"▶️ Playback started on {self.device_name} ({self.account_prefix})")
+            return True
+        except Exception as e:
+            log.warning(f"Spotify playback error ({self.account_prefix}): {e}")
+            return False
 
     def pause(self):
         self.refresh_token_if_needed()
@@ -107,30 +536,65 @@ class SpotInstance:
             return
         with self.lock:
             try:
-                self.sp.pause_playback(device_id=self.device_id)
+                self.api("play").pause_playback(device_id=self.device_id)
             except Exception as e:
                 log.warning(f"Spotify pause error ({self.account_prefix}): {e}")
 
+    def set_volume(self, percent):
+        """Set device volume (clamped to 0-100); returns True on success"""
+        self.refresh_token_if_needed()
+        if self.sp is None or self.device_id is None:
+            return False
+        percent = max(0, min(100, int(percent)))
+        with self.lock:
+            try:
+                self.api("volume").volume(percent, device_id=self.device_id)
+                if self.local is not None:
+                    self.local.volume_percent = percent
+                return True
+            except Exception as e:
+                log.warning(f"Spotify volume error ({self.account_prefix}): {e}")
+                return False
+
+    def current_volume(self):
+        """Volume to step from: the local player's if it knows one, else a fresh read (50 if unknown)"""
+        if self.local is not None and self.local.volume_percent is not None:
+            return self.local.volume_percent
+        playback = self.get_current_playback(fresh=True)
+        return playback.volume_percent if playback and playback.volume_percent is not None else 50
+
     def is_playing_elsewhere(self):
         """Return True if this account is active on a different device"""
         self.refresh_token_if_needed()
         if self.sp is None:
             return False
         try:
-            playback = self.sp.current_playback()
+            playback = PlaybackState.from_api(self.api("status").current_playback())
             if playback is None:
                 return False
-            device = playback.get("device", {})
-            return device.get("id") != self.device_id and playback.get("is_playing", False)
+            return playback.device_id != self.device_id and playback.is_playing
         except Exception:
             return False
 
-    def get_current_playback(self):
-        """Return current playback info"""
+    def get_current_playback(self, fresh=False):
+        """Return current playback info as a PlaybackState (None if idle/unavailable).
+
+        Answered from local player events when available, without an API
+        call. fresh=True skips the shared cache: for commands that change
+        what they read (toggle, volume steps).
+        """
+        if self.local is not None and self.local.known():
+            return self.local.snapshot(self.device_id)
+        shared = None if fresh else sharedcache.get_json("playback", self.account_prefix)
+        if shared is not None:
+            return PlaybackState(**shared) if shared else None
         self.refresh_token_if_needed()
         if self.sp is None:
             return None
         try:
-            return self.sp.current_playback()
+            playback = PlaybackState.from_api(self.api("status").current_playback())
         except Exception:
             return None
+        sharedcache.put_json("playback", self.account_prefix, playback.to_dict() if playback else {},
+                             sharedcache.PLAYBACK_TTL)
+        return playback
@@ -0,0 +1,44 @@
+# startup_profile.py
+"""Boot-to-ready timing for kidspot.py.
+
+Import this first; wrap each heavy import or hardware init in
+``phase()`` and call ``report()`` once the daemon is ready. Set
+KIDSPOT_PROFILE_STARTUP=1 for the full breakdown; otherwise only the
+total is printed. For a per-module view of a single
+import, ``python -X importtime kidspot.py`` complements this.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+_t0 = time.perf_counter()
+phases = []  # (name, kind, seconds)
+
+
+@contextmanager
+def phase(name, kind="init"):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases.append((name, kind, time.perf_counter() - start))
+
+
+def elapsed():
+    return time.perf_counter() - _t0
+
+
+def report(verbose=None):
+    if verbose is None:
+        verbose = os.getenv("KIDSPOT_PROFILE_STARTUP", "") not in ("", "0")
+    total = elapsed()
+    if verbose:
+        print("=== Kidspot startup profile ===")
+        print(f"{'phase':<32} {'kind':<7} {'ms':>9}")
+        for name, kind, seconds in phases:
+            print(f"{name:<32} {kind:<7} {seconds * 1000:>9.1f}")
+        for kind in ("import", "init"):
+            subtotal = sum(s for _, k, s in phases if k == kind)
+            print(f"{'total ' + kind:<32} {'':<7} {subtotal * 1000:>9.1f}")
+    print(f"⏱️ Boot to ready: {total * 1000:.0f} ms")
+    return total
@@ -0,0 +1,205 @@
+# supervisor.py
+"""Keep the listener threads alive.
+
+Each worker runs ``target(*args, heartbeat=hb)`` and calls ``hb.beat()``
+once per loop iteration. The orchestrator calls ``Supervisor.check()``
+from its main loop; a worker whose thread died, or whose last beat is
+older than its stall timeout, is replaced by a fresh thread after an
+exponential backoff. A stalled thread cannot be killed, so it is told
+to stop and exits on its own once the blocking call returns.
+"""
+import json
+import os
+import threading
+import time
+import logging
+import flightrec
+import membudget
+import metrics
+
+log = logging.getLogger("Supervisor")
+
+LOOP_SECONDS = metrics.histogram("kidspot_worker_loop_seconds", "Time between worker heartbeats", ["worker"],
+                                 buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+STALL_SECONDS = metrics.histogram("kidspot_worker_stall_seconds", "Silence before a stalled worker was restarted",
+                                  ["worker"], buckets=(5, 10, 30, 60, 120, 300, 600))
+RESTARTS = metrics.counter("kidspot_worker_restarts_total", "Worker restarts by cause", ["worker", "cause"])
+
+BACKOFF_INITIAL = 1.0   # seconds before the first restart
+BACKOFF_MAX = 60.0
+HEALTHY_RESET = 60.0    # seconds of clean running that resets the backoff
+STALL_HISTORY = membudget.cap(50, 10)  # stall durations kept per worker
+
+
+class Heartbeat:
+    """Passed to a worker; records loop timing and tells it when to exit."""
+
+    def __init__(self, name):
+        self.name = name
+        self.last_beat = time.monotonic()
+        self.iterations = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._stop = threading.Event()
+        self._loop_seconds = LOOP_SECONDS.labels(name)
+
+    def beat(self):
+        now = time.monotonic()
+        latency = now - self.last_beat
+        self.last_beat = now
+        self.iterations += 1
+        self.last_latency = latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+        self._loop_seconds.observe(latency)
+
+    def stopped(self):
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+
+
+class _Worker:
+    def __init__(self, name, target, args, stall_timeout):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.stall_timeout = stall_timeout
+        self.heartbeat = None
+        self.thread = None
+        self.started_at = 0.0
+        self.restart_at = None
+        self.backoff = BACKOFF_INITIAL
+        self.restarts = 0
+        self.deaths = 0
+        self.stalls = []  # recent stall durations in seconds
+        self.stall_total = 0.0
+        self.stall_count = 0
+        self.last_error = None
+
+
+class Supervisor:
+    def __init__(self):
+        self.workers = {}
+        self.lock = threading.Lock()
+        self._stopped = False
+
+    # ---------------------------
+    # Registration / lifecycle
+    # ---------------------------
+    def add(self, name, target, args=(), stall_timeout=30.0):
+        """Register and start a worker; returns its thread."""
+        worker = _Worker(name, target, args, stall_timeout)
+        with self.lock:
+            self.workers[name] = worker
+            self._spawn(worker)
+        return worker.thread
+
+    def _spawn(self, worker):
+        heartbeat = Heartbeat(worker.name)
+
+        def _run():
+            try:
+                worker.target(*worker.args, heartbeat=heartbeat)
+            except Exception as e:
+                worker.last_error = repr(e)
+                log.exception(f"Worker {worker.name} crashed")
+
+        worker.heartbeat = heartbeat
+        worker.thread = threading.Thread(target=_run, name=worker.name, daemon=True)
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        worker.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self._stopped = True
+            for worker in self.workers.values():
+                if worker.heartbeat:
+                    worker.heartbeat.stop()
+
+    # ---------------------------
+    # Health checks
+    # ---------------------------
+    def check(self):
+        """Restart dead or stalled workers; call periodically from the main loop."""
+        now = time.monotonic()
+        with self.lock:
+            if self._stopped:
+                return
+            for worker in self.workers.values():
+                self._check_worker(worker, now)
+
+    def _check_worker(self, worker, now):
+        if worker.restart_at is not None:
+            if now >= worker.restart_at:
+                worker.restarts += 1
+                log.warning(f"🔁 Restarting {worker.name} (restart #{worker.restarts})")
+                self._spawn(worker)
+            return
+
+        heartbeat = worker.heartbeat
+        if not worker.thread.is_alive():
+            worker.deaths += 1
+            RESTARTS.labels(worker.name, "died").inc()
+            log.warning(f"💀 Worker {worker.name} died: {worker.last_error}")
+            flightrec.record("worker", worker.name, f"died: {worker.last_error}")
+            flightrec.dump(f"died-{worker.name}")
+            self._schedule_restart(worker, now)
+            return
+
+        silent = now - heartbeat.last_beat
+        if silent > worker.stall_timeout:
+            log.warning(f"⏳ Worker {worker.name} stalled for {silent:.1f}s")
+            self._record_stall(worker, silent)
+            flightrec.record("worker", worker.name, "stalled", silent)
+            flightrec.dump(f"stall-{worker.name}")
+            RESTARTS.labels(worker.name, "stalled").inc()
+            heartbeat.stop()
+            self._schedule_restart(worker, now)
+            return
+
+        if now - worker.started_at > HEALTHY_RESET:
+            worker.backoff = BACKOFF_INITIAL
+
+    def _schedule_restart(self, worker, now):
+        worker.restart_at = now + worker.backoff
+        worker.backoff = min(worker.backoff * 2, BACKOFF_MAX)
+
+    def _record_stall(self, worker, duration):
+        worker.stall_count += 1
+        worker.stall_total += duration
+        STALL_SECONDS.labels(worker.name).observe(duration)
+        worker.stalls.append(round(duration, 3))
+        del worker.stalls[:-STALL_HISTORY]
+
+    # ---------------------------
+    # Reporting
+    # ---------------------------
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            return {
+                name: {
+                    "alive": w.thread.is_alive() and w.restart_at is None,
+                    "iterations": w.heartbeat.iterations,
+                    "since_last_beat": round(now - w.heartbeat.last_beat, 3),
+                    "last_latency": round(w.heartbeat.last_latency, 4),
+                    "max_latency": round(w.heartbeat.max_latency, 4),
+                    "restarts": w.restarts,
+                    "deaths": w.deaths,
+                    "stall_count": w.stall_count,
+                    "stall_seconds_total": round(w.stall_total, 3),
+                    "recent_stalls": list(w.stalls),
+                    "last_error": w.last_error,
+                }
+                for name, w in self.workers.items()
+            }
+
+    def export(self, path, **extra):
+        """Write stats() (plus any extra sections) as JSON, replacing the file atomically."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"time": time.time(), "workers": self.stats(), **extra}, f, indent=2)
+        os.replace(tmp, path)